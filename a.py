@@ -1,17 +1,24 @@
 import streamlit as st
-import google.generativeai as genai
-import smtplib
-import ssl
 import datetime
 import urllib.parse
-import sqlite3
 import hashlib
+import io
 import re
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
-from fpdf import FPDF
-from PIL import Image
+
+import ai_cache
+import assets
+import db
+import docket
+import draft_store
+import factory
+import ledger
+import longdoc
+import outbox
+import panels
+from pdfgen import generate_pdf, pdf_key
+import precedents
+import streaming
+import telemetry
 
 # --- 1. SETTINGS & SECRETS SETUP ---
 st.set_page_config(page_title="COOL FINDS | ADVOCATE ELITE", layout="wide")
@@ -28,82 +35,60 @@ try:
     SENDER_EMAIL = st.secrets["SENDER_EMAIL"]
     SENDER_APP_PASSWORD = st.secrets["SENDER_APP_PASSWORD"]
     
-    genai.configure(api_key=API_KEY)
-    model = genai.GenerativeModel('gemini-2.5-flash')
+    # Responses are cached on disk by (feature, prompt, scope, image bytes); see ai_cache.py.
+    # Both are built once per server process; google.generativeai is imported on the first real request.
+    response_cache = ai_cache.get_cache(disabled=tuple(st.secrets.get("AI_CACHE_DISABLED", ())))
+    # All sessions share one gateway sized to the key's quota (GEMINI_RPM / GEMINI_BURST); see gateway.py
+    model = ai_cache.get_model(API_KEY, response_cache, per_minute=st.secrets.get("GEMINI_RPM", 60),
+                               burst=st.secrets.get("GEMINI_BURST", 10))
 except Exception as e:
     st.error("Missing credentials in .streamlit/secrets.toml.")
     st.stop()
 
 # --- 2. DATABASE ARCHITECTURE ---
-def init_db():
-    conn = sqlite3.connect('advocate_elite.db')
-    c = conn.cursor()
-    c.execute('CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT, enroll_id TEXT)')
-    c.execute('CREATE TABLE IF NOT EXISTS hearings (id INTEGER PRIMARY KEY, username TEXT, case_name TEXT, category TEXT, hearing_date TEXT)')
-    c.execute('CREATE TABLE IF NOT EXISTS invoices (id INTEGER PRIMARY KEY, username TEXT, client_name TEXT, amount REAL, date TEXT)')
-    c.execute('CREATE TABLE IF NOT EXISTS drafts (id INTEGER PRIMARY KEY, username TEXT, category TEXT, doc_type TEXT, content TEXT, date TEXT)')
-    conn.commit()
-    conn.close()
-
 def make_hashes(password): return hashlib.sha256(str.encode(password)).hexdigest()
 def check_hashes(password, hashed_text): return make_hashes(password) == hashed_text
-init_db()
+# Users, the outbox and the precedent index live in the directory; with SHARD_DIR set each advocate's
+# hearings, drafts and invoices get their own file (SHARD_BUCKETS > 0: hashed into that many files instead)
+store = db.get_store(db.DB_PATH, st.secrets.get("SHARD_DIR"), int(st.secrets.get("SHARD_BUCKETS", 0)))
+directory = pool = store.directory
+# DB/Gemini/PDF/SMTP timings are written to metrics.prom/.json every 15 s; admins also get pages/1_📊_Metrics.py
+telemetry.start_exporter(st.secrets.get("METRICS_PATH", telemetry.EXPORT_PATH))
+# Mail goes through the outbox table; this thread owns the SMTP session (host/port overridable for local testing)
+mailer = outbox.get_worker(directory, SENDER_EMAIL, SENDER_APP_PASSWORD, st.secrets.get("SMTP_HOST", "smtp.gmail.com"),
+                           int(st.secrets.get("SMTP_PORT", 465)), bool(st.secrets.get("SMTP_SSL", True)))
 
 # --- 3. HELPER FUNCTIONS ---
-def safe_unicode(text):
-    replacements = {"₹": "Rs.", "—": "-", "‘": "'", "’": "'", "“": '"', "”": '"', "…": "...", "–": "-"}
-    for k, v in replacements.items(): text = text.replace(k, v)
-    return text.encode('latin-1', 'replace').decode('latin-1')
-
-def generate_pdf(content, title="Legal_Document"):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", 'B', 16)
-    pdf.cell(200, 10, txt=title.upper(), ln=True, align='C')
-    pdf.ln(10)
-    pdf.set_font("Arial", size=11)
-    clean_text = safe_unicode(content)
-    pdf.multi_cell(0, 10, txt=clean_text)
-    return bytes(pdf.output())
-
-def send_real_email_with_attachment(receiver_email, subject, body, pdf_data, filename):
-    message = MIMEMultipart()
-    message["From"] = SENDER_EMAIL
-    message["To"] = receiver_email
-    message["Subject"] = subject
-    message.attach(MIMEText(body, "plain"))
-    try:
-        attachment = MIMEApplication(pdf_data, _subtype="pdf")
-        attachment.add_header('Content-Disposition', 'attachment', filename=f"{filename}.pdf")
-        message.attach(attachment)
-    except Exception: return False, "Attachment Error"
-    context = ssl.create_default_context()
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-            server.login(SENDER_EMAIL, SENDER_APP_PASSWORD)
-            server.sendmail(SENDER_EMAIL, receiver_email, message.as_string())
-        return True, "Success"
-    except Exception as e: return False, str(e)
+# The calendar, ledger, draft and outbox panels and the answer captions are shared with main.py (panels.py)
+def batch_factory_panel(username, template, title):
+    with st.expander("🏭 Batch Factory"):
+        st.caption("One PDF per CSV row from the Live Editor text. Columns fill {column} placeholders; "
+                   "'recipient' and 'address' fill the template's [RECIPIENT NAME/OFFICE] and [ADDRESS LINE 1]; "
+                   "an 'email' column queues each PDF to that address.")
+        parties_file = st.file_uploader("Parties CSV", type=["csv"], key="factory_csv")
+        if not parties_file: return
+        parties = factory.read_parties(parties_file.getvalue())
+        missing = [p for p in factory.placeholders(template) if parties and p not in parties[0]]
+        if missing: st.warning(f"No column for: {', '.join(missing)} (left unfilled)")
+        send = st.checkbox(f"Queue emails ({sum(1 for p in parties if p.get('email'))} rows have an address)")
+        if st.button(f"Generate {len(parties)} documents", disabled=not parties):
+            buf, bar, report = io.BytesIO(), st.progress(0.0), factory.BatchReport(len(parties))
+            results = factory.write_zip(factory.render_batch(template, parties, title), buf)
+            if send: results = factory.queue_emails(directory, username, results, title)
+            for name, _, _ in factory.track(results, report):
+                bar.progress(report.done / report.total, text=f"{name}.pdf | {report.docs_per_second:.1f} docs/s")
+            if send: mailer.notify()
+            st.session_state.factory_zip = buf.getvalue()
+            st.success(report.summary())
+        if st.session_state.get("factory_zip"):
+            st.download_button("📦 Download ZIP", st.session_state.factory_zip, f"{title}_batch.zip", mime="application/zip")
 
 # --- 4. GLOBAL STYLING ---
-BG_URL = "https://images.unsplash.com/photo-1589829545856-d10d557cf95f?q=80&w=1920"
-st.markdown(f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Playfair+Display:wght@700&family=Montserrat:wght@400;700&display=swap');
-    .stApp {{ background: linear-gradient(rgba(0,0,0,0.9), rgba(0,0,0,0.9)), url('{BG_URL}'); background-size: cover; background-attachment: fixed; }}
-    .title-text {{ color: #D4AF37; font-family: 'Playfair Display', serif; font-size: 55px; font-weight: bold; text-align: center; margin-bottom: 0px; }}
-    .glass-card {{ background: rgba(255, 255, 255, 0.05); backdrop-filter: blur(15px); border: 1px solid #D4AF37; padding: 25px; border-radius: 15px; color: white; margin-bottom: 20px; }}
-    .section-header {{ color: #D4AF37 !important; font-family: 'Playfair Display', serif; font-size: 24px; font-weight: bold; border-bottom: 1px solid #D4AF37; margin-bottom: 15px; }}
-    .ai-analysis-text {{ color: #00FFCC !important; font-family: 'Montserrat', sans-serif; font-size: 20px; font-weight: bold; margin-bottom: 10px; }}
-    .citation-answer {{ color: #BB86FC !important; background-color: rgba(187, 134, 252, 0.1); border-left: 4px solid #BB86FC; padding: 15px; border-radius: 5px; font-family: 'Montserrat', sans-serif; line-height: 1.6; }}
-    label {{ color: #D4AF37 !important; font-family: 'Montserrat'; font-weight: bold; }}
-    div[data-testid="stRadio"] div[role="radiogroup"] > label:nth-of-type(1) p {{ color: #00BFFF !important; font-weight: bold; }}
-    div[data-testid="stRadio"] div[role="radiogroup"] > label:nth-of-type(2) p {{ color: #FF4B4B !important; font-weight: bold; }}
-    </style>
-    """, unsafe_allow_html=True)
+# Fonts and background come from ./static; the stylesheet is assembled once per process (assets.py)
+st.markdown(assets.stylesheet("theme.css", "a.css"), unsafe_allow_html=True)
 
 st.markdown('<p class="title-text">COOL FINDS</p>', unsafe_allow_html=True)
-st.markdown("<p style='text-align:center; color:#D4AF37; font-family:Montserrat; font-size:0.9rem; letter-spacing: 4px;'>LEGAL INTELLIGENCE HUB</p><hr>", unsafe_allow_html=True)
+st.markdown("<p class='subtitle-text'>LEGAL INTELLIGENCE HUB</p><hr>", unsafe_allow_html=True)
 
 # --- 5. AUTHENTICATION ---
 if not st.session_state.auth:
@@ -116,9 +101,7 @@ if not st.session_state.auth:
                 u = st.text_input("Username")
                 p = st.text_input("Password", type="password")
                 if st.form_submit_button("Access Portal", use_container_width=True):
-                    conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-                    c.execute('SELECT password, enroll_id FROM users WHERE username=?', (u,))
-                    res = c.fetchone(); conn.close()
+                    res = db.get_user(directory, u)
                     if res and check_hashes(p, res[0]):
                         st.session_state.auth = True
                         st.session_state.user_name = u
@@ -131,15 +114,12 @@ if not st.session_state.auth:
                 ne = st.text_input("Bar ID")
                 np = st.text_input("New Password", type="password")
                 if st.form_submit_button("Sign Up"):
-                    conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-                    try: 
-                        c.execute('INSERT INTO users VALUES (?,?,?)', (nu, make_hashes(np), ne))
-                        conn.commit(); st.success("Created! Please Login.")
-                    except: st.error("Username taken.")
-                    conn.close()
+                    if db.create_user(directory, nu, make_hashes(np), ne): st.success("Created! Please Login.")
+                    else: st.error("Username taken.")
         st.markdown('</div>', unsafe_allow_html=True)
 
 else:
+    pool = store.pool(st.session_state.user_name)  # this advocate's shard (the directory when unsharded)
     # --- DASHBOARD SIDEBAR ---
     with st.sidebar:
         st.markdown(f'<p style="color:#D4AF37; font-size:20px;">👤 Adv. {st.session_state.user_name}</p>', unsafe_allow_html=True)
@@ -148,24 +128,29 @@ else:
         case_in = st.text_input("Case Name")
         date_in = st.date_input("Hearing Date")
         if st.button("Save to Docket", use_container_width=True):
-            conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-            c.execute('INSERT INTO hearings (username, case_name, category, hearing_date) VALUES (?,?,?,?)', 
-                      (st.session_state.user_name, case_in, "General", str(date_in)))
-            conn.commit(); conn.close(); st.toast("Saved!")
+            docket.add_hearing(pool, st.session_state.user_name, case_in, date_in, category="General"); st.toast("Saved!")
 
         st.markdown('<p style="color:#00FFCC; margin-top:20px;">📌 Upcoming Matters</p>', unsafe_allow_html=True)
-        conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-        c.execute('SELECT case_name, hearing_date FROM hearings WHERE username=? ORDER BY hearing_date ASC LIMIT 5', (st.session_state.user_name,))
-        docket_data = c.fetchall(); conn.close()
-        for h in docket_data:
-            st.markdown(f"<span style='color:white;'>📅 {h[1]} | {h[0]}</span>", unsafe_allow_html=True)
+        window = st.selectbox("Docket window", list(docket.WINDOWS), label_visibility="collapsed")
+        docket_data = docket.upcoming(pool, st.session_state.user_name, days=docket.WINDOWS[window])
+        for _, case, hdate, _ in docket_data:
+            st.markdown(f"<span style='color:white;'>📅 {hdate} | {case}</span>", unsafe_allow_html=True)
         
+        with st.expander("⚡ AI Cache"):
+            for feat, sv in response_cache.stats().items():
+                st.caption(f"{feat}: {sv['hits']} hits / {sv['misses']} misses ({sv['hit_rate']:.0%}) | saved {sv['saved_seconds']:.0f}s")
+            gw = model.gateway.stats()
+            st.caption(f"Gateway: {gw.get('upstream_calls', 0)} calls | {gw.get('coalesced', 0)} coalesced | "
+                       f"{gw.get('throttled', 0)} throttled ({gw.get('throttled_seconds', 0):.0f}s) | {gw.get('retried', 0)} retried")
+            index = precedents.stats(directory)
+            st.caption(f"Precedent index: {sum(n for n, _ in index.values())} citations | "
+                       f"{sum(h for _, h in index.values())} served without the model")
         st.write("---")
         if st.button("🚪 Logout", use_container_width=True): 
             st.session_state.auth = False
             st.rerun()
 
-    tab1, tab2, tab3, tab4 = st.tabs(["🖋️ Drafting Room", "🔍 Evidence Scanner", "📚 AI Researcher", "💰 Billing"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["🖋️ Drafting Room", "🔍 Evidence Scanner", "📚 AI Researcher", "💰 Billing", "📅 Calendar"])
 
     # --- TAB 1: DRAFTING ROOM ---
     with tab1:
@@ -177,80 +162,126 @@ else:
             
             if draft_cat == "Civil":
                 dtype = st.selectbox("Document Type", ["Property Notice", "Rent Agreement", "Divorce Petition", "Civil Suit"])
-                court_header = "IN THE COURT OF THE CIVIL JUDGE, SENIOR DIVISION"
             else:
                 dtype = st.selectbox("Document Type", ["Regular Bail Application", "Anticipatory Bail", "Criminal FIR", "Section 138 Notice"])
-                court_header = "IN THE COURT OF THE HON'BLE SESSIONS JUDGE"
             
             # --- FIX: Updated Load Template Logic ---
             if st.button("✨ Load Template"):
-                new_template = f"""{court_header}
-Date: {datetime.date.today()}
-Advocate: {st.session_state.user_name}
-Enrollment: {st.session_state.enroll_id}
-
-SUBJECT: {dtype.upper()} IN THE MATTER OF {draft_cat.upper()} LITIGATION
-
-TO,
-[RECIPIENT NAME/OFFICE]
-[ADDRESS LINE 1]
-
-Sir/Madam,
-Under the instructions from my client, I hereby serve you with the following {dtype}:
-
-1. That my client is...
-2. That the cause of action arose on...
-3. Therefore, you are hereby requested to...
-
-Regards,
-Adv. {st.session_state.user_name}
-({st.session_state.enroll_id})"""
+                new_template = factory.draft_template(dtype, draft_cat, st.session_state.user_name, st.session_state.enroll_id)
                 # This directly updates the widget state
                 st.session_state.editor = new_template
+                st.session_state.doc_id = None  # a template starts a new document
+                draft_store.seed(st.session_state, new_template)  # autosave waits for the first edit
                 st.rerun()
             
             # Use the key as the direct source of truth
             text = st.text_area("Live Editor", height=400, key="editor")
             
             if st.button("💾 Save Draft to DB"):
-                conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-                c.execute('INSERT INTO drafts (username, category, doc_type, content, date) VALUES (?,?,?,?,?)', 
-                          (st.session_state.user_name, draft_cat, dtype, text, str(datetime.date.today())))
-                conn.commit(); conn.close(); st.success("Draft Saved!")
+                st.session_state.doc_id, version, created = draft_store.save(pool, st.session_state.user_name, st.session_state.get("doc_id"), dtype, text, datetime.date.today(), category=draft_cat)
+                st.session_state.saved_hash = draft_store.content_hash(text)
+                st.success(f"Draft Saved! (v{version})" if created else "No changes since the last version.")
+            panels.autosave_panel(pool, st.session_state.user_name, dtype, draft_cat)
+            panels.version_panel(pool, st.session_state.user_name)
 
         with c2:
             st.markdown('<p class="ai-analysis-text">📋 AI Analysis</p>', unsafe_allow_html=True)
             if st.button("Predict Probability", use_container_width=True):
-                with st.spinner("Analyzing..."):
-                    res = model.generate_content(f"Predict legal success probability for this Indian {draft_cat} draft: {text}")
-                    st.warning(res.text)
+                st.button("⏹ Stop", key="stop_predict")
+                prompt = None
+                if longdoc.needs_split(text):
+                    # Long-document mode: parts are analysed in parallel, then their notes are weighed together.
+                    # Each progress update is also where a Stop click interrupts the run.
+                    bar = st.progress(0.0, "Reading the draft section by section…")
+                    try:
+                        prompt = longdoc.predict_prompt(model, text, draft_cat, lambda stage, done, total: bar.progress(done / total, f"{stage} {done} of {total}"))
+                    except Exception as e:
+                        st.error(f"Part of the draft could not be analysed ({e}), so no prediction was made. Parts already analysed are kept; try again shortly.")
+                    bar.empty()
+                else:
+                    prompt = longdoc.predict_prompt(model, text, draft_cat)
+                if prompt:
+                    res = streaming.stream_into(st.empty(), model, prompt, lambda ph, t: ph.warning(t), feature="predict", scope=draft_cat)
+                    panels.stream_caption(res)
             st.write("---")
-            pdf = generate_pdf(text, dtype)
-            st.download_button("📥 Download PDF", pdf, f"{dtype}.pdf", mime="application/pdf", use_container_width=True)
+            # The PDF is only rendered (and then memoized) once someone asks for it
+            if st.button("📄 Prepare PDF", use_container_width=True): st.session_state.pdf_key = pdf_key(text, dtype)
+            if st.session_state.get("pdf_key") == pdf_key(text, dtype):
+                st.download_button("📥 Download PDF", generate_pdf(text, dtype), f"{dtype}.pdf", mime="application/pdf", use_container_width=True)
             dest = st.text_input("Recipient Email")
             if st.button("📧 Send Mail", type="primary", use_container_width=True):
                 if dest:
-                    ok, msg = send_real_email_with_attachment(dest, f"Legal Doc: {dtype}", "Attached is your document.", pdf, dtype)
-                    if ok: st.success("Sent Successfully!")
-                    else: st.error(msg)
+                    outbox.enqueue(directory, st.session_state.user_name, dest, f"Legal Doc: {dtype}", "Attached is your document.", generate_pdf(text, dtype), dtype)
+                    mailer.notify(); st.success("Queued for delivery!")
+            panels.outbox_status(directory, st.session_state.user_name)
+        batch_factory_panel(st.session_state.user_name, text, dtype)
+        panels.draft_search_panel(pool, st.session_state.user_name)
         st.markdown('</div>', unsafe_allow_html=True)
 
     # --- TAB 2, 3, 4 ---
     with tab2:
         st.markdown('<div class="glass-card">🔍 AI Document OCR</div>', unsafe_allow_html=True)
-        up = st.file_uploader("Upload Image", type=['jpg','png','jpeg'])
-        if up and st.button("Scan"):
-            res = model.generate_content(["Extract text and summarize:", Image.open(up)])
-            st.info(res.text)
+        ups = st.file_uploader("Upload Images / Scans", type=['jpg','png','jpeg','tif','tiff','pdf'], accept_multiple_files=True)
+        with st.expander("⚙️ Image Preprocessing"):
+            use_prep = st.checkbox("Shrink scans before OCR", value=True)
+            # Plain values here; PIL/preprocess/scanner are only imported once a scan is requested
+            prep_opts = dict(
+                max_dim=st.slider("Max dimension (px)", 800, 4000, 1600, step=100),
+                grayscale=st.checkbox("Grayscale", value=True), binarize=st.checkbox("Binarize", value=False),
+                fmt=st.selectbox("Encoding", ["JPEG", "WEBP"]), quality=st.slider("Quality", 30, 95, 70),
+                dedupe=st.checkbox("Skip near-duplicate pages", value=True))
+            compare = st.checkbox("Tuning: also OCR the unprocessed page and report the latency change")
+        if len(ups) == 1 and not ups[0].name.lower().endswith(('.pdf', '.tif', '.tiff')):
+            if st.button("Scan"):
+                from PIL import Image
+                import preprocess
+                img = Image.open(ups[0])
+                prep = preprocess.preprocess(img, preprocess.PreprocessConfig(**prep_opts), ups[0].size) if use_prep else None
+                res = model.generate_content(["Extract text and summarize:", prep.blob if prep else img], feature="scanner")
+                st.info(res.text)
+                panels.cache_badge(res)
+                if prep: st.caption(f"Upload {prep.bytes_before / 1024:.0f} KB -> {prep.bytes_after / 1024:.0f} KB in {prep.seconds * 1000:.0f} ms")
+        elif ups and st.button(f"Batch Scan ({len(ups)} files)"):
+            import preprocess
+            import scanner
+            pages = scanner.expand_pages([(f.name, f.getvalue()) for f in ups])
+            if not scanner.pdf_split_available() and any(f.name.lower().endswith('.pdf') for f in ups):
+                st.warning("pypdfium2 is not installed, so each PDF is sent whole instead of page by page "
+                           "(no per-page progress or preprocessing). Install it with `pip install pypdfium2`.")
+            stats = scanner.BatchStats(len(pages))
+            bar, metrics = st.progress(0.0), st.empty()
+            results = []
+            for r in scanner.ocr_pages(model, pages, cfg=preprocess.PreprocessConfig(**prep_opts) if use_prep else None, compare=compare):
+                results.append(r); stats.add(r)
+                bar.progress(stats.done / stats.total, text=f"Page {r.index + 1} done in {r.latency:.1f}s")
+                metrics.caption(stats.summary())
+                with st.expander(f"{'❌' if r.error else '📄'} Page {r.index + 1} | {r.label} | {r.describe()}"):
+                    st.write(r.error or r.text)
+            st.session_state.scan_doc = scanner.assemble(results)
+        if st.session_state.get("scan_doc"):
+            scan_doc = st.text_area("Extracted Document", st.session_state.scan_doc, height=300)
+            if st.button("💾 Save Extraction to Drafts"):
+                draft_store.save(pool, st.session_state.user_name, None, "Scanned Evidence", scan_doc, datetime.date.today(), category=st.session_state.draft_cat)
+                st.success("Extraction Saved!")
 
     with tab3:
         st.markdown('<div class="glass-card">📚 Legal Research</div>', unsafe_allow_html=True)
         res_cat = st.radio("Search Scope", ["Civil", "Criminal"], horizontal=True, key="res_cat")
         q = st.text_input(f"Enter {res_cat} Query")
+        ask_model = st.checkbox("Always ask Gemini", key="research_ask_model", help="Skip the local precedent index")
         if st.button("Find Citations"):
-            with st.spinner("Searching..."):
-                res = model.generate_content(f"Provide 3 SC citations for: {q} in {res_cat} law.")
-                st.markdown(f'<div class="citation-answer">{res.text}</div>', unsafe_allow_html=True)
+            found = precedents.lookup(directory, q, scope=res_cat)
+            if found.strong and not ask_model:
+                precedents.served(directory, found)
+                st.markdown(f'<div class="citation-answer">\n\n{precedents.to_markdown(found.records)}\n\n</div>', unsafe_allow_html=True)
+                st.caption(f"📚 From local precedent index in {found.seconds * 1000:.1f} ms")
+            else:
+                st.button("⏹ Stop", key="stop_research")
+                res = streaming.stream_into(st.empty(), model, f"Provide 3 SC citations for: {q} in {res_cat} law.",
+                                            lambda ph, t: ph.markdown(f'<div class="citation-answer">{t}</div>', unsafe_allow_html=True),
+                                            feature="researcher", scope=res_cat)
+                panels.stream_caption(res)
+                panels.source_caption(found, res, [] if res.cancelled else precedents.learn(directory, res_cat, q, res.text))
 
     with tab4:
         st.markdown('<div class="glass-card">', unsafe_allow_html=True)
@@ -258,13 +289,15 @@ Adv. {st.session_state.user_name}
         clin = st.text_input("Client Name")
         amt = st.number_input("Amount (Rs.)", min_value=0.0)
         if st.button("Save Invoice"):
-            conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-            c.execute('INSERT INTO invoices (username, client_name, amount, date) VALUES (?,?,?,?)', (st.session_state.user_name, clin, amt, str(datetime.date.today())))
-            conn.commit(); conn.close(); st.success("Invoice Saved!")
+            ledger.add_invoice(pool, st.session_state.user_name, clin, amt, datetime.date.today()); st.success("Invoice Saved!")
             
             invoice_body = f"OFFICIAL INVOICE\nAdvocate: {st.session_state.user_name}\nEnrollment: {st.session_state.enroll_id}\nClient: {clin}\nAmount: Rs. {amt}\nDate: {datetime.date.today()}"
             inv_p = generate_pdf(invoice_body, "Invoice")
             st.download_button("Download PDF", inv_p, "invoice.pdf")
+        panels.ledger_panel(pool, st.session_state.user_name)
         st.markdown('</div>', unsafe_allow_html=True)
 
+    with tab5:
+        panels.calendar_view(pool, st.session_state.user_name)
+
 st.markdown('<p style="text-align:center; color:#555; font-size:12px;">DISCLAIMER: AI Assistant. Verify citations manually.</p>', unsafe_allow_html=True)
\ No newline at end of file
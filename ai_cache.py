@@ -0,0 +1,255 @@
+"""Persistent, content-addressed cache for Gemini responses."""
+import hashlib
+import sqlite3
+import threading
+import time
+
+import gateway
+import telemetry
+from db import cache_resource
+
+CACHE_PATH = 'ai_cache.db'
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+FEATURES = ('researcher', 'scanner', 'predict')
+MODEL_NAME = 'gemini-2.5-flash'
+
+
+def make_key(feature, contents, scope=None):
+    """sha256 over the feature, scope and every prompt part (text, raw bytes or PIL image)."""
+    h = hashlib.sha256()
+    for part in (feature, scope or '', *(contents if isinstance(contents, (list, tuple)) else [contents])):
+        if isinstance(part, str):
+            h.update(b's' + part.encode('utf-8'))
+        elif isinstance(part, (bytes, bytearray, memoryview)):
+            h.update(b'b' + bytes(part))
+        elif isinstance(part, dict) and 'data' in part:  # inline blob, e.g. a PDF
+            h.update(f"m{part.get('mime_type')}".encode() + bytes(part['data']))
+        elif hasattr(part, 'tobytes'):  # PIL.Image
+            h.update(f'i{part.mode}{part.size}'.encode() + part.tobytes())
+        else:
+            h.update(b'r' + repr(part).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def chunk_text(chunk):
+    """`.text` of a streamed chunk, or '' for chunks that carry no text parts."""
+    try:
+        return chunk.text or ''
+    except ValueError:  # SDK raises for chunks with only finish/safety metadata
+        return ''
+
+
+class CachedResponse:
+    """Stand-in for the SDK response: exposes `.text` plus where it came from."""
+
+    def __init__(self, text, cached=False, latency=0.0):
+        self.text = text
+        self.cached = cached
+        self.latency = latency
+
+    def __iter__(self):
+        yield self  # a cache hit streams as one chunk
+
+
+class CachingStream:
+    """Passes an upstream streamed response through and caches the text once it completes.
+    `start` is when the upstream call was made, so the latency includes waiting for the first chunk."""
+
+    cached = False
+
+    def __init__(self, upstream, on_complete, start=None):
+        self.upstream = upstream
+        self.on_complete = on_complete
+        self.start = start
+        self.text = ''
+        self.latency = 0.0
+
+    def __iter__(self):
+        start = self.start if self.start is not None else time.perf_counter()
+        parts = []
+        for chunk in self.upstream:
+            parts.append(chunk_text(chunk))
+            yield chunk
+        self.text = ''.join(parts)
+        self.latency = time.perf_counter() - start
+        self.on_complete(self.text, self.latency)
+
+    def __getattr__(self, name):
+        return getattr(self.upstream, name)
+
+
+class ResponseCache:
+    """SQLite-backed store with TTL expiry, LRU eviction by byte size and hit/miss counters."""
+
+    def __init__(self, path=CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, disabled=()):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.disabled = set(disabled)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, feature TEXT, text TEXT, size INTEGER, latency REAL, created REAL, accessed REAL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS stats (feature TEXT PRIMARY KEY, hits INTEGER DEFAULT 0, misses INTEGER DEFAULT 0, saved_seconds REAL DEFAULT 0)')
+
+    def enabled(self, feature):
+        return feature not in self.disabled
+
+    def get(self, key, feature):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT text, latency, created FROM responses WHERE key=?', (key,)).fetchone()
+            if row and now - row[2] > self.ttl:
+                self._conn.execute('DELETE FROM responses WHERE key=?', (key,))
+                row = None
+            if row is None:
+                self._bump(feature, misses=1)
+                return None
+            self._conn.execute('UPDATE responses SET accessed=? WHERE key=?', (now, key))
+            self._bump(feature, hits=1, saved=row[1])
+            return CachedResponse(row[0], cached=True, latency=row[1])
+
+    def put(self, key, feature, text, latency):
+        now = time.time()
+        size = len(text.encode('utf-8'))
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO responses VALUES (?,?,?,?,?,?,?)', (key, feature, text, size, latency, now, now))
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute('DELETE FROM responses WHERE created < ?', (now - self.ttl,))
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes: return
+        freed = 0
+        stale = []
+        for key, size in self._conn.execute('SELECT key, size FROM responses ORDER BY accessed ASC'):
+            stale.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes: break
+        self._conn.executemany('DELETE FROM responses WHERE key=?', stale)
+
+    def _bump(self, feature, hits=0, misses=0, saved=0.0):
+        self._conn.execute('INSERT INTO stats (feature, hits, misses, saved_seconds) VALUES (?,?,?,?) '
+                           'ON CONFLICT(feature) DO UPDATE SET hits=hits+excluded.hits, misses=misses+excluded.misses, '
+                           'saved_seconds=saved_seconds+excluded.saved_seconds', (feature, hits, misses, saved))
+
+    def stats(self):
+        """{feature: {'hits', 'misses', 'hit_rate', 'saved_seconds'}}; saved calls == hits."""
+        with self._lock:
+            rows = self._conn.execute('SELECT feature, hits, misses, saved_seconds FROM stats').fetchall()
+        return {f: {'hits': h, 'misses': m, 'hit_rate': h / (h + m) if h + m else 0.0, 'saved_seconds': s}
+                for f, h, m, s in rows}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+
+
+def payload_size(contents):
+    """Approximate request bytes: text as UTF-8, inline blobs as-is, images as raw pixels."""
+    size = 0
+    for part in contents if isinstance(contents, (list, tuple)) else [contents]:
+        if isinstance(part, str): size += len(part.encode('utf-8'))
+        elif isinstance(part, (bytes, bytearray)): size += len(part)
+        elif isinstance(part, dict) and 'data' in part: size += len(part['data'])
+        elif hasattr(part, 'getbands'): size += part.width * part.height * len(part.getbands())
+    return size
+
+
+def record_usage(op, res):
+    """Token counts from the SDK's usage_metadata, when the response carries one."""
+    usage = getattr(res, 'usage_metadata', None)
+    if usage is None: return
+    telemetry.count('gemini', op, 'prompt_tokens', getattr(usage, 'prompt_token_count', 0) or 0)
+    telemetry.count('gemini', op, 'output_tokens', getattr(usage, 'candidates_token_count', 0) or 0)
+
+
+class CachedModel:
+    """Wraps a `GenerativeModel`; `generate_content(..., feature=...)` is served from cache when possible."""
+
+    def __init__(self, model, cache, gateway=None):
+        self.model = model
+        self.cache = cache
+        self.gateway = gateway
+
+    def _send(self, contents, op, **kwargs):
+        """One real upstream call, traced as ('gemini', op); streams are timed until fully consumed."""
+        telemetry.count('gemini', op, 'request_bytes', payload_size(contents))
+        if kwargs.get('stream'):
+            with telemetry.span('gemini', op + ':connect'):
+                upstream = self.model.generate_content(contents, **kwargs)
+            return telemetry.TracedStream(upstream, 'gemini', op, lambda res: record_usage(op, res))
+        with telemetry.span('gemini', op) as sp:
+            res = self.model.generate_content(contents, **kwargs)
+            sp.size = len(res.text or '')
+        record_usage(op, res)
+        return res
+
+    def _upstream(self, contents, op, key, **kwargs):
+        """Through the gateway, if any: rate limited, retried, and shared with identical in-flight calls."""
+        if self.gateway is None: return self._send(contents, op, **kwargs)
+        return self.gateway.call(lambda: self._send(contents, op, **kwargs), key, op, bool(kwargs.get('stream')))
+
+    def _upstream_cached(self, contents, feature, key, **kwargs):
+        """Cache miss: the call that actually goes upstream writes the cache, timed from that call.
+        Callers coalesced onto it by the gateway share its result and write nothing."""
+        def send():
+            start = time.perf_counter()
+            res = self._send(contents, feature, **kwargs)
+            if kwargs.get('stream'):
+                return CachingStream(res, lambda text, latency: self.cache.put(key, feature, text, latency), start)
+            latency = time.perf_counter() - start
+            self.cache.put(key, feature, res.text, latency)
+            return CachedResponse(res.text, cached=False, latency=latency)
+        if self.gateway is None: return send()
+        return self.gateway.call(send, key, feature, bool(kwargs.get('stream')))
+
+    def generate_content(self, contents, feature=None, scope=None, **kwargs):
+        if feature is None or not self.cache.enabled(feature):
+            op = feature or 'uncached'
+            return self._upstream(contents, op, make_key(op, contents, scope) if self.gateway else None, **kwargs)
+        key = make_key(feature, contents, scope)
+        hit = self.cache.get(key, feature)
+        if hit is not None:
+            telemetry.count('gemini', feature, 'cache_hits')
+            return hit
+        return self._upstream_cached(contents, feature, key, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+@cache_resource
+def get_cache(path=CACHE_PATH, disabled=()):
+    return ResponseCache(path, disabled=disabled)
+
+
+class LazyGemini:
+    """Imports and configures google.generativeai on the first request, so the login page and
+    cache hits never pay for it."""
+
+    def __init__(self, api_key, model_name=MODEL_NAME):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _client(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate_content(self, contents, **kwargs):
+        return self._client().generate_content(contents, **kwargs)
+
+
+@cache_resource
+def get_model(api_key, _cache, model_name=MODEL_NAME, per_minute=gateway.REQUESTS_PER_MINUTE, burst=gateway.BURST):
+    """One client, and one gateway (rate limit, retry, coalescing) for the shared API key, per server process."""
+    return CachedModel(LazyGemini(api_key, model_name), _cache, gateway.Gateway(int(per_minute), int(burst)))
@@ -0,0 +1,90 @@
+"""Page styling. Fonts and the background are served from ./static (server.enableStaticServing)
+when present there, else from Google Fonts / Unsplash as before; the stylesheet is assembled once
+per server process.
+
+Put the files in place once per checkout, so cold starts make no third-party requests:
+    python assets.py --fetch
+"""
+import os
+import re
+
+from db import cache_resource
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+STATIC_URL = 'app/static'
+FONTS = [("Playfair Display", 700, "fonts/PlayfairDisplay-Bold.woff2"),
+         ("Montserrat", 400, "fonts/Montserrat-Regular.woff2"),
+         ("Montserrat", 700, "fonts/Montserrat-Bold.woff2")]
+BACKGROUND = 'background.jpg'
+REMOTE_FONTS = "https://fonts.googleapis.com/css2?family=Playfair+Display:wght@700&family=Montserrat:wght@400;700&display=swap"
+REMOTE_BACKGROUND = "https://images.unsplash.com/photo-1589829545856-d10d557cf95f?q=80&w=1920"
+FONT_LICENSES = {"PlayfairDisplay": "https://raw.githubusercontent.com/google/fonts/main/ofl/playfairdisplay/OFL.txt",
+                 "Montserrat": "https://raw.githubusercontent.com/google/fonts/main/ofl/montserrat/OFL.txt"}
+# Google Fonts only hands woff2 to a browser that supports it
+BROWSER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+LATIN_FACE = re.compile(r"/\* latin \*/\s*@font-face \{([^}]*)\}")
+# System fallbacks used while the web fonts load, or if neither copy can be reached.
+SERIF = "'Playfair Display', Georgia, 'Times New Roman', serif"
+SANS = "'Montserrat', 'Segoe UI', Helvetica, Arial, sans-serif"
+
+
+def _exists(path):
+    return os.path.isfile(os.path.join(STATIC_DIR, path))
+
+
+def _font_faces():
+    # @import has to come before every other rule; Google's sheet covers whichever faces are missing here
+    rules = [f"@import url('{REMOTE_FONTS}');"] if not all(_exists(path) for _, _, path in FONTS) else []
+    for family, weight, path in FONTS:
+        if not _exists(path): continue
+        rules.append(f"@font-face {{ font-family: '{family}'; font-weight: {weight}; font-display: swap; "
+                     f"src: local('{family}'), url('{STATIC_URL}/{path}') format('woff2'); }}")
+    return "\n".join(rules)
+
+
+def _variables():
+    background = f"url('{STATIC_URL}/{BACKGROUND}')" if _exists(BACKGROUND) else f"url('{REMOTE_BACKGROUND}')"
+    return f":root {{ --serif: {SERIF}; --sans: {SANS}; --background: {background}; }}"
+
+
+@cache_resource
+def stylesheet(*sheets):
+    """<style> block for the given static/*.css files; edits to them need a server restart."""
+    css = [_font_faces(), _variables()]
+    for name in sheets:
+        with open(os.path.join(STATIC_DIR, name), encoding='utf-8') as f: css.append(f.read())
+    return "<style>\n" + "\n".join(css) + "\n</style>"
+
+
+# --- FETCH ---
+def _download(url):
+    import urllib.request
+    with urllib.request.urlopen(urllib.request.Request(url, headers={'User-Agent': BROWSER_AGENT}), timeout=30) as r:
+        return r.read()
+
+
+def fetch(force=False):
+    """Download the latin subset of each font, their OFL licences and the background into STATIC_DIR."""
+    faces = {}
+    for rule in LATIN_FACE.findall(_download(REMOTE_FONTS).decode('utf-8')):
+        family = re.search(r"font-family: '([^']+)'", rule).group(1)
+        weight = int(re.search(r"font-weight: (\d+)", rule).group(1))
+        faces[family, weight] = re.search(r"url\(([^)]+)\)", rule).group(1)
+    files = [(path, faces[family, weight]) for family, weight, path in FONTS]
+    files += [(f"fonts/OFL-{family}.txt", url) for family, url in FONT_LICENSES.items()]
+    files.append((BACKGROUND, REMOTE_BACKGROUND))
+    for path, url in files:
+        if _exists(path) and not force: continue
+        target = os.path.join(STATIC_DIR, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        data = _download(url)
+        with open(target, 'wb') as f: f.write(data)
+        print(f"{path}: {len(data) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Fetch the fonts and background served from ./static")
+    ap.add_argument("--fetch", action="store_true", required=True)
+    ap.add_argument("--force", action="store_true", help="download again even if the file exists")
+    fetch(ap.parse_args().force)
@@ -0,0 +1,245 @@
+"""End-to-end benchmark of the Streamlit apps, driven headlessly with AppTest.
+
+Gemini is replaced by fake_model.FakeModel, patched in under ai_cache.get_model inside
+the benchmark's own interpreter, and mail goes to a local SMTP sink. For every scale, a fresh
+advocate_elite.db is seeded (benchmarks/seed.py). Then login, Drafting,
+Researcher and Billing are driven through the UI. The Scanner runs through
+scanner.ocr_pages directly, because AppTest cannot fill a file_uploader.
+
+Each scale/app pair runs in its own interpreter, so cached resources never leak
+between databases. Each rerun reports wall-time percentiles, time spent holding
+DB connections, PDF render time and resident memory. --save writes the rows to
+JSON; --compare prints the change against such a file.
+
+    python -m benchmarks.bench_app [--scales 1000,10000,100000] [--apps main.py,a.py] [--iterations 10]
+                                   [--latency 0.3] [--size 1500] [--save run.json] [--compare base.json]
+"""
+import argparse
+import collections
+import contextlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LABELS = {
+    "main.py": dict(email="Send to Client (Email)", query="Query", research="Find Precedents", invoice="Generate & Save Invoice"),
+    "a.py": dict(email="Recipient Email", query="Enter Civil Query", research="Find Citations", invoice="Save Invoice"),
+}
+SCANNER_PAGES = 8
+
+
+def rss_mb():
+    """Current resident set size; falls back to the peak where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f: return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == 'darwin' else 1024)
+
+
+class Probe:
+    """Accumulates DB and PDF time spent by script threads; the outbox worker is not counted."""
+
+    def __init__(self):
+        self.totals = collections.Counter()
+        self._lock = threading.Lock()
+
+    def add(self, kind, seconds):
+        if threading.current_thread().name == "outbox-worker": return
+        with self._lock: self.totals[kind] += seconds * 1000
+
+    def install(self):
+        import db
+        import pdfgen
+        connection, render_pdf, probe = db.ConnectionPool.connection, pdfgen.render_pdf, self
+
+        @contextlib.contextmanager
+        def timed_connection(pool):
+            start = time.perf_counter()
+            try:
+                with connection(pool) as conn: yield conn
+            finally:
+                probe.add('db', time.perf_counter() - start)
+
+        def timed_render(*args, **kwargs):
+            start = time.perf_counter()
+            try: return render_pdf(*args, **kwargs)
+            finally: probe.add('pdf', time.perf_counter() - start)
+
+        db.ConnectionPool.connection, pdfgen.render_pdf = timed_connection, timed_render
+
+    def take(self):
+        with self._lock:
+            out, self.totals = dict(self.totals), collections.Counter()
+        return out
+
+
+def install_fake_model(latency, size):
+    """The apps' get_model builds FakeModel instead of Gemini; AppTest runs them in this interpreter."""
+    import ai_cache
+    from fake_model import FakeModel
+    ai_cache.LazyGemini = lambda api_key, model_name=None: FakeModel(latency=latency, size=size)
+
+
+# --- 1. CHILD: one app against one seeded database ---
+def _widget(seq, label):
+    return next(w for w in seq if w.label == label)
+
+
+class Session:
+    def __init__(self, script, secrets, probe, samples):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(script, default_timeout=120)
+        for k, v in secrets.items(): self.at.secrets[k] = v
+        self.probe, self.samples = probe, samples
+
+    def step(self, flow, name, action=None):
+        self.probe.take()
+        start = time.perf_counter()
+        if action is None: self.at.run()
+        else: action().run()
+        wall = (time.perf_counter() - start) * 1000
+        if self.at.exception: raise RuntimeError(f"{flow}/{name}: {self.at.exception[0].value}")
+        sample = self.probe.take()
+        self.samples[(flow, name)].append((wall, sample.get('db', 0.0), sample.get('pdf', 0.0), rss_mb()))
+
+
+def run_child(app, iterations, latency, size, out):
+    from benchmarks.seed import PASSWORD, USERS
+    from benchmarks.smtp_sink import SmtpSink
+    sink = SmtpSink().start()
+    probe = Probe()
+    probe.install()
+    install_fake_model(latency, size)
+    samples = collections.defaultdict(list)
+    secrets = {"GEMINI_API_KEY": "bench", "SENDER_EMAIL": "bench@localhost", "SENDER_APP_PASSWORD": "",
+               "SMTP_HOST": sink.host, "SMTP_PORT": sink.port, "SMTP_SSL": False, "AI_CACHE_DISABLED": ["researcher", "scanner", "predict"]}
+    labels = LABELS[app]
+    s = Session(os.path.join(ROOT, app), secrets, probe, samples)
+    at = s.at
+
+    s.step("login", "cold load")
+    _widget(at.text_input, "Username").input(USERS[0])
+    _widget(at.text_input, "Password").input(PASSWORD)
+    s.step("login", "submit", lambda: _widget(at.button, "Access Portal").click())
+    if not at.session_state["auth"]: raise RuntimeError("login failed; was the database seeded?")
+
+    mails = 0
+    for i in range(iterations):
+        s.step("dashboard", "idle rerun")
+        s.step("drafting", "edit", lambda: _widget(at.text_area, "Live Editor").input(f"Draft {i}: my client states that the cheque was dishonoured. " * 20))
+        s.step("drafting", "save", lambda: _widget(at.button, "💾 Save Draft to DB").click())
+        s.step("drafting", "prepare pdf", lambda: _widget(at.button, "📄 Prepare PDF").click())
+        _widget(at.text_input, labels["email"]).input(f"client{i}@example.com")
+        s.step("drafting", "send mail", lambda: _widget(at.button, "📧 Send Mail").click())
+        mails += 1
+        _widget(at.text_input, labels["query"]).input(f"anticipatory bail conditions case {i}")
+        s.step("researcher", "ask", lambda: _widget(at.button, labels["research"]).click())
+        _widget(at.text_input, "Client Name").input(f"Client {i}")
+        _widget(at.number_input, "Amount (Rs.)").set_value(1000.0 + i)
+        s.step("billing", "save invoice", lambda: _widget(at.button, labels["invoice"]).click())
+
+    start = time.perf_counter()
+    delivered = sink.wait_for(mails)
+    mail_drain = (time.perf_counter() - start) * 1000
+    scan = run_scanner(latency, size, iterations)
+    rows = {f"{flow}/{name}": values for (flow, name), values in samples.items()}
+    if scan: rows[f"scanner/batch of {SCANNER_PAGES} pages"] = scan
+    with open(out, 'w') as f:
+        json.dump({"rows": rows, "mail": {"sent": sink.messages, "expected": mails, "delivered": delivered, "drain_ms": mail_drain}}, f)
+    sink.stop()
+
+
+def run_scanner(latency, size, iterations):
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        return None
+    import preprocess
+    import scanner
+    from fake_model import FakeModel
+    model = FakeModel(latency=latency, size=size)
+    out = []
+    for i in range(max(1, iterations // 2)):
+        pages = []
+        for n in range(SCANNER_PAGES):
+            img = Image.new("L", (2480, 3508), 255)
+            ImageDraw.Draw(img).text((200, 200 + 60 * n), f"Exhibit {i}-{n}", fill=0)
+            pages.append(scanner.Page(n, f"page {n + 1}", img))
+        start = time.perf_counter()
+        list(scanner.ocr_pages(model, pages, cfg=preprocess.PreprocessConfig(dedupe=False)))
+        out.append(((time.perf_counter() - start) * 1000, 0.0, 0.0, rss_mb()))
+    return out
+
+
+# --- 2. PARENT: seed, fan out, report ---
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize(values):
+    wall = [v[0] for v in values]
+    return {"n": len(values), "p50": statistics.median(wall), "p95": pct(wall, 0.95), "p99": pct(wall, 0.99),
+            "db": statistics.mean(v[1] for v in values), "pdf": statistics.mean(v[2] for v in values),
+            "rss": max(v[3] for v in values)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scales", default="1000,10000,100000", help="hearings, drafts and invoices each")
+    ap.add_argument("--apps", default="main.py,a.py")
+    ap.add_argument("--iterations", type=int, default=10)
+    ap.add_argument("--latency", type=float, default=0.3, help="fake Gemini first-token latency (s)")
+    ap.add_argument("--size", type=int, default=1500, help="fake Gemini answer length (chars)")
+    ap.add_argument("--save", help="write the summary to this JSON file")
+    ap.add_argument("--compare", help="JSON from an earlier --save to diff p50s against")
+    ap.add_argument("--child", nargs=2, metavar=("APP", "OUT"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child: return run_child(args.child[0], args.iterations, args.latency, args.size, args.child[1])
+
+    import db
+    from benchmarks.seed import seed
+    baseline = json.load(open(args.compare)) if args.compare else {}
+    results = {}
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    for scale in [int(s) for s in args.scales.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            seeded = os.path.join(tmp, "seed.db")
+            t = time.perf_counter()
+            pool = db.ConnectionPool(seeded); seed(pool, scale); pool.close()
+            print(f"\n== {scale:,} rows per table (seeded in {time.perf_counter() - t:.1f}s)")
+            for app in args.apps.split(','):
+                workdir = os.path.join(tmp, app.replace('.', '_'))
+                os.makedirs(workdir)
+                shutil.copy(seeded, os.path.join(workdir, db.DB_PATH))
+                out = os.path.join(workdir, "result.json")
+                proc = subprocess.run([sys.executable, '-m', 'benchmarks.bench_app', '--iterations', str(args.iterations),
+                                       '--latency', str(args.latency), '--size', str(args.size), '--child', app, out],
+                                      cwd=workdir, env=env, capture_output=True, text=True)
+                if proc.returncode: raise SystemExit(proc.stderr or proc.stdout)
+                with open(out) as f: child = json.load(f)
+                mail = child["mail"]
+                print(f"  {app}: mail {mail['sent']}/{mail['expected']} delivered, outbox drained {mail['drain_ms']:.0f} ms after the last rerun")
+                print(f"  {'step':<32}{'n':>4}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'db ms':>9}{'pdf ms':>9}{'rss MB':>9}{'Δp50':>8}")
+                for step, values in child["rows"].items():
+                    key = f"{scale}/{app}/{step}"
+                    row = results[key] = summarize(values)
+                    old = baseline.get(key)
+                    delta = f"{(row['p50'] / old['p50'] - 1):+.0%}" if old and old['p50'] else ""
+                    print(f"  {step:<32}{row['n']:>4}{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}"
+                          f"{row['db']:>9.2f}{row['pdf']:>9.1f}{row['rss']:>9.0f}{delta:>8}")
+    if args.save:
+        with open(args.save, 'w') as f: json.dump(results, f, indent=1)
+        print(f"\nsaved {len(results)} rows to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
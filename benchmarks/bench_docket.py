@@ -0,0 +1,79 @@
+"""Sidebar docket render time as the hearings table grows.
+
+Compares the original per-rerun connect + unindexed ORDER BY with the pooled
+date-range query and with a cached view hit.
+
+    python -m benchmarks.bench_docket [--scales 1000,10000,100000,1000000]
+"""
+import argparse
+import datetime
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import db
+import docket
+
+USERS = [f"adv{i}" for i in range(200)]
+USER_WEIGHTS = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(USERS))))
+TODAY = datetime.date(2026, 6, 1)
+LEGACY_SQL = 'SELECT case_name, hearing_date FROM hearings WHERE username=? ORDER BY hearing_date ASC LIMIT 5'
+
+
+def rows(rng, n):
+    for i in range(n):
+        day = TODAY + datetime.timedelta(days=rng.randint(-3 * 365, 365))
+        yield rng.choices(USERS, cum_weights=USER_WEIGHTS)[0], f"Case {i}", str(day), "Civil"
+
+
+def render(pairs):
+    return [f"📅 {hdate} | {case}" for case, hdate in pairs]
+
+
+def timed(fn, repeat=30):
+    out = []
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); out.append((time.perf_counter() - t) * 1000)
+    return statistics.median(out)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scales", default="1000,10000,100000,1000000")
+    args = ap.parse_args()
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        legacy = sqlite3.connect(legacy_path)
+        legacy.execute('CREATE TABLE hearings (id INTEGER PRIMARY KEY, username TEXT, case_name TEXT, hearing_date TEXT, category TEXT)')
+        pool = db.ConnectionPool(os.path.join(tmp, "docket.db"))
+        have = 0
+        user = USERS[0]
+        print(f"{'hearings':>9} {'legacy ms':>10} {'range ms':>9} {'cached ms':>10}")
+        for scale in map(int, args.scales.split(",")):
+            batch = list(rows(rng, scale - have))
+            legacy.executemany('INSERT INTO hearings (username, case_name, hearing_date, category) VALUES (?,?,?,?)', batch)
+            legacy.commit()
+            with pool.connection() as conn: conn.executemany(db.SQL_ADD_HEARING, [(u, c, cat, d) for u, c, d, cat in batch])
+            have = scale
+
+            def old():
+                conn = sqlite3.connect(legacy_path)
+                render(conn.execute(LEGACY_SQL, (user,)).fetchall()); conn.close()
+
+            def miss():
+                docket.invalidate(user); render((c, d) for _, c, d, _ in docket.upcoming(pool, user, today=TODAY))
+
+            def hit():
+                render((c, d) for _, c, d, _ in docket.upcoming(pool, user, today=TODAY))
+
+            print(f"{scale:>9} {timed(old):>10.3f} {timed(miss):>9.3f} {timed(hit):>10.4f}")
+        legacy.close(); pool.close()
+
+
+if __name__ == "__main__":
+    main()
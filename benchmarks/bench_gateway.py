@@ -0,0 +1,97 @@
+"""Burst of concurrent sessions against a quota-limited fake Gemini, with and without the gateway.
+
+The fake answers 429 once more than --quota requests start within a --window second window,
+like a per-minute key quota in miniature. Half the sessions ask the same hot question; an OCR
+batch runs in the background to show the Researcher lane jumping the queue.
+
+    python -m benchmarks.bench_gateway [--sessions 40] [--quota 20] [--window 2] [--latency 0.3]
+"""
+import argparse
+import collections
+import os
+import tempfile
+import threading
+import time
+
+import ai_cache
+import gateway
+from fake_model import FakeModel
+
+
+class QuotaModel(FakeModel):
+    def __init__(self, quota, window, **kwargs):
+        super().__init__(**kwargs)
+        self.quota, self.window = quota, window
+        self.starts = collections.deque()
+        self.rejected = 0
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        with self._lock:
+            now = time.monotonic()
+            while self.starts and now - self.starts[0] > self.window: self.starts.popleft()
+            if len(self.starts) >= self.quota:
+                self.rejected += 1
+                raise RuntimeError("429 Resource has been exhausted (e.g. check quota).")
+            self.starts.append(now)
+        return super().generate_content(contents, stream=stream, **kwargs)
+
+
+def pct(values, q):
+    if not values: return "    -"
+    values = sorted(values)
+    return f"{values[min(len(values) - 1, int(len(values) * q))]:.2f}s"
+
+
+def run(args, use_gateway):
+    fake = QuotaModel(args.quota, args.window, latency=args.latency, size=800)
+    tmp = tempfile.mkdtemp()
+    # per_minute scaled so the bucket matches the fake's window quota
+    gw = gateway.Gateway(per_minute=args.quota * 60 / args.window, burst=args.quota // 2, max_retries=6) if use_gateway else None
+    model = ai_cache.CachedModel(fake, ai_cache.ResponseCache(os.path.join(tmp, "c.db"), disabled=ai_cache.FEATURES), gw)
+    research, ocr, errors = [], [], collections.Counter()
+    lock = threading.Lock()
+
+    def ask(i):
+        prompt = "Provide 3 SC citations for: bail in NDPS cases" if i % 2 else f"Provide 3 SC citations for: question {i}"
+        start = time.perf_counter()
+        try:
+            model.generate_content(prompt, feature="researcher")
+            with lock: research.append(time.perf_counter() - start)
+        except RuntimeError:
+            with lock: errors["researcher"] += 1
+
+    def scan(i):
+        start = time.perf_counter()
+        try:
+            model.generate_content([f"Extract page {i}", b"page-bytes-%d" % i], feature="scanner")
+            with lock: ocr.append(time.perf_counter() - start)
+        except RuntimeError:
+            with lock: errors["scanner"] += 1
+
+    threads = [threading.Thread(target=scan, args=(i,)) for i in range(args.sessions)]
+    for t in threads: t.start()
+    time.sleep(0.05)  # the batch is already queued when the advocates arrive
+    more = [threading.Thread(target=ask, args=(i,)) for i in range(args.sessions)]
+    for t in more: t.start()
+    start = time.perf_counter()
+    for t in threads + more: t.join()
+    label = "gateway" if use_gateway else "direct "
+    print(f"{label}: upstream calls {fake.calls:3d} (429s {fake.rejected:3d}) | failed researcher {errors['researcher']:2d} scanner {errors['scanner']:2d} | "
+          f"researcher p50 {pct(research, 0.5)} p95 {pct(research, 0.95)} | ocr p50 {pct(ocr, 0.5)} | wall {time.perf_counter() - start:.1f}s")
+    if gw: print(f"         counters: {dict(sorted(gw.stats().items()))}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=40, help="researchers, and also OCR pages")
+    ap.add_argument("--quota", type=int, default=20)
+    ap.add_argument("--window", type=float, default=2.0)
+    ap.add_argument("--latency", type=float, default=0.3)
+    args = ap.parse_args()
+    gateway.BACKOFF_MAX = args.window  # back off on the scale of the fake quota window
+    run(args, use_gateway=False)
+    run(args, use_gateway=True)
+
+
+if __name__ == "__main__":
+    main()
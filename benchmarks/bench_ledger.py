@@ -0,0 +1,82 @@
+"""Billing at scale: bulk CSV import throughput and Billing-tab render latency.
+
+    python -m benchmarks.bench_ledger [--invoices 100000]
+"""
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import db
+import ledger
+
+LEGACY_ROWS = 2000  # the one-invoice-per-commit path is too slow to run at full scale
+
+
+def make_csv(rng, n):
+    lines = ["client_name,amount,date"]
+    start = datetime.date(2019, 1, 1)
+    for _ in range(n):
+        day = start + datetime.timedelta(days=rng.randint(0, 7 * 365))
+        lines.append(f"Client {rng.randint(1, 800)},{rng.randint(500, 250000)}.00,{day}")
+    return "\n".join(lines).encode()
+
+
+def median_ms(fn, repeat=15):
+    out = []
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); out.append((time.perf_counter() - t) * 1000)
+    return statistics.median(out)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--invoices", type=int, default=100000)
+    args = ap.parse_args()
+    rng = random.Random(5)
+    data = make_csv(rng, args.invoices)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ledger.db")
+        pool = db.ConnectionPool(path)
+        report = ledger.import_csv(pool, "adv", data)
+        print(f"bulk import: {report.inserted} rows in {report.seconds:.2f}s = {report.rows_per_second:,.0f} rows/s")
+
+        # Original path: one connect + INSERT + commit per invoice.
+        rows = [ledger.parse_row(r) for r in
+                (dict(zip(("client_name", "amount", "date"), line.split(","))) for line in data.decode().splitlines()[1:LEGACY_ROWS + 1])]
+        legacy_path = os.path.join(tmp, "legacy.db")
+        sqlite3.connect(legacy_path).execute('CREATE TABLE invoices (id INTEGER PRIMARY KEY, username TEXT, client_name TEXT, amount REAL, date TEXT)')
+        t = time.perf_counter()
+        for client, amount, date in rows:
+            conn = sqlite3.connect(legacy_path)
+            conn.execute(db.SQL_ADD_INVOICE, ("adv", client, amount, date)); conn.commit(); conn.close()
+        legacy = len(rows) / (time.perf_counter() - t)
+        print(f"per-row commit (old form): {legacy:,.0f} rows/s over {len(rows)} rows")
+
+        def old_render():
+            conn = sqlite3.connect(path)
+            rows = conn.execute('SELECT client_name, amount, date FROM invoices WHERE username=?', ("adv",)).fetchall()
+            conn.close()
+            return [f"👤 {r[0]} | Rs.{r[1]} | 📅 {r[2]}" for r in rows]
+
+        def new_render():
+            ledger.grand_total(pool, "adv")
+            ledger.page(pool, "adv", 0)
+            ledger.client_totals(pool, "adv")
+            ledger.month_totals(pool, "adv")
+
+        def deep_page():
+            ledger.page(pool, "adv", args.invoices // ledger.PAGE_SIZE // 2)
+
+        print(f"render data, {args.invoices} invoices: all rows + captions {median_ms(old_render):.1f} ms "
+              f"({args.invoices} widgets) | page + summaries {median_ms(new_render):.2f} ms (1 table) | "
+              f"middle page {median_ms(deep_page):.2f} ms")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
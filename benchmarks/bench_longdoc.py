@@ -0,0 +1,97 @@
+"""Long drafts at 10, 100 and 500 pages: sanitizer, Predict Probability map/reduce and PDF export,
+each against the single-shot code it replaces. Peak memory is traced Python allocation.
+
+The model is fake_model.FakeModel (--latency per call, --note chars per answer); the PDF rows
+need fpdf2 installed and are skipped otherwise.
+
+    python -m benchmarks.bench_longdoc [--pages 10,100,500] [--latency 2.0] [--note 1200] [--workers 4]
+"""
+import argparse
+import time
+import tracemalloc
+
+import longdoc
+import pdfgen
+from fake_model import FakeModel
+
+# Roughly one A4 page at Arial 11 / 10 mm lines, with the typography Word pastes in.
+PAGE = ("FACTS OF THE CASE\n"
+        + "".join(f"{n}. That the Respondent’s cheque for ₹ 2,50,000 — drawn on 1{n}.03.2024 — was returned “unpaid” with the "
+                  f"remark “funds insufficient”, and despite the statutory notice the amount remains unpaid …\n" for n in range(1, 9))
+        + "\nPRAYER\nIt is therefore most respectfully prayed that this Hon’ble Court may be pleased to take cognizance.\n\n")
+
+
+def old_safe_unicode(text):
+    """The sanitizer before long-document mode: eight passes and a round trip over the whole draft."""
+    replacements = {"₹": "Rs.", "—": "-", "‘": "'", "’": "'", "“": '"', "”": '"', "…": "...", "–": "-"}
+    for k, v in replacements.items(): text = text.replace(k, v)
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+
+def old_render_pdf(content, title):
+    pdf = pdfgen._new_document()
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(200, 10, txt=title.upper(), ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_font("Arial", size=11)
+    pdf.multi_cell(0, 10, txt=old_safe_unicode(content))
+    return bytes(pdf.output())
+
+
+def new_sanitize(text):
+    return sum(len(line) for line in pdfgen._lines(text))
+
+
+def measure(fn, *args):
+    """(seconds, peak MB, result)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+        return time.perf_counter() - start, tracemalloc.get_traced_memory()[1] / 2 ** 20, result
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", default="10,100,500")
+    ap.add_argument("--latency", type=float, default=2.0, help="fake model seconds per call")
+    ap.add_argument("--note", type=int, default=1200, help="fake model answer length (chars)")
+    ap.add_argument("--workers", type=int, default=longdoc.MAX_WORKERS)
+    args = ap.parse_args()
+    longdoc.MAX_WORKERS = args.workers
+    try:
+        pdfgen._new_document()
+        has_fpdf = True
+    except ImportError:
+        has_fpdf = False
+        print("fpdf2 is not installed: PDF rows skipped")
+
+    print(f"{'pages':>6}{'tokens':>9} | {'sanitize old':>13}{'new':>9}{'old MB':>8}{'new MB':>8} | "
+          f"{'parts':>6}{'calls':>6}{'max req tok':>12}{'final tok':>10}{'map+fold s':>11}{'serial s':>9}")
+    for pages in [int(p) for p in args.pages.split(',')]:
+        text = PAGE * pages
+        s_old, m_old, _ = measure(old_safe_unicode, text)
+        s_new, m_new, _ = measure(new_sanitize, text)
+
+        model = FakeModel(latency=args.latency, size=args.note)
+        requests = []
+        send = model.generate_content
+        model.generate_content = lambda contents, **kw: requests.append(longdoc.tokens(contents)) or send(contents, **kw)
+        start = time.perf_counter()
+        prompt = longdoc.predict_prompt(model, text, "Criminal")
+        wall = time.perf_counter() - start
+        n_parts = len(longdoc.parts(text)) if longdoc.needs_split(text) else 1
+        print(f"{pages:>6}{longdoc.tokens(text):>9} | {s_old * 1000:>10.1f} ms{s_new * 1000:>6.1f} ms{m_old:>8.1f}{m_new:>8.1f} | "
+              f"{n_parts:>6}{model.calls:>6}{max(requests + [longdoc.tokens(prompt)]):>12}{longdoc.tokens(prompt):>10}"
+              f"{wall:>11.1f}{len(requests) * args.latency:>9.1f}")
+        if has_fpdf:
+            for label, fn in (("single multi_cell", old_render_pdf), ("line by line", pdfgen.render_pdf)):
+                seconds, peak, data = measure(fn, text, "Complaint")
+                print(f"{'':>6}  pdf {label:<18} {seconds:6.2f} s  peak {peak:7.1f} MB  {len(data) / 2 ** 20:6.2f} MB out")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Researcher traffic replayed against the local precedent index: how many questions skip the model,
+and what each path costs.
+
+A firm asks rephrasings of --topics recurring questions (Zipf-weighted, like bail and Section 138
+dominating). A fake model answers each with 3 formatted citations after --latency seconds. The
+index is first padded with --preload unrelated citations so lookups run at a realistic size.
+
+    python -m benchmarks.bench_precedents [--queries 500] [--topics 100] [--preload 20000] [--latency 1.5]
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import db
+import precedents
+from benchmarks.bench_search import LEGAL
+
+FILLERS = ["what are the", "conditions for", "latest view on", "cases about", "when is", "position on", "grounds of"]
+
+
+def topic_words(rng, n):
+    return [rng.sample(LEGAL, 3) for _ in range(n)]
+
+
+SERIALS = itertools.count()
+
+
+def answer(rng, words, n=3):
+    """What Gemini tends to return: a numbered list of case name, reporter citation and a one-line holding.
+    Citations never repeat, so a served citation whose holding is off topic was a wrong match."""
+    lines = []
+    for i in range(n):
+        serial = next(SERIALS)
+        year, vol, page = 1950 + serial % 75, serial // 75 % 12 + 1, serial // 900 + 1
+        lines.append(f"{i + 1}. **{rng.choice(LEGAL).title()} {rng.randint(1, 9999)} v. State of {rng.choice(LEGAL).title()}**, "
+                     f"({year}) {vol} SCC {page}: held on {' '.join(rng.sample(words, len(words)))}.")
+    return "Here are 3 Supreme Court citations:\n\n" + "\n".join(lines)
+
+
+def rephrase(rng, words):
+    return f"{rng.choice(FILLERS)} {' '.join(rng.sample(words, len(words)))}"
+
+
+def pct(values, q):
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--topics", type=int, default=100)
+    ap.add_argument("--preload", type=int, default=20000, help="unrelated citations already in the index")
+    ap.add_argument("--latency", type=float, default=1.5, help="fake model answer time (s)")
+    args = ap.parse_args()
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.ConnectionPool(os.path.join(tmp, "bench.db"))
+        t = time.perf_counter()
+        for i in range(0, args.preload, 3):
+            precedents.learn(pool, rng.choice(["Civil", "Criminal"]), f"old question {i} w{i}", answer(rng, [f"w{i}", f"x{i}"]))
+        print(f"preloaded {sum(n for n, _ in precedents.stats(pool).values()):,} citations in {time.perf_counter() - t:.1f}s")
+
+        topics = topic_words(rng, args.topics)
+        weights = list(itertools.accumulate(1.0 / (r + 1) for r in range(args.topics)))
+        served, asked, lookups, misses, off_topic = [], [], [], 0, 0
+        for _ in range(args.queries):
+            words = rng.choices(topics, cum_weights=weights)[0]
+            scope = "Criminal" if "bail" in words else "Civil"
+            q = rephrase(rng, words)
+            found = precedents.lookup(pool, q, scope=scope)
+            lookups.append(found.seconds)
+            if found.strong:
+                precedents.served(pool, found)
+                served.append(found.seconds)
+                # every fake holding names its topic's words, so a stray citation is easy to spot
+                off_topic += any(not all(w in r.holding for w in words) for r in found.records)
+                continue
+            misses += 1
+            asked.append(found.seconds + args.latency)  # the model is simulated, not slept on
+            precedents.learn(pool, scope, q, answer(rng, words))
+
+        total = sum(served) + sum(asked)
+        print(f"{args.queries} questions over {args.topics} topics: {len(served)} served from the index "
+              f"({len(served) / args.queries:.0%}, {off_topic} with an off-topic citation), {misses} went to the model")
+        print(f"index lookup  p50 {pct(lookups, 0.5) * 1000:6.2f} ms  p95 {pct(lookups, 0.95) * 1000:6.2f} ms  "
+              f"mean {statistics.mean(lookups) * 1000:.2f} ms")
+        print(f"model path    p50 {pct(asked, 0.5):6.2f} s   (lookup + {args.latency:.1f}s answer)")
+        print(f"time to answer: {total:.0f}s with the index vs {args.queries * args.latency:.0f}s always asking the model")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Draft search latency at growing table sizes: FTS5/bm25 top-20 vs. the LIKE scan it replaces.
+
+The LIKE column fetches every match, since ranking needs them all.
+
+    python -m benchmarks.bench_search [--scales 10000,100000,1000000]
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import db
+
+LEGAL = ("bail accused section crpc anticipatory custody sessions court petitioner respondent tenancy rent lease "
+         "landlord eviction notice cheque dishonour negotiable instruments demand arrears property suit decree "
+         "injunction divorce maintenance custody hearing adjourned affidavit evidence witness investigation fir "
+         "charge sheet magistrate high supreme appeal revision order judgment plaintiff defendant").split()
+# Zipf-distributed vocabulary: filler tokens take the head (like "the", "of"), legal terms
+# sit in the mid ranks, as they do in real drafts.
+VOCAB = [f"w{i}" for i in range(20000)]
+for n, term in enumerate(LEGAL): VOCAB.insert(50 + 40 * n, term)
+CUM_WEIGHTS = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(VOCAB))))
+QUERIES = ["anticipatory bail", "cheque dishonour notice", "eviction arrears", "section 438", "injunction suit property",
+           "maintenance", "charge sheet witness"]
+USERS = [f"adv{i}" for i in range(50)]
+# A few heavy users own most drafts; queries run as the heaviest one (adv0).
+USER_WEIGHTS = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(USERS))))
+
+
+def fill(pool, start, stop, rng):
+    rows = []
+    for i in range(start, stop):
+        words = rng.choices(VOCAB, cum_weights=CUM_WEIGHTS, k=120) + [str(rng.randint(100, 500))]
+        rows.append((rng.choices(USERS, cum_weights=USER_WEIGHTS)[0], rng.choice(["Civil", "Criminal"]), rng.choice(["Bail", "Notice", "Suit"]),
+                     " ".join(words), "2026-01-01"))
+    with pool.connection() as conn:
+        conn.executemany(db.SQL_ADD_DRAFT, rows)
+
+
+def timed(fn, repeat):
+    out = []
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); out.append((time.perf_counter() - t) * 1000)
+    out.sort()
+    return statistics.median(out), out[min(len(out) - 1, int(len(out) * 0.95))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scales", default="10000,100000,1000000")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = db.ConnectionPool(os.path.join(tmp, "bench.db"))
+        have = 0
+        print(f"{'drafts':>9} {'load s':>8} {'fts p50 ms':>11} {'fts p95 ms':>11} {'like p50 ms':>12} {'like p95 ms':>12}")
+        for scale in map(int, args.scales.split(",")):
+            t = time.perf_counter()
+            for chunk in range(have, scale, 50000): fill(pool, chunk, min(scale, chunk + 50000), rng)
+            load = time.perf_counter() - t
+            have = scale
+            user = USERS[0]
+
+            def fts():
+                for q in QUERIES: db.search_drafts(pool, user, q)
+
+            def like():
+                with pool.connection() as conn:
+                    for q in QUERIES:
+                        conn.execute("SELECT id FROM drafts WHERE username=? AND content LIKE ?",
+                                     (user, f"%{q}%")).fetchall()
+
+            f50, f95 = timed(fts, args.repeat)
+            l50, l95 = timed(like, max(3, args.repeat // 4))
+            n = len(QUERIES)
+            print(f"{scale:>9} {load:>8.1f} {f50 / n:>11.2f} {f95 / n:>11.2f} {l50 / n:>12.2f} {l95 / n:>12.2f}")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
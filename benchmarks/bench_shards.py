@@ -0,0 +1,73 @@
+"""Write throughput with N advocates writing at once: one shared file vs hash buckets vs a file each.
+
+Each simulated advocate is a thread doing what the app does on a save: add a hearing, save an
+invoice (with its summary rows) and save a new draft version, each its own transaction, for
+--seconds. Files start empty, so the numbers are the cost of contention, not of table size.
+
+    python -m benchmarks.bench_shards [--users 1,8,32] [--seconds 5] [--buckets 8]
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import db
+import draft_store
+import ledger
+from benchmarks.bench_app import pct
+
+
+def advocate(store, username, stop, latencies, errors):
+    pool = store.pool(username)
+    today = datetime.date.today()
+    draft_id, n = None, 0
+    while not stop.is_set():
+        n += 1
+        for op in ('hearing', 'invoice', 'draft'):
+            start = time.perf_counter()
+            try:
+                if op == 'hearing': db.add_hearing(pool, username, f"Case {n}", today)
+                elif op == 'invoice': ledger.add_invoice(pool, username, f"Client {n % 40}", 1000.0 + n, today)
+                else: draft_id = draft_store.save(pool, username, draft_id, "Notice", f"Draft revision {n}. " * 40, today)[0]
+                latencies.append(time.perf_counter() - start)
+            except sqlite3.OperationalError:  # "database is locked" once busy_timeout runs out
+                errors.append(op)
+
+
+def run(layout, users, seconds, buckets):
+    with tempfile.TemporaryDirectory() as tmp:
+        shard_dir = None if layout == "single file" else os.path.join(tmp, "shards")
+        store = db.Store(os.path.join(tmp, "directory.db"), shard_dir, buckets if layout == "buckets" else 0)
+        names = [f"adv{i}" for i in range(users)]
+        for name in names: store.pool(name)  # files created and migrated before the clock starts
+        stop, latencies, errors = threading.Event(), [], []
+        threads = [threading.Thread(target=advocate, args=(store, name, stop, latencies, errors)) for name in names]
+        start = time.perf_counter()
+        for t in threads: t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads: t.join()
+        wall = time.perf_counter() - start
+        files = len({store.shard_path(name) for name in names})
+        store.close()
+    print(f"{users:>6}  {layout:<12}{files:>6}{len(latencies) / wall:>10.0f}{pct(latencies, 0.5) * 1000:>9.2f}"
+          f"{pct(latencies, 0.95) * 1000:>9.2f}{pct(latencies, 0.99) * 1000:>9.2f}{len(errors):>8}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", default="1,8,32", help="concurrent advocates per run")
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--buckets", type=int, default=8)
+    args = ap.parse_args()
+    print(f"{'users':>6}  {'layout':<12}{'files':>6}{'writes/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'locked':>8}")
+    for users in [int(u) for u in args.users.split(',')]:
+        for layout in ("single file", "buckets", "per user"):
+            run(layout, users, args.seconds, args.buckets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Cold-start and warm-rerun time of the Streamlit apps, driven headlessly with AppTest.
+
+Each cold sample is a fresh interpreter, so it includes every import the script
+triggers; warm samples are reruns in the same session. Also lists which heavy
+dependencies were loaded by the time the page finished. Pass --rev to measure
+the app file as of an older commit for a before/after comparison. st.tabs only
+hides tabs client-side, so every tab body runs on each rerun and 'dashboard'
+is the cost of all five.
+
+    python -m benchmarks.bench_startup [--app main.py] [--runs 5] [--reruns 20] [--rev HEAD~1]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('google.generativeai', 'fpdf', 'PIL', 'smtplib', 'pypdfium2')
+VIEWS = ('login', 'dashboard')
+SECRETS = {"GEMINI_API_KEY": "bench", "SENDER_EMAIL": "bench@localhost", "SENDER_APP_PASSWORD": "",
+           "SMTP_HOST": "127.0.0.1", "SMTP_PORT": 2525, "SMTP_SSL": False}
+
+
+def child(script, view, reruns):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(script, default_timeout=60)
+    for k, v in SECRETS.items(): at.secrets[k] = v
+    if view == 'dashboard':  # both apps' session keys, so either script sees a logged-in advocate
+        for k, v in dict(auth=True, user="bench", enroll="KAR/0/2020", user_name="bench", enroll_id="KAR/0/2020").items():
+            at.session_state[k] = v
+    t = time.perf_counter(); at.run(); cold = (time.perf_counter() - t) * 1000
+    if at.exception: raise SystemExit(f"{script} raised: {at.exception[0].value}")
+    loaded = [m for m in HEAVY if m in sys.modules]
+    warm = []
+    for _ in range(reruns):
+        t = time.perf_counter(); at.run(); warm.append((time.perf_counter() - t) * 1000)
+    print(json.dumps({"cold": cold, "warm": warm, "loaded": loaded}))
+
+
+def script_at(app, rev, workdir):
+    if not rev: return os.path.join(ROOT, app)
+    path = os.path.join(workdir, f"{rev.replace('/', '_').replace('~', '-')}_{app}")
+    with open(path, 'wb') as f: f.write(subprocess.check_output(['git', 'show', f'{rev}:{app}'], cwd=ROOT))
+    return path
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--app", default="main.py", choices=["main.py", "a.py"])
+    ap.add_argument("--runs", type=int, default=5, help="cold starts per view")
+    ap.add_argument("--reruns", type=int, default=20, help="warm reruns per cold start")
+    ap.add_argument("--rev", default=None, help="git revision of the app file to measure (default: working tree)")
+    ap.add_argument("--child", nargs=2, metavar=("SCRIPT", "VIEW"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child: return child(*args.child, args.reruns)
+
+    with tempfile.TemporaryDirectory() as workdir:  # fresh DB and caches, nothing from a real install
+        script = script_at(args.app, args.rev, workdir)
+        env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+        print(f"{args.app} @ {args.rev or 'working tree'}: {args.runs} cold starts x {args.reruns} reruns")
+        for view in VIEWS:
+            cold, warm, loaded = [], [], set()
+            for _ in range(args.runs):
+                out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--reruns', str(args.reruns),
+                                      '--child', script, view], cwd=workdir, env=env, capture_output=True, text=True)
+                if out.returncode: raise SystemExit(out.stderr or out.stdout)
+                sample = json.loads(out.stdout.strip().splitlines()[-1])
+                cold.append(sample["cold"]); warm += sample["warm"]; loaded.update(sample["loaded"])
+            print(f"  {view:<10} cold p50 {statistics.median(cold):7.0f} ms  p95 {pct(cold, 0.95):7.0f} ms | "
+                  f"warm p50 {statistics.median(warm):6.1f} ms  p95 {pct(warm, 0.95):6.1f} ms | "
+                  f"heavy imports: {', '.join(sorted(loaded)) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
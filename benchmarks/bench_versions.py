@@ -0,0 +1,78 @@
+"""Storage and save latency: one full drafts row per save (old scheme) vs. versioned deltas.
+
+    python -m benchmarks.bench_versions [--pages 20] [--saves 200]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import db
+import draft_store
+
+WORDS_PER_PAGE = 450
+
+
+def petition(rng, pages):
+    words = "the petitioner respectfully submits that accused bail section court order custody hearing".split()
+    sentences = [" ".join(rng.choices(words, k=15)).capitalize() + "." for _ in range(pages * WORDS_PER_PAGE // 15)]
+    return "\n".join(" ".join(sentences[i:i + 6]) for i in range(0, len(sentences), 6))
+
+
+def edit(rng, text):
+    """Typical editing session step: change a sentence, sometimes append a paragraph, sometimes nothing."""
+    roll = rng.random()
+    if roll < 0.15: return text  # re-save without changes
+    if roll < 0.30: return text + "\nThat the applicant undertakes to abide by any condition imposed."
+    cut = rng.randrange(len(text))
+    end = text.find(".", cut)
+    return text[:cut] + " amended clause number %d" % rng.randint(1, 999) + text[end if end != -1 else cut:]
+
+
+def db_bytes(pool):
+    with pool.connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def pct(xs, q):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * q))] * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=20)
+    ap.add_argument("--saves", type=int, default=200)
+    args = ap.parse_args()
+    rng = random.Random(3)
+    texts = [petition(rng, args.pages)]
+    for _ in range(args.saves - 1): texts.append(edit(rng, texts[-1]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old, new = db.ConnectionPool(os.path.join(tmp, "old.db")), db.ConnectionPool(os.path.join(tmp, "new.db"))
+        base_old, base_new = db_bytes(old), db_bytes(new)
+        old_lat, new_lat = [], []
+        draft_id = None
+        for text in texts:
+            t = time.perf_counter(); db.add_draft(old, "adv", "Bail", text, "2026-01-01"); old_lat.append(time.perf_counter() - t)
+            t = time.perf_counter(); draft_id, _, _ = draft_store.save(new, "adv", draft_id, "Bail", text, "2026-01-01"); new_lat.append(time.perf_counter() - t)
+        versions = draft_store.history(new, "adv", draft_id)
+        rebuild = []
+        for _ in range(50):
+            v = rng.randint(1, len(versions))
+            t = time.perf_counter(); draft_store.load_version(new, "adv", draft_id, v); rebuild.append(time.perf_counter() - t)
+
+        size_old, size_new = db_bytes(old) - base_old, db_bytes(new) - base_new
+        print(f"{args.saves} saves of a {args.pages}-page draft ({len(texts[-1]) / 1024:.0f} KB), {len(versions)} distinct versions")
+        print(f"{'scheme':<22}{'db growth':>12}{'save p50 ms':>13}{'save p95 ms':>13}")
+        print(f"{'full row per save':<22}{size_old / 1024 / 1024:>10.1f}MB{pct(old_lat, .5):>13.2f}{pct(old_lat, .95):>13.2f}")
+        print(f"{'versioned deltas':<22}{size_new / 1024 / 1024:>10.1f}MB{pct(new_lat, .5):>13.2f}{pct(new_lat, .95):>13.2f}")
+        print(f"reconstruct any version: p50 {pct(rebuild, .5):.2f} ms, max {max(rebuild) * 1000:.2f} ms "
+              f"(payload {sum(v[2] for v in versions) / 1024:.0f} KB for {sum(v[3] for v in versions) / 1024 / 1024:.1f} MB of text)")
+        old.close(); new.close()
+
+
+if __name__ == "__main__":
+    main()
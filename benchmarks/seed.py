@@ -0,0 +1,72 @@
+"""Synthetic users, hearings, drafts and invoices for an advocate_elite.db at a given scale.
+
+Every user's password is PASSWORD. Row ownership is Zipf-skewed, so USERS[0] is the heaviest
+account, and that is the one the benchmarks log in as.
+
+    python -m benchmarks.seed --rows 100000 [--db advocate_elite.db]
+"""
+import argparse
+import datetime
+import hashlib
+import itertools
+import random
+
+import db
+import ledger
+from benchmarks.bench_search import CUM_WEIGHTS, VOCAB
+
+PASSWORD = "bench"
+USERS = [f"adv{i}" for i in range(50)]
+USER_WEIGHTS = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(USERS))))
+DOC_TYPES = ["Property Notice", "Rent Agreement", "Regular Bail Application", "Section 138 Notice"]
+BATCH = 5000
+TODAY = datetime.date.today()
+
+
+def _owner(rng):
+    return rng.choices(USERS, cum_weights=USER_WEIGHTS)[0]
+
+
+def _day(rng, back, ahead):
+    return str(TODAY + datetime.timedelta(days=rng.randint(-back, ahead)))
+
+
+def _batches(rows):
+    it = iter(rows)
+    while batch := list(itertools.islice(it, BATCH)): yield batch
+
+
+def seed(pool, rows, rng=None):
+    """`rows` hearings, drafts and invoices each, spread over USERS."""
+    rng = rng or random.Random(0)
+    password = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    with pool.connection() as conn:
+        conn.executemany('INSERT OR IGNORE INTO users (username, password, enroll_id) VALUES (?,?,?)',
+                         [(u, password, f"KAR/{i}/2015") for i, u in enumerate(USERS)])
+    hearings = ((_owner(rng), f"Case {i}", rng.choice(["Civil", "Criminal"]), _day(rng, 365, 365)) for i in range(rows))
+    for batch in _batches(hearings):
+        with pool.connection() as conn: conn.executemany(db.SQL_ADD_HEARING, batch)
+    drafts = ((_owner(rng), rng.choice(["Civil", "Criminal"]), rng.choice(DOC_TYPES),
+               " ".join(rng.choices(VOCAB, cum_weights=CUM_WEIGHTS, k=150)), _day(rng, 3 * 365, 0)) for _ in range(rows))
+    for batch in _batches(drafts):
+        with pool.connection() as conn: conn.executemany(db.SQL_ADD_DRAFT, batch)
+    by_user = {}
+    for _ in range(rows):
+        by_user.setdefault(_owner(rng), []).append(f"Client {rng.randint(1, 400)},{rng.randint(500, 250000)}.00,{_day(rng, 3 * 365, 0)}")
+    for user, lines in by_user.items():
+        ledger.import_csv(pool, user, "client_name,amount,date\n" + "\n".join(lines))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10000, help="hearings, drafts and invoices each")
+    ap.add_argument("--db", default=db.DB_PATH)
+    args = ap.parse_args()
+    pool = db.ConnectionPool(args.db)
+    seed(pool, args.rows)
+    pool.close()
+    print(f"seeded {args.db}: {len(USERS)} users (password {PASSWORD!r}), {args.rows} hearings/drafts/invoices each")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Local SMTP server that accepts and counts every message, for benchmarks and offline runs.
+
+It advertises no AUTH, so the outbox worker skips login.
+
+    python -m benchmarks.smtp_sink [--port 2525]
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 sink ready")
+        data, lines = False, []
+        for raw in self.rfile:
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            if data:
+                if line == '.':
+                    data = False
+                    self.server.sink.record(lines)
+                    lines = []
+                    self.reply("250 queued")
+                else:
+                    lines.append(line[1:] if line.startswith('..') else line)
+                continue
+            verb = line[:4].upper()
+            if verb == 'EHLO': self.wfile.write(b"250-sink\r\n250 8BITMIME\r\n")
+            elif verb == 'DATA': data = True; self.reply("354 end with .")
+            elif verb == 'QUIT': self.reply("221 bye"); return
+            else: self.reply("250 ok")  # HELO, MAIL, RCPT, RSET, NOOP
+
+
+class SmtpSink:
+    def __init__(self, host='127.0.0.1', port=0):
+        self.messages = 0
+        self.bytes = 0
+        self.received = []  # perf_counter() per message
+        self._lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.sink = self
+        self.host, self.port = self.server.server_address
+
+    def record(self, lines):
+        with self._lock:
+            self.messages += 1
+            self.bytes += sum(len(l) + 2 for l in lines)
+            self.received.append(time.perf_counter())
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="smtp-sink", daemon=True).start()
+        return self
+
+    def wait_for(self, count, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while self.messages < count and time.monotonic() < deadline: time.sleep(0.05)
+        return self.messages >= count
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=2525)
+    args = ap.parse_args()
+    sink = SmtpSink(port=args.port)
+    print(f"SMTP sink on {sink.host}:{sink.port} (set SMTP_HOST/SMTP_PORT, SMTP_SSL = false)")
+    try:
+        sink.server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{sink.messages} messages, {sink.bytes / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""Shared data layer: pooled WAL-mode SQLite, versioned migrations and repositories."""
+import collections
+import contextlib
+import hashlib
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+import telemetry
+
+try:
+    import streamlit as st
+    cache_resource = st.cache_resource
+except ImportError:  # headless tools (CLI, benchmarks) run without streamlit
+    import functools
+    cache_resource = functools.lru_cache(maxsize=None)
+
+DB_PATH = 'advocate_elite.db'
+POOL_SIZE = 8
+RETIRED_POLL = 0.5  # how often a borrower blocked on a full pool checks whether it was closed
+
+# Applied to every pooled connection. WAL lets the docket/billing readers run
+# alongside a writer instead of failing with "database is locked".
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+# --- 1. CONNECTION POOL ---
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared by every session in the process."""
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self.retired = False  # closed while sessions may still hold it (see close)
+        with self.connection() as conn:
+            migrate(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, cached_statements=256)
+        for pragma in PRAGMAS: conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.size and not self.retired:
+                    self._created += 1
+                    return self._connect()
+            while True:
+                if self.retired: return self._connect()  # closed again when it comes back
+                try: return self._idle.get(timeout=RETIRED_POLL)
+                except queue.Empty: pass
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error.
+
+        Timed (wait + work + commit) under the name of the function doing `with pool.connection()`.
+        """
+        op = sys._getframe(2).f_code.co_name
+        start, error = time.perf_counter(), False
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            error = True
+            conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+            telemetry.observe('db', op, time.perf_counter() - start, error)
+
+    def _release(self, conn):
+        if self.retired: return conn.close()
+        try: self._idle.put_nowait(conn)
+        except queue.Full: return conn.close()
+        if self.retired: self._drain()  # close() ran between the check and the put and missed it
+
+    def _drain(self):
+        while True:
+            try: self._idle.get_nowait().close()
+            except queue.Empty: break
+
+    def close(self):
+        """Retire the pool: idle connections close now, borrowed ones when they are returned. Safe
+        while other sessions still hold it (Store evicts shard pools that way); later borrowers get a
+        one-off connection instead of waiting on the pool."""
+        self.retired = True
+        self._drain()
+
+
+# --- 1b. TENANT SHARDS ---
+SHARD_POOL_SIZE = 2
+MAX_OPEN_SHARDS = 64
+# Everything keyed by an advocate; users, the outbox and the precedent index stay in the directory.
+USER_TABLES = ('hearings', 'drafts', 'draft_versions', 'invoices', 'invoice_client_totals', 'invoice_month_totals')
+
+
+def shard_file(username, buckets=0):
+    """One file per advocate, or with `buckets` one of that many files by a stable hash of the name."""
+    digest = hashlib.sha1(username.encode('utf-8')).hexdigest()
+    if buckets: return f"bucket_{int(digest[:8], 16) % buckets:03d}.db"
+    return f"user_{re.sub(r'[^A-Za-z0-9_-]', '_', username)[:40]}_{digest[:8]}.db"
+
+
+class Store:
+    """Routes each advocate to the database holding their data.
+
+    Unsharded (no `shard_dir`) that is the directory itself, as before. Sharded, hearings, drafts
+    and invoices live in per-user (or per-bucket) files, so writers only contend with their own
+    shard; the directory keeps users for login, the outbox and the precedent index.
+    """
+
+    def __init__(self, path=DB_PATH, shard_dir=None, buckets=0):
+        self.directory = ConnectionPool(path)
+        self.shard_dir = shard_dir
+        self.buckets = buckets
+        self._shards = collections.OrderedDict()  # file -> pool, least recently used first
+        self._lock = threading.Lock()
+        if shard_dir: os.makedirs(shard_dir, exist_ok=True)
+
+    def shard_path(self, username):
+        return os.path.join(self.shard_dir, shard_file(username, self.buckets)) if self.shard_dir else self.directory.path
+
+    def pool(self, username):
+        if not self.shard_dir: return self.directory
+        path = self.shard_path(username)
+        with self._lock:
+            pool = self._shards.get(path)
+            if pool is not None:
+                self._shards.move_to_end(path)
+                return pool
+            # Built (and migrated) under the lock, so two sessions opening the same shard cannot
+            # each create a pool and leak the loser's connections. Once per shard per process.
+            pool = self._shards[path] = ConnectionPool(path, SHARD_POOL_SIZE)
+            while len(self._shards) > MAX_OPEN_SHARDS:
+                self._shards.popitem(last=False)[1].close()  # retired: sessions holding it finish normally
+        return pool
+
+    def close(self):
+        with self._lock:
+            for pool in self._shards.values(): pool.close()
+            self._shards.clear()
+        self.directory.close()
+
+
+@cache_resource
+def get_store(path=DB_PATH, shard_dir=None, buckets=0):
+    """Process-wide router; `shard_dir` turns on per-tenant files (see shard_tool.py to move data over)."""
+    return Store(path, shard_dir, buckets)
+
+
+# --- 2. MIGRATIONS ---
+# Canonical layout follows the shipped advocate_elite.db: `category` is the last
+# column of hearings/drafts and defaults to 'Civil'. Older copies of a.py created
+# it in the middle with no default, and main.py did not create it at all.
+CANONICAL_TABLES = {
+    'users': 'CREATE TABLE {name} (username TEXT PRIMARY KEY, password TEXT, enroll_id TEXT)',
+    'hearings': "CREATE TABLE {name} (id INTEGER PRIMARY KEY, username TEXT, case_name TEXT, hearing_date TEXT, category TEXT DEFAULT 'Civil')",
+    'invoices': 'CREATE TABLE {name} (id INTEGER PRIMARY KEY, username TEXT, client_name TEXT, amount REAL, date TEXT)',
+    'drafts': "CREATE TABLE {name} (id INTEGER PRIMARY KEY, username TEXT, doc_type TEXT, content TEXT, date TEXT, category TEXT DEFAULT 'Civil')",
+}
+CANONICAL_COLUMNS = {
+    'hearings': [('id', None), ('username', None), ('case_name', None), ('hearing_date', None), ('category', "'Civil'")],
+    'drafts': [('id', None), ('username', None), ('doc_type', None), ('content', None), ('date', None), ('category', "'Civil'")],
+}
+
+
+def _create_base_tables(conn):
+    for name, ddl in CANONICAL_TABLES.items():
+        conn.execute(ddl.format(name=name).replace('CREATE TABLE', 'CREATE TABLE IF NOT EXISTS', 1))
+
+
+def _normalize_category_columns(conn):
+    """Rebuild hearings/drafts whose column order or `category` default drifted."""
+    for name, wanted in CANONICAL_COLUMNS.items():
+        info = conn.execute(f'PRAGMA table_info({name})').fetchall()
+        if [(col[1], col[4]) for col in info] == wanted: continue
+        present = {col[1] for col in info}
+        cols = [col for col, _ in wanted if col in present]
+        select = ', '.join(cols)
+        conn.execute(CANONICAL_TABLES[name].format(name=f'{name}_new'))
+        conn.execute(f'INSERT INTO {name}_new ({select}) SELECT {select} FROM {name}')
+        conn.execute(f"UPDATE {name}_new SET category='Civil' WHERE category IS NULL")
+        conn.execute(f'DROP TABLE {name}')
+        conn.execute(f'ALTER TABLE {name}_new RENAME TO {name}')
+
+
+def _add_lookup_indexes(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_hearings_user_date ON hearings (username, hearing_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_drafts_user_date ON drafts (username, date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_invoices_user_date ON invoices (username, date)')
+
+
+def _create_outbox(conn):
+    conn.execute('CREATE TABLE outbox (id INTEGER PRIMARY KEY, username TEXT, recipient TEXT, subject TEXT, body TEXT, '
+                 "attachment BLOB, filename TEXT, status TEXT DEFAULT 'queued', attempts INTEGER DEFAULT 0, "
+                 'next_attempt REAL, last_error TEXT, created REAL, sent REAL)')
+    conn.execute('CREATE INDEX idx_outbox_due ON outbox (status, next_attempt)')
+    conn.execute('CREATE INDEX idx_outbox_user ON outbox (username, id)')
+
+
+def _create_draft_search(conn):
+    """External-content FTS5 index over drafts, kept in sync by triggers and backfilled once."""
+    conn.execute("CREATE VIRTUAL TABLE drafts_fts USING fts5(content, doc_type, category, username, "
+                 "content='drafts', content_rowid='id', tokenize='porter unicode61')")
+    conn.execute('CREATE TRIGGER drafts_fts_ai AFTER INSERT ON drafts BEGIN '
+                 'INSERT INTO drafts_fts (rowid, content, doc_type, category, username) '
+                 'VALUES (new.id, new.content, new.doc_type, new.category, new.username); END')
+    conn.execute('CREATE TRIGGER drafts_fts_ad AFTER DELETE ON drafts BEGIN '
+                 "INSERT INTO drafts_fts (drafts_fts, rowid, content, doc_type, category, username) "
+                 "VALUES ('delete', old.id, old.content, old.doc_type, old.category, old.username); END")
+    conn.execute('CREATE TRIGGER drafts_fts_au AFTER UPDATE ON drafts BEGIN '
+                 "INSERT INTO drafts_fts (drafts_fts, rowid, content, doc_type, category, username) "
+                 "VALUES ('delete', old.id, old.content, old.doc_type, old.category, old.username); "
+                 'INSERT INTO drafts_fts (rowid, content, doc_type, category, username) '
+                 'VALUES (new.id, new.content, new.doc_type, new.category, new.username); END')
+    # Default ranking: content, doc_type, category, username (which only scopes, never ranks)
+    conn.execute("INSERT INTO drafts_fts (drafts_fts, rank) VALUES ('rank', 'bm25(1.0, 0.5, 0.5, 0.0)')")
+    conn.execute("INSERT INTO drafts_fts (drafts_fts) VALUES ('rebuild')")
+
+
+def _create_draft_versions(conn):
+    """drafts rows become the head of a version chain stored in draft_versions."""
+    conn.execute('ALTER TABLE drafts ADD COLUMN head_version INTEGER DEFAULT 0')
+    conn.execute('ALTER TABLE drafts ADD COLUMN content_hash TEXT')
+    conn.execute('CREATE TABLE draft_versions (draft_id INTEGER, version INTEGER, kind TEXT, payload BLOB, '
+                 'content_hash TEXT, raw_size INTEGER, created REAL, PRIMARY KEY (draft_id, version)) WITHOUT ROWID')
+
+
+def _create_invoice_summaries(conn):
+    """Per-client and per-month totals, backfilled here and maintained by ledger.py on every write."""
+    conn.execute('CREATE TABLE invoice_client_totals (username TEXT, client_name TEXT, total REAL, invoices INTEGER, '
+                 'PRIMARY KEY (username, client_name)) WITHOUT ROWID')
+    conn.execute('CREATE TABLE invoice_month_totals (username TEXT, month TEXT, total REAL, invoices INTEGER, '
+                 'PRIMARY KEY (username, month)) WITHOUT ROWID')
+    conn.execute("INSERT INTO invoice_client_totals SELECT COALESCE(username, ''), COALESCE(client_name, ''), "
+                 'SUM(amount), COUNT(*) FROM invoices GROUP BY 1, 2')
+    conn.execute("INSERT INTO invoice_month_totals SELECT COALESCE(username, ''), COALESCE(SUBSTR(date, 1, 7), ''), "
+                 'SUM(amount), COUNT(*) FROM invoices GROUP BY 1, 2')
+
+
+def _create_precedents(conn):
+    """Citations parsed out of Researcher answers, with an FTS5 index so repeat questions skip the model."""
+    conn.execute('CREATE TABLE precedents (id INTEGER PRIMARY KEY, scope TEXT, case_name TEXT, year INTEGER, court TEXT, '
+                 'citation TEXT, holding TEXT, topics TEXT, hits INTEGER DEFAULT 0, created REAL, UNIQUE (scope, citation))')
+    conn.execute("CREATE VIRTUAL TABLE precedents_fts USING fts5(case_name, holding, topics, scope, "
+                 "content='precedents', content_rowid='id', tokenize='porter unicode61')")
+    conn.execute('CREATE TRIGGER precedents_fts_ai AFTER INSERT ON precedents BEGIN '
+                 'INSERT INTO precedents_fts (rowid, case_name, holding, topics, scope) '
+                 'VALUES (new.id, new.case_name, new.holding, new.topics, new.scope); END')
+    conn.execute('CREATE TRIGGER precedents_fts_ad AFTER DELETE ON precedents BEGIN '
+                 "INSERT INTO precedents_fts (precedents_fts, rowid, case_name, holding, topics, scope) "
+                 "VALUES ('delete', old.id, old.case_name, old.holding, old.topics, old.scope); END")
+    # Only the indexed columns: bumping `hits` on every served answer must not rewrite the index.
+    conn.execute('CREATE TRIGGER precedents_fts_au AFTER UPDATE OF case_name, holding, topics, scope ON precedents BEGIN '
+                 "INSERT INTO precedents_fts (precedents_fts, rowid, case_name, holding, topics, scope) "
+                 "VALUES ('delete', old.id, old.case_name, old.holding, old.topics, old.scope); "
+                 'INSERT INTO precedents_fts (rowid, case_name, holding, topics, scope) '
+                 'VALUES (new.id, new.case_name, new.holding, new.topics, new.scope); END')
+    # Past questions (topics) say most about what a citation answers; scope only filters.
+    conn.execute("INSERT INTO precedents_fts (precedents_fts, rank) VALUES ('rank', 'bm25(1.0, 0.5, 2.0, 0.0)')")
+
+
+def _create_precedent_questions(conn):
+    """One row per question that found a citation (its significant words, sorted), so a new question is
+    matched against each past question on its own rather than against all of them pooled."""
+    from precedents import question_terms  # the same normalisation lookups use
+    conn.execute('CREATE TABLE precedent_questions (id INTEGER PRIMARY KEY, precedent_id INTEGER, terms TEXT, '
+                 'UNIQUE (precedent_id, terms))')
+    conn.execute("CREATE VIRTUAL TABLE precedent_questions_fts USING fts5(terms, content='precedent_questions', "
+                 "content_rowid='id', tokenize='unicode61')")
+    conn.execute('CREATE TRIGGER precedent_questions_fts_ai AFTER INSERT ON precedent_questions BEGIN '
+                 'INSERT INTO precedent_questions_fts (rowid, terms) VALUES (new.id, new.terms); END')
+    conn.execute('CREATE TRIGGER precedent_questions_fts_ad AFTER DELETE ON precedent_questions BEGIN '
+                 "INSERT INTO precedent_questions_fts (precedent_questions_fts, rowid, terms) VALUES ('delete', old.id, old.terms); END")
+    conn.execute('CREATE TRIGGER precedents_questions_ad AFTER DELETE ON precedents BEGIN '
+                 'DELETE FROM precedent_questions WHERE precedent_id = old.id; END')
+    rows = conn.execute('SELECT id, topics FROM precedents').fetchall()
+    conn.executemany('INSERT OR IGNORE INTO precedent_questions (precedent_id, terms) VALUES (?,?)',
+                     [(i, t) for i, topics in rows for q in (topics or '').split(' | ') if (t := question_terms(q))])
+
+
+# Append-only: each entry runs once and bumps PRAGMA user_version to its number.
+MIGRATIONS = [
+    (1, _create_base_tables),
+    (2, _normalize_category_columns),
+    (3, _add_lookup_indexes),
+    (4, _create_outbox),
+    (5, _create_draft_search),
+    (6, _create_draft_versions),
+    (7, _create_invoice_summaries),
+    (8, _create_precedents),
+    (9, _create_precedent_questions),
+]
+
+
+def migrate(conn):
+    """Apply pending migrations, each in its own transaction."""
+    current = conn.execute('PRAGMA user_version').fetchone()[0]
+    for version, step in MIGRATIONS:
+        if version <= current: continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            step(conn)
+            conn.execute(f'PRAGMA user_version={version}')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+
+# --- 3. REPOSITORIES ---
+# Statements are module constants so sqlite3's per-connection statement cache
+# reuses the prepared form across reruns.
+SQL_GET_USER = 'SELECT password, enroll_id FROM users WHERE username=?'
+SQL_ADD_USER = 'INSERT INTO users (username, password, enroll_id) VALUES (?,?,?)'
+SQL_ADD_HEARING = 'INSERT INTO hearings (username, case_name, category, hearing_date) VALUES (?,?,?,?)'
+SQL_ADD_DRAFT = 'INSERT INTO drafts (username, category, doc_type, content, date) VALUES (?,?,?,?,?)'
+SQL_ADD_INVOICE = 'INSERT INTO invoices (username, client_name, amount, date) VALUES (?,?,?,?)'
+SQL_GET_DRAFT = 'SELECT doc_type, category, content, date FROM drafts WHERE id=? AND username=?'
+# ORDER BY rank lets FTS5 sort internally, so snippet() only runs for the rows returned.
+SQL_SEARCH_DRAFTS = ("SELECT rowid, doc_type, category, snippet(drafts_fts, 0, '**', '**', '…', 16), rank "
+                     'FROM drafts_fts WHERE drafts_fts MATCH ? AND username=? ORDER BY rank LIMIT ?')
+
+
+def get_user(pool, username):
+    with pool.connection() as conn:
+        return conn.execute(SQL_GET_USER, (username,)).fetchone()
+
+
+def create_user(pool, username, password_hash, enroll_id):
+    """Returns False if the username is already taken."""
+    try:
+        with pool.connection() as conn:
+            conn.execute(SQL_ADD_USER, (username, password_hash, enroll_id))
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+
+def add_hearing(pool, username, case_name, hearing_date, category='Civil'):
+    with pool.connection() as conn:
+        conn.execute(SQL_ADD_HEARING, (username, case_name, category, str(hearing_date)))
+
+
+def add_draft(pool, username, doc_type, content, date, category='Civil'):
+    with pool.connection() as conn:
+        conn.execute(SQL_ADD_DRAFT, (username, category, doc_type, content, str(date)))
+
+
+def get_draft(pool, username, draft_id):
+    with pool.connection() as conn:
+        return conn.execute(SQL_GET_DRAFT, (draft_id, username)).fetchone()
+
+
+def fts_query(text):
+    """Turn free text into a safe FTS5 query: every word must match, the last one as a prefix."""
+    words = re.findall(r'\w+', text)
+    if not words: return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_drafts(pool, username, text, limit=20):
+    """[(id, doc_type, category, snippet, bm25)] best match first, only the user's own drafts."""
+    query = fts_query(text)
+    if query is None: return []
+    # Matching the username inside FTS intersects posting lists instead of ranking every user's hits.
+    owner = ' '.join(f'"{w}"' for w in re.findall(r'\w+', username))
+    if owner: query = f'{{username}} : ({owner}) AND {{content doc_type category}} : ({query})'
+    with pool.connection() as conn:
+        return conn.execute(SQL_SEARCH_DRAFTS, (query, username, limit)).fetchall()
+
+
+def rebuild_search_index(pool):
+    """One-shot backfill, e.g. after bulk-loading drafts with the triggers dropped."""
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO drafts_fts (drafts_fts) VALUES ('rebuild')")
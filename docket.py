@@ -0,0 +1,83 @@
+"""Docket: date-range hearing queries with a per-user cache invalidated on write."""
+import calendar
+import collections
+import datetime
+import threading
+
+import db
+
+SIDEBAR_LIMIT = 5
+PAGE_SIZE = 50
+MAX_VIEWS_PER_USER = 64
+
+SQL_RANGE = ('SELECT id, case_name, hearing_date, category FROM hearings '
+             'WHERE username=? AND hearing_date>=? AND hearing_date<? ORDER BY hearing_date, id LIMIT ? OFFSET ?')
+SQL_RANGE_COUNT = 'SELECT COUNT(*) FROM hearings WHERE username=? AND hearing_date>=? AND hearing_date<?'
+
+WINDOWS = {"All upcoming": None, "Next 7 days": 7, "Next 30 days": 30}
+
+_views = {}
+_generation = collections.defaultdict(int)  # bumped per user on every write
+_lock = threading.Lock()
+
+
+# --- 1. CACHED VIEWS ---
+def _cached(username, key, load):
+    """Memoize per user; entries live until that user's next write (or the day rolls over, via `key`)."""
+    with _lock:
+        user_views = _views.setdefault(username, {})
+        if key in user_views: return user_views[key]
+        generation = _generation[username]
+    value = load()
+    with _lock:
+        if _generation[username] != generation: return value  # a write landed mid-load; don't cache
+        user_views = _views.setdefault(username, {})
+        if len(user_views) >= MAX_VIEWS_PER_USER: user_views.clear()  # e.g. views from previous days
+        user_views[key] = value
+    return value
+
+
+def invalidate(username):
+    with _lock:
+        _generation[username] += 1
+        _views.pop(username, None)
+
+
+def add_hearing(pool, username, case_name, hearing_date, category='Civil'):
+    """Write-through: insert, then drop only this user's cached views."""
+    db.add_hearing(pool, username, case_name, hearing_date, category)
+    invalidate(username)
+
+
+# --- 2. RANGE QUERIES ---
+def hearings_between(pool, username, start, end, limit=PAGE_SIZE, offset=0):
+    """[(id, case_name, hearing_date, category)] with start <= hearing_date < end (ISO dates)."""
+    with pool.connection() as conn:
+        return conn.execute(SQL_RANGE, (username, str(start), str(end), limit, offset)).fetchall()
+
+
+def count_between(pool, username, start, end):
+    with pool.connection() as conn:
+        return conn.execute(SQL_RANGE_COUNT, (username, str(start), str(end))).fetchone()[0]
+
+
+def upcoming(pool, username, days=None, limit=SIDEBAR_LIMIT, today=None):
+    """Hearings from today onward, optionally only within the next `days` days."""
+    today = today or datetime.date.today()
+    end = today + datetime.timedelta(days=days) if days else datetime.date.max
+    return _cached(username, ('upcoming', today, days, limit),
+                   lambda: hearings_between(pool, username, today, end, limit))
+
+
+def month_page(pool, username, year, month, page=0, page_size=PAGE_SIZE):
+    """(rows, total) for one page of a calendar month."""
+    start = datetime.date(year, month, 1)
+    end = start + datetime.timedelta(days=calendar.monthrange(year, month)[1])
+    return _cached(username, ('month', year, month, page, page_size),
+                   lambda: (hearings_between(pool, username, start, end, page_size, page * page_size),
+                            count_between(pool, username, start, end)))
+
+
+def shift_month(year, month, step):
+    month += step
+    return year + (month - 1) // 12, (month - 1) % 12 + 1
@@ -0,0 +1,139 @@
+"""Versioned drafts: a stable document id, zlib-compressed deltas and periodic full snapshots."""
+import difflib
+import hashlib
+import json
+import re
+import time
+import zlib
+
+SNAPSHOT_EVERY = 10  # every Nth version is stored in full, bounding reconstruction to N-1 deltas
+AUTOSAVE_QUIET = 5.0  # seconds the editor must sit unchanged before an autosave
+
+# Split after newlines and sentence ends so an edit only re-stores the sentence it touched.
+_SEGMENT = re.compile(r'(?<=[\n.!?])')
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def segments(text):
+    return [s for s in _SEGMENT.split(text) if s]
+
+
+# --- 1. DELTA ENCODING ---
+def make_delta(base, target):
+    """Ops that rebuild `target` from `base`: [start, end] copies base segments, a string inserts text."""
+    a, b = segments(base), segments(target)
+    # Edits are usually local: peel off the shared head and tail before the quadratic matcher.
+    head = 0
+    while head < min(len(a), len(b)) and a[head] == b[head]: head += 1
+    tail = 0
+    while tail < min(len(a), len(b)) - head and a[-1 - tail] == b[-1 - tail]: tail += 1
+    ops = [[0, head]] if head else []
+    matcher = difflib.SequenceMatcher(None, a[head:len(a) - tail], b[head:len(b) - tail], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal': ops.append([head + i1, head + i2])
+        elif j2 > j1: ops.append(''.join(b[head + j1:head + j2]))
+    if tail: ops.append([len(a) - tail, len(a)])
+    return ops
+
+
+def apply_delta(base, ops):
+    a = segments(base)
+    return ''.join(op if isinstance(op, str) else ''.join(a[op[0]:op[1]]) for op in ops)
+
+
+def pack(obj):
+    return zlib.compress(json.dumps(obj, separators=(',', ':')).encode('utf-8'), 6)
+
+
+def unpack(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+# --- 2. STORE ---
+def _head(conn, username, draft_id):
+    return conn.execute('SELECT content, head_version, content_hash FROM drafts WHERE id=? AND username=?',
+                        (draft_id, username)).fetchone()
+
+
+def _append_version(conn, draft_id, version, previous, content, digest):
+    if version % SNAPSHOT_EVERY == 1 or previous is None:
+        kind, payload = 'full', pack(content)
+    else:
+        kind, payload = 'delta', pack(make_delta(previous, content))
+    conn.execute('INSERT INTO draft_versions VALUES (?,?,?,?,?,?,?)',
+                 (draft_id, version, kind, payload, digest, len(content.encode('utf-8')), time.time()))
+
+
+def save(pool, username, draft_id, doc_type, content, date, category='Civil'):
+    """Append a version. Returns (draft_id, version, created); identical content creates nothing."""
+    digest = content_hash(content)
+    with pool.connection() as conn:
+        # Take the write lock before reading the head, so a concurrent save of the same draft waits
+        # and then appends after it instead of colliding on (draft_id, version).
+        conn.execute('BEGIN IMMEDIATE')
+        head = _head(conn, username, draft_id) if draft_id is not None else None
+        if head is None:
+            cur = conn.execute('INSERT INTO drafts (username, category, doc_type, content, date, head_version, content_hash) '
+                               'VALUES (?,?,?,?,?,1,?)', (username, category, doc_type, content, str(date), digest))
+            _append_version(conn, cur.lastrowid, 1, None, content, digest)
+            return cur.lastrowid, 1, True
+        previous, version, head_digest = head
+        if version == 0:  # saved before versioning existed: keep its content as version 1
+            version, head_digest = 1, content_hash(previous)
+            _append_version(conn, draft_id, 1, None, previous, head_digest)
+        if head_digest == digest:
+            conn.execute('UPDATE drafts SET head_version=?, content_hash=? WHERE id=?', (version, digest, draft_id))
+            return draft_id, version, False
+        version += 1
+        _append_version(conn, draft_id, version, previous, content, digest)
+        conn.execute('UPDATE drafts SET content=?, doc_type=?, category=?, date=?, head_version=?, content_hash=? WHERE id=?',
+                     (content, doc_type, category, str(date), version, digest, draft_id))
+        return draft_id, version, True
+
+
+def load_version(pool, username, draft_id, version):
+    """Rebuild a version from the nearest full snapshot at or before it."""
+    with pool.connection() as conn:
+        if conn.execute('SELECT 1 FROM drafts WHERE id=? AND username=?', (draft_id, username)).fetchone() is None:
+            return None
+        base = conn.execute("SELECT MAX(version) FROM draft_versions WHERE draft_id=? AND version<=? AND kind='full'",
+                            (draft_id, version)).fetchone()[0]
+        if base is None: return None
+        rows = conn.execute('SELECT kind, payload FROM draft_versions WHERE draft_id=? AND version BETWEEN ? AND ? ORDER BY version',
+                            (draft_id, base, version)).fetchall()
+    text = unpack(rows[0][1])
+    for _, payload in rows[1:]: text = apply_delta(text, unpack(payload))
+    return text
+
+
+def history(pool, username, draft_id):
+    """[(version, kind, stored_bytes, raw_bytes, created)] newest first."""
+    with pool.connection() as conn:
+        return conn.execute('SELECT v.version, v.kind, LENGTH(v.payload), v.raw_size, v.created FROM draft_versions v '
+                            'JOIN drafts d ON d.id = v.draft_id WHERE v.draft_id=? AND d.username=? ORDER BY v.version DESC',
+                            (draft_id, username)).fetchall()
+
+
+def seed(state, content):
+    """Mark freshly loaded content (a template or an opened draft) as already saved, so autosave
+    waits for the first real edit."""
+    state['saved_hash'] = state['typed_hash'] = content_hash(content)
+    state['typed_at'] = time.monotonic()
+
+
+def autosave(pool, state, username, doc_type, content, date, category='Civil', quiet=AUTOSAVE_QUIET):
+    """Debounced save keyed on `state` (st.session_state): every change restarts the timer, and the
+    content is written once it has stayed unchanged for `quiet` seconds. Returns the new version or None."""
+    if not content.strip(): return None
+    digest = content_hash(content)
+    now = time.monotonic()
+    if digest != state.get('typed_hash'):
+        state['typed_hash'], state['typed_at'] = digest, now
+        return None
+    if digest == state.get('saved_hash') or now - state['typed_at'] < quiet: return None
+    draft_id, version, created = save(pool, username, state.get('doc_id'), doc_type, content, date, category)
+    state['doc_id'], state['saved_hash'] = draft_id, digest
+    return version if created else None
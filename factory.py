@@ -0,0 +1,204 @@
+"""Batch document factory: one template + a CSV of parties -> many PDFs, rendered across processes.
+
+Headless use:
+    python factory.py --template notice.txt --csv defaulters.csv --out notices.zip --title "Section 138 Notice"
+    python factory.py --builtin "Section 138 Notice" --category Criminal --advocate "A. Rao" --enroll "KAR/123/2010" ...
+"""
+import argparse
+import concurrent.futures
+import csv
+import datetime
+import io
+import multiprocessing
+import os
+import re
+import sys
+import time
+import zipfile
+
+try:
+    import resource  # peak RSS on Unix; unavailable on Windows
+except ImportError:
+    resource = None
+
+COURT_HEADERS = {
+    "Civil": "IN THE COURT OF THE CIVIL JUDGE, SENIOR DIVISION",
+    "Criminal": "IN THE COURT OF THE HON'BLE SESSIONS JUDGE",
+}
+# The bracketed blanks of the built-in template double as CSV columns.
+BRACKET_FIELDS = {"[RECIPIENT NAME/OFFICE]": "recipient", "[ADDRESS LINE 1]": "address"}
+PLACEHOLDER = re.compile(r'\{(\w+)\}')
+FALLBACK_ENCODING = 'cp1252'  # what Excel on Windows writes for "CSV (Comma delimited)"
+CHUNKSIZE = 4
+
+
+def draft_template(dtype, draft_cat, advocate, enroll, date=None):
+    """The Drafting Room's '✨ Load Template' text."""
+    return f"""{COURT_HEADERS[draft_cat]}
+Date: {date or datetime.date.today()}
+Advocate: {advocate}
+Enrollment: {enroll}
+
+SUBJECT: {dtype.upper()} IN THE MATTER OF {draft_cat.upper()} LITIGATION
+
+TO,
+[RECIPIENT NAME/OFFICE]
+[ADDRESS LINE 1]
+
+Sir/Madam,
+Under the instructions from my client, I hereby serve you with the following {dtype}:
+
+1. That my client is...
+2. That the cause of action arose on...
+3. Therefore, you are hereby requested to...
+
+Regards,
+Adv. {advocate}
+({enroll})"""
+
+
+def placeholders(template):
+    """Column names the template expects, in order of first use."""
+    names = [f for b, f in BRACKET_FIELDS.items() if b in template] + PLACEHOLDER.findall(template)
+    return list(dict.fromkeys(names))
+
+
+def fill(template, row):
+    """Substitute {column} and the built-in [BRACKET] blanks; unknown placeholders are left as-is."""
+    for bracket, field in BRACKET_FIELDS.items():
+        if field in row: template = template.replace(bracket, row[field])
+    return PLACEHOLDER.sub(lambda m: row.get(m.group(1), m.group(0)), template)
+
+
+def read_parties(data):
+    """Rows of the parties CSV with lower-cased headers; UTF-8 (BOM or not), else Windows-1252."""
+    if isinstance(data, bytes):
+        try: text = data.decode('utf-8-sig')
+        except UnicodeDecodeError: text = data.decode(FALLBACK_ENCODING, 'replace')
+    else: text = data
+    reader = csv.DictReader(io.StringIO(text))
+    reader.fieldnames = [f.strip().lower() for f in reader.fieldnames or []]
+    return [{k: (v or '').strip() for k, v in row.items() if k} for row in reader]
+
+
+def _filename(row, index, used):
+    stem = row.get('filename') or row.get('recipient') or row.get('name') or f"document_{index + 1}"
+    stem = re.sub(r'[^\w\- ]+', '', stem).strip().replace(' ', '_')[:80] or f"document_{index + 1}"
+    name, n = stem, 2
+    while name in used: name, n = f"{stem}_{n}", n + 1
+    used.add(name)
+    return name
+
+
+def _render_job(job):
+    """Runs in a worker process."""
+    from pdfgen import render_pdf
+    name, title, content = job
+    return name, render_pdf(content, title)
+
+
+def peak_memory_mb():
+    """(this process, largest finished child) peak RSS in MB, or (None, None) off Unix."""
+    if resource is None: return None, None
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024  # ru_maxrss is bytes on macOS, KB elsewhere
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+
+class BatchReport:
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    @property
+    def docs_per_second(self):
+        return self.done / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        own, child = peak_memory_mb()
+        mem = f" | peak RSS {own:.0f} MB (worker {child:.0f} MB)" if own is not None else ""
+        return f"{self.done}/{self.total} documents in {self.seconds:.1f}s = {self.docs_per_second:.1f} docs/s{mem}"
+
+
+def render_batch(template, parties, title, workers=None):
+    """Yields (filename, row, pdf_bytes) in CSV order while later rows are still rendering.
+
+    Uses a 'spawn' process pool so forking never copies the Streamlit server's threads.
+    """
+    used = set()
+    jobs = [(_filename(row, i, used), title, fill(template, row)) for i, row in enumerate(parties)]
+    ctx = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=ctx) as pool:
+        for row, (name, pdf) in zip(parties, pool.map(_render_job, jobs, chunksize=CHUNKSIZE)):
+            yield name, row, pdf
+
+
+def write_zip(results, out):
+    """Stream results into a ZIP (file path or file object) and pass them on; PDFs are already compressed, so store them."""
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for name, row, pdf in results:
+            zf.writestr(f"{name}.pdf", pdf)
+            yield name, row, pdf
+
+
+def queue_emails(pool, username, results, title, email_column='email'):
+    """Hand each rendered PDF to the outbox and pass it on; rows without an address are skipped."""
+    import outbox
+    for name, row, pdf in results:
+        if row.get(email_column):
+            outbox.enqueue(pool, username, row[email_column], f"Legal Doc: {title}", "Please find the attached document.", pdf, name)
+        yield name, row, pdf
+
+
+def track(results, report):
+    for name, row, pdf in results:
+        report.done += 1
+        report.bytes += len(pdf)
+        report.seconds = time.perf_counter() - report.started
+        yield name, row, pdf
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Render one PDF per CSV row from a template.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--template", help="text file with {column} placeholders")
+    src.add_argument("--builtin", metavar="DOC_TYPE", help="use the Drafting Room template for this document type")
+    ap.add_argument("--category", choices=sorted(COURT_HEADERS), default="Criminal")
+    ap.add_argument("--advocate", default="")
+    ap.add_argument("--enroll", default="")
+    ap.add_argument("--csv", required=True)
+    ap.add_argument("--title", default=None)
+    ap.add_argument("--out", help="ZIP file to write")
+    ap.add_argument("--queue-emails", action="store_true", help="enqueue each PDF to the row's email column")
+    ap.add_argument("--db", default="advocate_elite.db")
+    ap.add_argument("--user", help="outbox owner when queueing emails")
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args(argv)
+    if not args.out and not args.queue_emails: ap.error("give --out and/or --queue-emails")
+    if args.queue_emails and not args.user: ap.error("--queue-emails needs --user")
+
+    if args.template:
+        with open(args.template, encoding='utf-8') as f: template = f.read()
+    else:
+        template = draft_template(args.builtin, args.category, args.advocate, args.enroll)
+    title = args.title or args.builtin or "Legal_Document"
+    with open(args.csv, 'rb') as f: parties = read_parties(f.read())
+    missing = [p for p in placeholders(template) if parties and p not in parties[0]]
+    if missing: print(f"warning: CSV has no column for {', '.join(missing)}; left unfilled", file=sys.stderr)
+
+    results = render_batch(template, parties, title, args.workers)
+    if args.out: results = write_zip(results, args.out)
+    if args.queue_emails:
+        import db
+        results = queue_emails(db.ConnectionPool(args.db), args.user, results, title)
+    report = BatchReport(len(parties))
+    for _ in track(results, report): pass
+    if args.queue_emails: print(f"queued {sum(1 for p in parties if p.get('email'))} emails; the app's outbox worker delivers them")
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Offline stand-in for `genai.GenerativeModel` used by benchmarks and local testing."""
+import threading
+import time
+
+FILLER = "The Hon'ble Supreme Court held that the appellant is entitled to relief. "
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStream:
+    """Yields the answer in fixed-size chunks on a timer; `cancel()` stops it mid-flight."""
+
+    def __init__(self, text, first_token_delay, chunk_size, chunk_delay):
+        self.text = text
+        self.first_token_delay = first_token_delay
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.chunks_sent = 0
+        self.cancelled = False
+
+    def __iter__(self):
+        time.sleep(self.first_token_delay)
+        for i in range(0, len(self.text), self.chunk_size):
+            if self.cancelled: return
+            if i: time.sleep(self.chunk_delay)
+            self.chunks_sent += 1
+            yield FakeChunk(self.text[i:i + self.chunk_size])
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeModel:
+    """Answers every prompt with `text` (or an echo of the prompt, padded to `size` characters)
+    after a configurable delay."""
+
+    def __init__(self, text=None, latency=0.5, chunk_size=40, chunk_delay=0.05, size=None):
+        self.text = text
+        self.latency = latency
+        self.size = size
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def answer(self, contents):
+        if self.text is not None: return self.text
+        prompt = contents if isinstance(contents, str) else ' '.join(p for p in contents if isinstance(p, str))
+        answer = f"[fake answer] {prompt[:200]}"
+        if self.size: answer = (answer + " " + FILLER * (self.size // len(FILLER) + 1))[:self.size]
+        return answer
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        with self._lock: self.calls += 1
+        text = self.answer(contents)
+        if stream: return FakeStream(text, self.latency, self.chunk_size, self.chunk_delay)
+        time.sleep(self.latency)
+        return FakeResponse(text)
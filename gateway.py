@@ -0,0 +1,224 @@
+"""Process-wide Gemini gateway: one token bucket for the shared API key, priority lanes,
+single-flight coalescing of identical in-flight prompts and jittered retry on 429/503."""
+import collections
+import heapq
+import itertools
+import random
+import threading
+import time
+
+import telemetry
+
+REQUESTS_PER_MINUTE = 60
+BURST = 10
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+# Lower runs first when requests queue for tokens: an advocate waiting on the Researcher
+# beats a 200-page OCR batch.
+LANES = {"researcher": 0, "predict": 1, "uncached": 1, "scanner": 2}
+DEFAULT_LANE = 1
+
+
+def is_retryable(exc):
+    name = type(exc).__name__
+    return (name in ('ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'DeadlineExceeded')
+            or '429' in str(exc) or '503' in str(exc))
+
+
+def backoff(attempt):
+    """Full jitter: uniform in [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+# --- 1. TOKEN BUCKET WITH PRIORITY ---
+class TokenBucket:
+    """`per_minute` sustained, `burst` at once. Waiters are served strictly by (priority, arrival)."""
+
+    def __init__(self, per_minute=REQUESTS_PER_MINUTE, burst=BURST):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+
+    def acquire(self, priority=DEFAULT_LANE):
+        """Blocks until this caller may send; returns the seconds spent waiting."""
+        if self.rate <= 0: return 0.0
+        ticket = (priority, next(self._seq))
+        start = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self._queue[0] == ticket and self.tokens >= 1:
+                        self.tokens -= 1
+                        heapq.heappop(self._queue)
+                        self._cond.notify_all()
+                        return now - start
+                    self._cond.wait((1 - self.tokens) / self.rate if self._queue[0] == ticket else None)
+            except BaseException:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                raise
+
+
+# --- 2. SINGLE-FLIGHT ---
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SharedStream:
+    """One upstream stream fanned out to every coalesced caller. Whoever needs the next chunk
+    pulls it; late joiners replay what was already received. The upstream is cancelled only
+    when every subscriber has gone."""
+
+    def __init__(self, upstream, on_finish):
+        self.upstream = upstream
+        self.on_finish = on_finish
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.subscribers = 0
+        self._iter = None
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        with self._lock: self.subscribers += 1
+        return _Subscriber(self)
+
+    def chunk(self, i):
+        with self._lock:
+            while i >= len(self.chunks) and not self.finished:
+                try:
+                    if self._iter is None: self._iter = iter(self.upstream)
+                    self.chunks.append(next(self._iter))
+                except StopIteration:
+                    self._finish()
+                except Exception as e:
+                    self.error = e
+                    self._finish()
+            if i < len(self.chunks): return self.chunks[i]
+            if self.error is not None: raise self.error
+            return None
+
+    def unsubscribe(self):
+        with self._lock:
+            self.subscribers -= 1
+            if self.subscribers or self.finished: return
+            self.error = RuntimeError("stream cancelled by every caller sharing it")  # for a late joiner
+            self._finish()
+        for name in ('cancel', 'close'):
+            fn = getattr(self.upstream, name, None)
+            if callable(fn):
+                fn()
+                break
+        if hasattr(self._iter, 'close'): self._iter.close()  # nobody is pulling any more
+
+    def _finish(self):
+        self.finished = True
+        self.on_finish()
+
+
+class _Subscriber:
+    def __init__(self, shared):
+        self.shared = shared
+        self.closed = False
+
+    def __iter__(self):
+        i = 0
+        try:
+            while (chunk := self.shared.chunk(i)) is not None:
+                yield chunk
+                i += 1
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        if self.closed: return
+        self.closed = True
+        self.shared.unsubscribe()
+
+    def __getattr__(self, name):
+        return getattr(self.shared.upstream, name)  # e.g. usage_metadata once the stream is done
+
+
+# --- 3. GATEWAY ---
+class Gateway:
+    """Every upstream Gemini call in the process goes through `call`."""
+
+    def __init__(self, per_minute=REQUESTS_PER_MINUTE, burst=BURST, max_retries=MAX_RETRIES):
+        self.bucket = TokenBucket(per_minute, burst)
+        self.max_retries = max_retries
+        self.counters = collections.Counter()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _count(self, lane, name, value=1):
+        with self._lock: self.counters[name] += value
+        telemetry.count('gateway', lane, name, value)
+
+    def _send(self, fn, lane):
+        """Token, call, and on a retryable error back off and go round again."""
+        for attempt in range(self.max_retries + 1):
+            waited = self.bucket.acquire(LANES.get(lane, DEFAULT_LANE))
+            if waited > 0.001:
+                self._count(lane, 'throttled')
+                self._count(lane, 'throttled_seconds', waited)
+            try:
+                self._count(lane, 'upstream_calls')
+                return fn()
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    self._count(lane, 'failed')
+                    raise
+                self._count(lane, 'retried')
+                time.sleep(backoff(attempt))
+
+    def call(self, fn, key=None, lane='uncached', stream=False):
+        """Run `fn()` (an upstream generate_content) under the limiter. Callers passing the same
+        `key` while one is in flight share its result, or its chunks when `stream` is set."""
+        if key is None: return self._send(fn, lane)
+        key = (key, stream)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader: flight = self._flights[key] = _Flight()
+        if not leader:
+            self._count(lane, 'coalesced')
+            flight.done.wait()
+            if flight.error is not None: raise flight.error
+            return flight.result.subscribe() if stream else flight.result
+        try:
+            result = self._send(fn, lane)
+        except BaseException as e:
+            flight.error = e
+            self._land(key)
+            flight.done.set()
+            raise
+        if stream:
+            # the flight stays open (joinable) until the shared stream ends
+            flight.result = SharedStream(result, lambda: self._land(key))
+            subscriber = flight.result.subscribe()
+            flight.done.set()
+            return subscriber
+        flight.result = result
+        self._land(key)
+        flight.done.set()
+        return result
+
+    def _land(self, key):
+        with self._lock: self._flights.pop(key, None)
+
+    def stats(self):
+        with self._lock: return dict(self.counters)
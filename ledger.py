@@ -0,0 +1,127 @@
+"""Billing ledger: invoice writes that keep the summary tables current, paging and bulk CSV import."""
+import collections
+import csv
+import datetime
+import io
+import math
+import time
+
+import db
+
+PAGE_SIZE = 25
+IMPORT_BATCH = 5000
+MAX_ERRORS_REPORTED = 50
+DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y')
+FALLBACK_ENCODING = 'cp1252'  # what Excel on Windows writes for "CSV (Comma delimited)"
+
+SQL_BUMP_CLIENT = ('INSERT INTO invoice_client_totals VALUES (?,?,?,?) ON CONFLICT(username, client_name) '
+                   'DO UPDATE SET total=total+excluded.total, invoices=invoices+excluded.invoices')
+SQL_BUMP_MONTH = ('INSERT INTO invoice_month_totals VALUES (?,?,?,?) ON CONFLICT(username, month) '
+                  'DO UPDATE SET total=total+excluded.total, invoices=invoices+excluded.invoices')
+# Ordered like idx_invoices_user_date, so a page is an index walk rather than a sort.
+SQL_PAGE = 'SELECT client_name, amount, date FROM invoices WHERE username=? ORDER BY date DESC, id DESC LIMIT ? OFFSET ?'
+SQL_CLIENT_TOTALS = 'SELECT client_name, total, invoices FROM invoice_client_totals WHERE username=? ORDER BY total DESC LIMIT ?'
+SQL_MONTH_TOTALS = 'SELECT month, total, invoices FROM invoice_month_totals WHERE username=? ORDER BY month DESC LIMIT ?'
+SQL_GRAND_TOTAL = 'SELECT COALESCE(SUM(total), 0), COALESCE(SUM(invoices), 0) FROM invoice_month_totals WHERE username=?'
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []  # (line number, message), first MAX_ERRORS_REPORTED only
+        self.seconds = 0.0
+        self.encoding = 'utf-8'
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS_REPORTED: self.errors.append((line, message))
+
+    @property
+    def rows_per_second(self):
+        return self.inserted / self.seconds if self.seconds else 0.0
+
+
+def decode_csv(data):
+    """(text, encoding) of an uploaded CSV: UTF-8 with or without a BOM, else Windows-1252."""
+    if not isinstance(data, bytes): return data, 'utf-8'
+    try: return data.decode('utf-8-sig'), 'utf-8'
+    except UnicodeDecodeError: return data.decode(FALLBACK_ENCODING, 'replace'), FALLBACK_ENCODING
+
+
+# --- 1. WRITES ---
+def _write(conn, username, rows):
+    """Insert (client, amount, iso_date) rows and fold them into the summaries in the same transaction."""
+    conn.executemany(db.SQL_ADD_INVOICE, [(username, c, a, d) for c, a, d in rows])
+    by_client, by_month = collections.defaultdict(lambda: [0.0, 0]), collections.defaultdict(lambda: [0.0, 0])
+    for client, amount, date in rows:
+        for bucket in (by_client[client], by_month[date[:7]]):
+            bucket[0] += amount
+            bucket[1] += 1
+    conn.executemany(SQL_BUMP_CLIENT, [(username, k, t, n) for k, (t, n) in by_client.items()])
+    conn.executemany(SQL_BUMP_MONTH, [(username, k, t, n) for k, (t, n) in by_month.items()])
+
+
+def add_invoice(pool, username, client_name, amount, date):
+    with pool.connection() as conn:
+        _write(conn, username, [(client_name, float(amount), str(date))])
+
+
+def parse_row(row):
+    """(client, amount, iso_date) from a CSV dict row; raises ValueError with a readable message."""
+    client = (row.get('client_name') or row.get('client') or '').strip()
+    if not client: raise ValueError("missing client_name")
+    try:
+        amount = float((row.get('amount') or '').replace(',', '').replace('Rs.', '').strip())
+    except ValueError:
+        raise ValueError(f"amount {row.get('amount')!r} is not a number") from None
+    if not math.isfinite(amount): raise ValueError(f"amount {row.get('amount')!r} is not a number")
+    if amount < 0: raise ValueError("amount is negative")
+    raw = (row.get('date') or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return client, amount, datetime.datetime.strptime(raw, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"date {raw!r} is not YYYY-MM-DD or DD-MM-YYYY")
+
+
+def import_csv(pool, username, data):
+    """Validate every row, then insert the valid ones with batched executemany in ONE transaction."""
+    report = ImportReport()
+    start = time.perf_counter()
+    text, report.encoding = decode_csv(data)
+    reader = csv.DictReader(io.StringIO(text))
+    if reader.fieldnames: reader.fieldnames = [f.strip().lower() for f in reader.fieldnames]
+    valid = []
+    for line, row in enumerate(reader, start=2):
+        try: valid.append(parse_row(row))
+        except ValueError as e: report.reject(line, str(e))
+    with pool.connection() as conn:
+        for i in range(0, len(valid), IMPORT_BATCH):
+            _write(conn, username, valid[i:i + IMPORT_BATCH])
+    report.inserted = len(valid)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+# --- 2. READS ---
+def page(pool, username, number=0, page_size=PAGE_SIZE):
+    with pool.connection() as conn:
+        return conn.execute(SQL_PAGE, (username, page_size, number * page_size)).fetchall()
+
+
+def client_totals(pool, username, limit=20):
+    with pool.connection() as conn:
+        return conn.execute(SQL_CLIENT_TOTALS, (username, limit)).fetchall()
+
+
+def month_totals(pool, username, limit=24):
+    with pool.connection() as conn:
+        return conn.execute(SQL_MONTH_TOTALS, (username, limit)).fetchall()
+
+
+def grand_total(pool, username):
+    """(amount, invoice count) read from the month summary, never a scan of invoices."""
+    with pool.connection() as conn:
+        return conn.execute(SQL_GRAND_TOTAL, (username,)).fetchone()
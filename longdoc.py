@@ -0,0 +1,115 @@
+"""Long-document mode for Predict Probability: drafts too big for one prompt are cut at section
+boundaries, each part is noted on in parallel (map) and the notes are folded into one final
+prompt that fits a token budget (reduce)."""
+import concurrent.futures
+import re
+
+PREDICT_PROMPT = "Predict legal success probability for this Indian {category} draft: {text}"
+MAP_PROMPT = ("Below is one part of a longer Indian {category} draft. In at most {words} words, note what it establishes: "
+              "parties and facts, legal grounds and provisions relied on, evidence, weaknesses or gaps, and relief sought.\n\n{text}")
+COMBINE_PROMPT = ("Merge these consecutive notes on parts of an Indian {category} draft into one set of notes of at most {words} "
+                  "words, keeping every fact, ground and weakness that bears on its chances:\n\n{text}")
+REDUCE_PROMPT = ("Predict legal success probability for this Indian {category} draft. It is too long to read whole, so here are "
+                 "notes on each of its parts, in order:\n\n{text}")
+
+CHARS_PER_TOKEN = 4  # Gemini's rule of thumb for English; counting exactly would cost a request per part
+PART_TOKENS = 16000  # a draft up to this size still goes in a single prompt, as before
+REDUCE_TOKENS = 8000  # notes sent with the final prompt
+NOTE_WORDS = 250
+MAX_WORKERS = 4
+# A heading line (no lower case: "FACTS OF THE CASE", "PRAYER") or a numbered paragraph ("3.", "IV)", "(b)").
+SECTION_START = re.compile(r'^(?=[^a-z\n]{4,80}$|\s*\(?(?:\d{1,3}|[IVXLC]{1,6}|[a-z])[.)]\s)', re.M)
+SEPARATORS = ('\n\n', '\n', '. ', ' ')
+
+
+def tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def sections(text):
+    starts = sorted({0, *(m.start() for m in SECTION_START.finditer(text))})
+    return [text[a:b] for a, b in zip(starts, starts[1:] + [len(text)]) if text[a:b].strip()]
+
+
+def _split(piece, limit, separators=SEPARATORS):
+    """A section longer than `limit` chars, cut at paragraphs, then lines, sentences, words."""
+    if len(piece) <= limit: return [piece]
+    for n, sep in enumerate(separators):
+        cut = piece.rfind(sep, 0, limit)
+        if cut > 0: return [piece[:cut + len(sep)]] + _split(piece[cut + len(sep):], limit, separators[n:])
+    return [piece[:limit]] + _split(piece[limit:], limit, ())
+
+
+def parts(text, budget=PART_TOKENS):
+    """Consecutive sections packed greedily into parts of at most `budget` tokens; a part only ends
+    mid-section when the section alone is over budget."""
+    limit, out, current = budget * CHARS_PER_TOKEN, [], ''
+    for section in sections(text):
+        for piece in _split(section, limit):
+            if current and len(current) + len(piece) > limit:
+                out.append(current)
+                current = ''
+            current += piece
+    if current: out.append(current)
+    return out
+
+
+def needs_split(text, budget=PART_TOKENS):
+    return tokens(text) > budget
+
+
+# --- MAP / REDUCE ---
+def _ask(model, prompt, category):
+    # feature="predict": cached per part, so re-predicting after editing one section only resends that
+    # part, and a retry after a failure only resends the parts that failed
+    return model.generate_content(prompt, feature="predict", scope=category).text
+
+
+def _gather(model, prompts, category, stage, progress, max_workers):
+    """Answers to `prompts` in order. `progress(stage, done, total)` runs on the caller's thread as each
+    one lands, so a Stop in the app (raised from inside it) ends the run between parts. The first
+    failure is raised: a prediction made from part of the draft would not say so."""
+    out = [None] * len(prompts)
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="longdoc")
+    try:
+        futures = {pool.submit(_ask, model, p, category): i for i, p in enumerate(prompts)}
+        for done, fut in enumerate(concurrent.futures.as_completed(futures), 1):
+            out[futures[fut]] = fut.result()
+            if progress: progress(stage, done, len(prompts))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)  # on a failure or Stop, drop queued parts and don't wait
+    return out
+
+
+def map_parts(model, chunks, category, progress=None, max_workers=MAX_WORKERS):
+    """One note per part, in order."""
+    prompts = [MAP_PROMPT.format(category=category, words=NOTE_WORDS, text=c) for c in chunks]
+    return _gather(model, prompts, category, "Analysed part", progress, max_workers)
+
+
+def fold(model, notes, category, budget=REDUCE_TOKENS, progress=None, max_workers=MAX_WORKERS):
+    """Merges runs of consecutive notes until all of them together fit `budget` tokens."""
+    while sum(tokens(n) for n in notes) > budget and len(notes) > 1:
+        groups, current = [], []
+        for note in notes:
+            if current and sum(tokens(n) for n in current) + tokens(note) > budget:
+                groups.append(current)
+                current = []
+            current.append(note)
+        groups.append(current)
+        if len(groups) == len(notes): groups = [notes[i:i + 2] for i in range(0, len(notes), 2)]  # every note alone is near budget
+        prompts = [COMBINE_PROMPT.format(category=category, words=NOTE_WORDS, text="\n\n".join(g)) for g in groups]
+        notes = _gather(model, prompts, category, "Merged notes", progress, max_workers)
+    limit = budget * CHARS_PER_TOKEN
+    return [n[:limit] for n in notes]
+
+
+def predict_prompt(model, text, category, progress=None, budget=PART_TOKENS):
+    """The Predict Probability prompt: the draft itself when it fits `budget`, otherwise notes from
+    the map/reduce run. `progress(stage, done, total)` is called from the caller's thread after each
+    part or merge; a part that fails after the gateway's retries raises."""
+    if not needs_split(text, budget): return PREDICT_PROMPT.format(category=category, text=text)
+    chunks = parts(text, budget)
+    notes = map_parts(model, chunks, category, progress)
+    notes = fold(model, [f"Part {i + 1} of {len(chunks)}: {n}" for i, n in enumerate(notes)], category, progress=progress)
+    return REDUCE_PROMPT.format(category=category, text="\n\n".join(notes))
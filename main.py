@@ -1,17 +1,21 @@
 import streamlit as st
-import google.generativeai as genai
-import smtplib
-import ssl
 import datetime
 import urllib.parse
-import sqlite3
 import hashlib
 import re
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
-from fpdf import FPDF
-from PIL import Image
+
+import ai_cache
+import assets
+import db
+import docket
+import draft_store
+import ledger
+import outbox
+import panels
+from pdfgen import generate_pdf, pdf_key
+import precedents
+import streaming
+import telemetry
 
 # --- 1. SETTINGS & SECRETS SETUP ---
 st.set_page_config(page_title="COOL FINDS | ADVOCATE ELITE", layout="wide")
@@ -21,88 +25,38 @@ try:
     SENDER_EMAIL = st.secrets["SENDER_EMAIL"]
     SENDER_APP_PASSWORD = st.secrets["SENDER_APP_PASSWORD"]
     
-    genai.configure(api_key=API_KEY)
-    model = genai.GenerativeModel('gemini-2.5-flash')
+    # Responses are cached on disk by (feature, prompt, scope, image bytes); see ai_cache.py.
+    # Both are built once per server process; google.generativeai is imported on the first real request.
+    response_cache = ai_cache.get_cache(disabled=tuple(st.secrets.get("AI_CACHE_DISABLED", ())))
+    # All sessions share one gateway sized to the key's quota (GEMINI_RPM / GEMINI_BURST); see gateway.py
+    model = ai_cache.get_model(API_KEY, response_cache, per_minute=st.secrets.get("GEMINI_RPM", 60),
+                               burst=st.secrets.get("GEMINI_BURST", 10))
 except Exception as e:
     st.error("Missing credentials in .streamlit/secrets.toml. Please ensure GEMINI_API_KEY, SENDER_EMAIL, and SENDER_APP_PASSWORD are set.")
     st.stop()
 
 # --- 2. DATABASE ARCHITECTURE (The "Memory" System) ---
-def init_db():
-    conn = sqlite3.connect('advocate_elite.db')
-    c = conn.cursor()
-    # Table for Users
-    c.execute('CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT, enroll_id TEXT)')
-    # Table for Hearings (Docket)
-    c.execute('CREATE TABLE IF NOT EXISTS hearings (id INTEGER PRIMARY KEY, username TEXT, case_name TEXT, hearing_date TEXT)')
-    # Table for Invoices
-    c.execute('CREATE TABLE IF NOT EXISTS invoices (id INTEGER PRIMARY KEY, username TEXT, client_name TEXT, amount REAL, date TEXT)')
-    # Table for Saved Drafts
-    c.execute('CREATE TABLE IF NOT EXISTS drafts (id INTEGER PRIMARY KEY, username TEXT, doc_type TEXT, content TEXT, date TEXT)')
-    conn.commit()
-    conn.close()
-
 def make_hashes(password): return hashlib.sha256(str.encode(password)).hexdigest()
 def check_hashes(password, hashed_text): return make_hashes(password) == hashed_text
-init_db()
+# Users, the outbox and the precedent index live in the directory; with SHARD_DIR set each advocate's
+# hearings, drafts and invoices get their own file (SHARD_BUCKETS > 0: hashed into that many files instead)
+store = db.get_store(db.DB_PATH, st.secrets.get("SHARD_DIR"), int(st.secrets.get("SHARD_BUCKETS", 0)))
+directory = pool = store.directory
+# DB/Gemini/PDF/SMTP timings are written to metrics.prom/.json every 15 s; admins also get pages/1_📊_Metrics.py
+telemetry.start_exporter(st.secrets.get("METRICS_PATH", telemetry.EXPORT_PATH))
+# Mail goes through the outbox table; this thread owns the SMTP session (host/port overridable for local testing)
+mailer = outbox.get_worker(directory, SENDER_EMAIL, SENDER_APP_PASSWORD, st.secrets.get("SMTP_HOST", "smtp.gmail.com"),
+                           int(st.secrets.get("SMTP_PORT", 465)), bool(st.secrets.get("SMTP_SSL", True)))
 
 # --- 3. HELPER FUNCTIONS ---
-
-def safe_unicode(text):
-    """Sanitize text for FPDF"""
-    replacements = {"₹": "Rs.", "—": "-", "‘": "'", "’": "'", "“": '"', "”": '"', "…": "...", "–": "-"}
-    for k, v in replacements.items(): text = text.replace(k, v)
-    return text.encode('latin-1', 'replace').decode('latin-1')
-
-def generate_pdf(content, title="Legal_Document"):
-    """Generates PDF and fixes the bytearray/Python 3.14 error"""
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", 'B', 16)
-    pdf.cell(200, 10, txt=title.upper(), ln=True, align='C')
-    pdf.ln(10)
-    pdf.set_font("Arial", size=11)
-    clean_text = safe_unicode(content)
-    pdf.multi_cell(0, 10, txt=clean_text)
-    return bytes(pdf.output())
-
-def send_real_email_with_attachment(receiver_email, subject, body, pdf_data, filename):
-    """Professional Emailer with PDF Attachment"""
-    message = MIMEMultipart()
-    message["From"] = SENDER_EMAIL
-    message["To"] = receiver_email
-    message["Subject"] = subject
-    message.attach(MIMEText(body, "plain"))
-    try:
-        attachment = MIMEApplication(pdf_data, _subtype="pdf")
-        attachment.add_header('Content-Disposition', 'attachment', filename=f"{filename}.pdf")
-        message.attach(attachment)
-    except Exception: return False, "Attachment Error"
-
-    context = ssl.create_default_context()
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-            server.login(SENDER_EMAIL, SENDER_APP_PASSWORD)
-            server.sendmail(SENDER_EMAIL, receiver_email, message.as_string())
-        return True, "Success"
-    except Exception as e: return False, str(e)
+# The calendar, ledger, draft and outbox panels and the answer captions are shared with a.py (panels.py)
 
 # --- 4. GLOBAL STYLING (PRESERVED) ---
-BG_URL = "https://images.unsplash.com/photo-1589829545856-d10d557cf95f?q=80&w=1920"
-st.markdown(f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Playfair+Display:wght@700&family=Montserrat:wght@400;700&display=swap');
-    .stApp {{ background: linear-gradient(rgba(0,0,0,0.9), rgba(0,0,0,0.9)), url('{BG_URL}'); background-size: cover; background-attachment: fixed; }}
-    .title-text {{ color: #D4AF37; font-family: 'Playfair Display', serif; font-size: 55px; font-weight: bold; text-align: center; margin-bottom: 0px; }}
-    .glass-card {{ background: rgba(255, 255, 255, 0.05); backdrop-filter: blur(15px); border: 1px solid #D4AF37; padding: 25px; border-radius: 15px; color: white; margin-bottom: 20px; }}
-    .section-header {{ color: #D4AF37 !important; font-family: 'Playfair Display', serif; font-size: 24px; font-weight: bold; border-bottom: 1px solid #D4AF37; margin-bottom: 15px; }}
-    .ai-answer {{ color: #BB86FC !important; background-color: rgba(187, 134, 252, 0.1); border-left: 4px solid #BB86FC; padding: 15px; border-radius: 5px; font-family: 'Montserrat', sans-serif; }}
-    label {{ color: #D4AF37 !important; font-family: 'Montserrat'; font-weight: bold; }}
-    </style>
-    """, unsafe_allow_html=True)
+# Fonts and background come from ./static; the stylesheet is assembled once per process (assets.py)
+st.markdown(assets.stylesheet("theme.css", "main.css"), unsafe_allow_html=True)
 
 st.markdown('<p class="title-text">COOL FINDS</p>', unsafe_allow_html=True)
-st.markdown("<p style='text-align:center; color:#D4AF37; font-family:Montserrat; font-size:0.9rem; letter-spacing: 4px;'>LEGAL INTELLIGENCE HUB</p><hr>", unsafe_allow_html=True)
+st.markdown("<p class='subtitle-text'>LEGAL INTELLIGENCE HUB</p><hr>", unsafe_allow_html=True)
 
 # --- 5. NAVIGATION LOGIC ---
 if 'auth' not in st.session_state: st.session_state.auth = False
@@ -117,9 +71,7 @@ if not st.session_state.auth:
                 u = st.text_input("Username")
                 p = st.text_input("Password", type="password")
                 if st.form_submit_button("Access Portal", use_container_width=True):
-                    conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-                    c.execute('SELECT password, enroll_id FROM users WHERE username=?', (u,))
-                    res = c.fetchone(); conn.close()
+                    res = db.get_user(directory, u)
                     if res and check_hashes(p, res[0]):
                         st.session_state.auth, st.session_state.user, st.session_state.enroll = True, u, res[1]
                         st.rerun()
@@ -130,15 +82,12 @@ if not st.session_state.auth:
                 ne = st.text_input("Bar ID")
                 np = st.text_input("New Password", type="password")
                 if st.form_submit_button("Sign Up"):
-                    conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-                    try: 
-                        c.execute('INSERT INTO users VALUES (?,?,?)', (nu, make_hashes(np), ne))
-                        conn.commit(); st.success("Created! Please Login.")
-                    except: st.error("Username taken.")
-                    conn.close()
+                    if db.create_user(directory, nu, make_hashes(np), ne): st.success("Created! Please Login.")
+                    else: st.error("Username taken.")
         st.markdown('</div>', unsafe_allow_html=True)
 
 else:
+    pool = store.pool(st.session_state.user)  # this advocate's shard (the directory when unsharded)
     # --- PAGE 2: DASHBOARD ---
     with st.sidebar:
         st.markdown(f'<p style="color:#D4AF37; font-size:20px;">👤 Adv. {st.session_state.user}</p>', unsafe_allow_html=True)
@@ -147,19 +96,25 @@ else:
         case_in = st.text_input("Case Name")
         date_in = st.date_input("Date")
         if st.button("Save to Docket"):
-            conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-            c.execute('INSERT INTO hearings (username, case_name, hearing_date) VALUES (?,?,?)', (st.session_state.user, case_in, str(date_in)))
-            conn.commit(); conn.close(); st.toast("Saved!")
+            docket.add_hearing(pool, st.session_state.user, case_in, date_in); st.toast("Saved!")
 
         st.markdown('<p style="color:#00FFCC; margin-top:20px;">📌 Your Docket</p>', unsafe_allow_html=True)
-        conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-        c.execute('SELECT case_name, hearing_date FROM hearings WHERE username=? ORDER BY hearing_date ASC LIMIT 5', (st.session_state.user,))
-        docket_data = c.fetchall(); conn.close()
-        for h in docket_data: st.caption(f"📅 {h[1]} | {h[0]}")
+        window = st.selectbox("Docket window", list(docket.WINDOWS), label_visibility="collapsed")
+        docket_data = docket.upcoming(pool, st.session_state.user, days=docket.WINDOWS[window])
+        for _, case, hdate, _ in docket_data: st.caption(f"📅 {hdate} | {case}")
         
+        with st.expander("⚡ AI Cache"):
+            for feat, sv in response_cache.stats().items():
+                st.caption(f"{feat}: {sv['hits']} hits / {sv['misses']} misses ({sv['hit_rate']:.0%}) | saved {sv['saved_seconds']:.0f}s")
+            gw = model.gateway.stats()
+            st.caption(f"Gateway: {gw.get('upstream_calls', 0)} calls | {gw.get('coalesced', 0)} coalesced | "
+                       f"{gw.get('throttled', 0)} throttled ({gw.get('throttled_seconds', 0):.0f}s) | {gw.get('retried', 0)} retried")
+            index = precedents.stats(directory)
+            st.caption(f"Precedent index: {sum(n for n, _ in index.values())} citations | "
+                       f"{sum(h for _, h in index.values())} served without the model")
         if st.button("🚪 Logout"): st.session_state.auth = False; st.rerun()
 
-    tab1, tab2, tab3, tab4 = st.tabs(["🖋️ Drafting", "🔍 Scanner", "📚 AI Researcher", "💰 Billing"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["🖋️ Drafting", "🔍 Scanner", "📚 AI Researcher", "💰 Billing", "📅 Calendar"])
 
     with tab1:
         st.markdown('<div class="glass-card">', unsafe_allow_html=True)
@@ -169,34 +124,54 @@ else:
             dtype = st.selectbox("Doc Type", ["Bail Application", "Legal Notice", "Rent Agreement"])
             text = st.text_area("Live Editor", height=300, key="editor")
             if st.button("💾 Save Draft to DB"):
-                conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-                c.execute('INSERT INTO drafts (username, doc_type, content, date) VALUES (?,?,?,?)', 
-                          (st.session_state.user, dtype, text, str(datetime.date.today())))
-                conn.commit(); conn.close(); st.success("Draft Saved Permanently!")
+                st.session_state.doc_id, version, created = draft_store.save(pool, st.session_state.user, st.session_state.get("doc_id"), dtype, text, datetime.date.today())
+                st.session_state.saved_hash = draft_store.content_hash(text)
+                st.success(f"Draft Saved Permanently! (v{version})" if created else "No changes since the last version.")
+            panels.autosave_panel(pool, st.session_state.user, dtype)
+            panels.version_panel(pool, st.session_state.user)
         with c2:
             st.markdown('<p style="color:#00FFCC;">Actions</p>', unsafe_allow_html=True)
-            pdf = generate_pdf(text, dtype)
-            st.download_button("📥 Download PDF", pdf, f"{dtype}.pdf", mime="application/pdf")
+            # The PDF is only rendered (and then memoized) once someone asks for it
+            if st.button("📄 Prepare PDF"): st.session_state.pdf_key = pdf_key(text, dtype)
+            if st.session_state.get("pdf_key") == pdf_key(text, dtype):
+                st.download_button("📥 Download PDF", generate_pdf(text, dtype), f"{dtype}.pdf", mime="application/pdf")
             dest = st.text_input("Send to Client (Email)")
             if st.button("📧 Send Mail"):
-                ok, msg = send_real_email_with_attachment(dest, f"Legal Doc: {dtype}", "Please find the attached document.", pdf, dtype)
-                if ok: st.success("Sent Successfully!")
-                else: st.error(msg)
+                outbox.enqueue(directory, st.session_state.user, dest, f"Legal Doc: {dtype}", "Please find the attached document.", generate_pdf(text, dtype), dtype)
+                mailer.notify(); st.success("Queued for delivery!")
+            panels.outbox_status(directory, st.session_state.user)
+        panels.draft_search_panel(pool, st.session_state.user)
         st.markdown('</div>', unsafe_allow_html=True)
 
     with tab2:
         st.markdown('<div class="glass-card">🔍 AI Document OCR</div>', unsafe_allow_html=True)
         up = st.file_uploader("Upload Image", type=['jpg','png','jpeg'])
         if up and st.button("Extract"):
-            res = model.generate_content(["Extract text from this legal image:", Image.open(up)])
+            from PIL import Image  # only paid for when a scan is actually run
+            import preprocess
+            prep = preprocess.preprocess(Image.open(up), preprocess.PreprocessConfig(dedupe=False), up.size)
+            res = model.generate_content(["Extract text from this legal image:", prep.blob], feature="scanner")
             st.info(res.text)
+            panels.cache_badge(res)
+            st.caption(f"Upload {prep.bytes_before / 1024:.0f} KB -> {prep.bytes_after / 1024:.0f} KB in {prep.seconds * 1000:.0f} ms")
 
     with tab3:
         st.markdown('<div class="glass-card">📚 Case Law Research</div>', unsafe_allow_html=True)
         q = st.text_input("Query")
+        ask_model = st.checkbox("Always ask Gemini", key="research_ask_model", help="Skip the local precedent index")
         if st.button("Find Precedents"):
-            res = model.generate_content(f"List 3 SC citations for: {q}")
-            st.markdown(f'<div class="ai-answer">{res.text}</div>', unsafe_allow_html=True)
+            found = precedents.lookup(directory, q)
+            if found.strong and not ask_model:
+                precedents.served(directory, found)
+                st.markdown(f'<div class="ai-answer">\n\n{precedents.to_markdown(found.records)}\n\n</div>', unsafe_allow_html=True)
+                st.caption(f"📚 From local precedent index in {found.seconds * 1000:.1f} ms")
+            else:
+                st.button("⏹ Stop", key="stop_research")
+                res = streaming.stream_into(st.empty(), model, f"List 3 SC citations for: {q}",
+                                            lambda ph, t: ph.markdown(f'<div class="ai-answer">{t}</div>', unsafe_allow_html=True),
+                                            feature="researcher")
+                panels.stream_caption(res)
+                panels.source_caption(found, res, [] if res.cancelled else precedents.learn(directory, precedents.GENERAL, q, res.text))
 
     with tab4:
         st.markdown('<div class="glass-card">', unsafe_allow_html=True)
@@ -204,18 +179,15 @@ else:
         clin = st.text_input("Client Name")
         amt = st.number_input("Amount (Rs.)", min_value=0.0)
         if st.button("Generate & Save Invoice"):
-            conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-            c.execute('INSERT INTO invoices (username, client_name, amount, date) VALUES (?,?,?,?)', (st.session_state.user, clin, amt, str(datetime.date.today())))
-            conn.commit(); conn.close()
+            ledger.add_invoice(pool, st.session_state.user, clin, amt, datetime.date.today())
             st.success("Invoice Saved to Record!")
             inv_p = generate_pdf(f"INVOICE\nClient: {clin}\nAmount: Rs.{amt}", "Invoice")
             st.download_button("Download PDF", inv_p, "invoice.pdf")
         
-        st.markdown('<p style="color:#D4AF37; margin-top:20px;">📜 Billing History</p>', unsafe_allow_html=True)
-        conn = sqlite3.connect('advocate_elite.db'); c = conn.cursor()
-        c.execute('SELECT client_name, amount, date FROM invoices WHERE username=?', (st.session_state.user,))
-        inv_data = c.fetchall(); conn.close()
-        for i in inv_data: st.caption(f"👤 {i[0]} | Rs.{i[1]} | 📅 {i[2]}")
+        panels.ledger_panel(pool, st.session_state.user)
         st.markdown('</div>', unsafe_allow_html=True)
 
+    with tab5:
+        panels.calendar_view(pool, st.session_state.user)
+
 st.markdown('<p style="text-align:center; color:#555; font-size:12px;">DISCLAIMER: This is an AI assistant. Verify all citations.</p>', unsafe_allow_html=True)
\ No newline at end of file
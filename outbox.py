@@ -0,0 +1,176 @@
+"""Persistent email outbox drained by a background worker over a reused SMTP session."""
+import logging
+import random
+import threading
+import time
+
+import telemetry
+from db import cache_resource
+
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 5.0
+BACKOFF_MAX = 600.0
+SESSION_IDLE_TIMEOUT = 60.0
+POLL_INTERVAL = 5.0
+
+STATUS_ICONS = {'queued': '⏳', 'sending': '📤', 'sent': '✅', 'failed': '❌'}
+
+log = logging.getLogger(__name__)
+
+
+# --- 1. QUEUE ---
+def enqueue(pool, username, recipient, subject, body, attachment=None, filename=None):
+    """Stores the message and returns its outbox id; delivery happens on the worker thread."""
+    now = time.time()
+    with pool.connection() as conn:
+        cur = conn.execute('INSERT INTO outbox (username, recipient, subject, body, attachment, filename, next_attempt, created) '
+                           'VALUES (?,?,?,?,?,?,?,?)', (username, recipient, subject, body, attachment, filename, now, now))
+        return cur.lastrowid
+
+
+def recent(pool, username, limit=5):
+    """(id, recipient, subject, status, attempts, last_error) newest first."""
+    with pool.connection() as conn:
+        return conn.execute('SELECT id, recipient, subject, status, attempts, last_error FROM outbox '
+                            'WHERE username=? ORDER BY id DESC LIMIT ?', (username, limit)).fetchall()
+
+
+def build_message(sender, recipient, subject, body, attachment=None, filename=None):
+    """Professional Emailer with PDF Attachment"""
+    from email.mime.application import MIMEApplication  # smtplib/email are imported on first send, not at startup
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    message = MIMEMultipart()
+    message["From"] = sender
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.attach(MIMEText(body, "plain"))
+    if attachment is not None:
+        part = MIMEApplication(attachment, _subtype="pdf")
+        part.add_header('Content-Disposition', 'attachment', filename=f"{filename}.pdf")
+        message.attach(part)
+    return message
+
+
+def backoff(attempts):
+    """Exponential delay with full jitter, capped at BACKOFF_MAX."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempts))
+
+
+# --- 2. WORKER ---
+class OutboxWorker(threading.Thread):
+    """Daemon thread that keeps one authenticated SMTP session open and drains the outbox in batches."""
+
+    def __init__(self, pool, sender, password, host="smtp.gmail.com", port=465, use_ssl=True):
+        super().__init__(name="outbox-worker", daemon=True)
+        self.pool = pool
+        self.sender = sender
+        self.password = password
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self._smtp = None
+        self._last_used = 0.0
+        with pool.connection() as conn:  # messages claimed by a process that died mid-send
+            conn.execute("UPDATE outbox SET status='queued' WHERE status='sending'")
+
+    def notify(self):
+        self.wakeup.set()
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                sent_any = self.drain_once()
+            except Exception:
+                log.exception("outbox batch failed")
+                sent_any = False
+                self._close()
+            if not sent_any:
+                if self._smtp is not None and time.monotonic() - self._last_used > SESSION_IDLE_TIMEOUT: self._close()
+                self.wakeup.wait(POLL_INTERVAL)
+                self.wakeup.clear()
+        self._close()
+
+    def drain_once(self):
+        """Send one batch of due messages; returns True if anything was attempted."""
+        batch = self._claim()
+        for row in batch: self._deliver(*row)
+        return bool(batch)
+
+    def _claim(self):
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT id, recipient, subject, body, attachment, filename, attempts FROM outbox "
+                                "WHERE status='queued' AND next_attempt<=? ORDER BY next_attempt LIMIT ?",
+                                (time.time(), BATCH_SIZE)).fetchall()
+            conn.executemany("UPDATE outbox SET status='sending' WHERE id=?", [(r[0],) for r in rows])
+        return rows
+
+    def _deliver(self, msg_id, recipient, subject, body, attachment, filename, attempts):
+        import smtplib
+        try:
+            payload = build_message(self.sender, recipient, subject, body, attachment, filename).as_string()
+            session = self._session()
+            with telemetry.span('smtp', 'send') as sp:
+                sp.size = len(payload)
+                session.sendmail(self.sender, recipient, payload)
+            self._last_used = time.monotonic()
+        except (smtplib.SMTPException, OSError) as e:
+            self._close()
+            attempts += 1
+            status = 'failed' if attempts >= MAX_ATTEMPTS or isinstance(e, smtplib.SMTPRecipientsRefused) else 'queued'
+            with self.pool.connection() as conn:
+                conn.execute('UPDATE outbox SET status=?, attempts=?, next_attempt=?, last_error=? WHERE id=?',
+                             (status, attempts, time.time() + backoff(attempts), str(e), msg_id))
+            return
+        except Exception as e:  # a message that can never be built or sent (e.g. a newline in a header): don't retry it
+            log.exception("outbox message %s failed", msg_id)
+            with self.pool.connection() as conn:
+                conn.execute("UPDATE outbox SET status='failed', attempts=?, last_error=? WHERE id=?",
+                             (attempts + 1, f"{type(e).__name__}: {e}", msg_id))
+            return
+        with self.pool.connection() as conn:
+            conn.execute("UPDATE outbox SET status='sent', attempts=?, sent=?, last_error=NULL WHERE id=?",
+                         (attempts + 1, time.time(), msg_id))
+
+    def _session(self):
+        """The pooled SMTP connection, reconnecting only if the server dropped it."""
+        import smtplib
+        import ssl
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250: return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close()
+        with telemetry.span('smtp', 'connect'):
+            if self.use_ssl:
+                server = smtplib.SMTP_SSL(self.host, self.port, context=ssl.create_default_context(), timeout=30)
+            else:
+                server = smtplib.SMTP(self.host, self.port, timeout=30)
+            server.ehlo()
+        if self.password and server.has_extn('auth'):
+            with telemetry.span('smtp', 'login'): server.login(self.sender, self.password)
+        self._smtp = server
+        return server
+
+    def _close(self):
+        if self._smtp is None: return
+        import smtplib
+        try: self._smtp.quit()
+        except (smtplib.SMTPException, OSError): pass
+        self._smtp = None
+
+
+@cache_resource
+def get_worker(_pool, sender, password, host="smtp.gmail.com", port=465, use_ssl=True):
+    """One running worker per server process (the leading underscore keeps the pool out of the cache key)."""
+    worker = OutboxWorker(_pool, sender, password, host, port, use_ssl)
+    worker.start()
+    return worker
@@ -0,0 +1,48 @@
+import streamlit as st
+import json
+import time
+
+import telemetry
+
+st.set_page_config(page_title="METRICS | ADVOCATE ELITE", layout="wide")
+
+# --- 1. ADMIN GATE ---
+# main.py keeps the login in `user`, a.py in `user_name`
+user = st.session_state.get("user") or st.session_state.get("user_name")
+if not st.session_state.get("auth") or user not in st.secrets.get("ADMIN_USERS", []):
+    st.error("Admins only. Log in with an account listed under ADMIN_USERS in .streamlit/secrets.toml.")
+    st.stop()
+
+# --- 2. ROLLING VIEW ---
+st.title("📊 Hot-path Metrics")
+c1, c2 = st.columns([3, 1])
+minutes = c1.slider("Window (minutes)", 1, telemetry.WINDOW_SLOTS, 5)
+kinds = c2.multiselect("Kinds", ["db", "gemini", "pdf", "smtp"], default=["db", "gemini", "pdf", "smtp"])
+snap = telemetry.snapshot(minutes)
+rows = [r for r in snap["spans"] if r["kind"] in kinds]
+
+if not rows:
+    st.info("No spans recorded in this window yet.")
+else:
+    slowest = max(rows, key=lambda r: r["p95_ms"])
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Calls", sum(r["count"] for r in rows))
+    m2.metric("Errors", sum(r["errors"] for r in rows))
+    m3.metric("Slowest p95", f"{slowest['p95_ms']:.0f} ms", f"{slowest['kind']}/{slowest['op']}", delta_color="off")
+    st.dataframe([{"kind": r["kind"], "op": r["op"], "calls": r["count"], "per min": round(r["count"] / minutes, 1),
+                   "p50 ms": round(r["p50_ms"], 2), "p95 ms": round(r["p95_ms"], 2), "p99 ms": round(r["p99_ms"], 2),
+                   "mean ms": round(r["mean_ms"], 2), "errors": r["errors"], "KB": round(r["bytes"] / 1024, 1)}
+                  for r in sorted(rows, key=lambda r: -r["p95_ms"])], use_container_width=True, hide_index=True)
+    st.bar_chart({f"{r['kind']}/{r['op']}": r["p95_ms"] for r in rows})
+
+counters = [c for c in snap["counters"] if c["kind"] in kinds]
+if counters:
+    st.markdown("**Counters** (since server start): tokens, cache hits, cancelled streams, request bytes")
+    st.dataframe(counters, use_container_width=True, hide_index=True)
+
+# --- 3. EXPORT ---
+d1, d2 = st.columns(2)
+d1.download_button("⬇️ Prometheus text", telemetry.prometheus_text(), "metrics.prom", mime="text/plain")
+d2.download_button("⬇️ JSON snapshot", json.dumps(snap, indent=1), "metrics.json", mime="application/json")
+st.caption(f"Snapshot at {time.strftime('%H:%M:%S')}; the app also writes metrics.prom/metrics.json every "
+           f"{telemetry.EXPORT_INTERVAL:.0f} s for scraping.")
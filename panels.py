@@ -0,0 +1,137 @@
+"""Streamlit panels shared by both entry points. Each takes the pool it reads (the advocate's shard,
+or the directory for the outbox) so it works with either app's store."""
+import datetime
+
+import streamlit as st
+
+import db
+import docket
+import draft_store
+import ledger
+import outbox
+
+
+def open_draft(pool, username, draft_id):
+    row = db.get_draft(pool, username, draft_id)
+    if row:
+        st.session_state.editor, st.session_state.doc_id = row[2], draft_id
+        draft_store.seed(st.session_state, row[2])
+
+
+@st.fragment(run_every=draft_store.AUTOSAVE_QUIET)
+def autosave_panel(pool, username, dtype, category="Civil"):
+    """Saves the editor once it has sat unchanged for a few seconds; on its own timer, so the last edit is kept too"""
+    version = draft_store.autosave(pool, st.session_state, username, dtype, st.session_state.get("editor", ""), datetime.date.today(), category)
+    if version: st.session_state.autosaved = f"💾 Autosaved v{version} at {datetime.datetime.now():%H:%M}"
+    if st.session_state.get("autosaved"): st.caption(st.session_state.autosaved)
+
+
+def restore_version(pool, username, draft_id, version):
+    text = draft_store.load_version(pool, username, draft_id, version)
+    if text is not None: st.session_state.editor = text
+
+
+def version_panel(pool, username):
+    """Version chain of the open draft, with one-click restore"""
+    draft_id = st.session_state.get("doc_id")
+    if draft_id is None: return
+    with st.expander("🕘 Version History"):
+        for version, kind, stored, raw, created in draft_store.history(pool, username, draft_id)[:20]:
+            v1, v2 = st.columns([5, 1])
+            v1.caption(f"v{version} | {datetime.datetime.fromtimestamp(created):%d %b %H:%M} | {kind} | {stored / 1024:.1f} KB stored of {raw / 1024:.1f} KB")
+            v2.button("Restore", key=f"restore_{draft_id}_{version}", on_click=restore_version, args=(pool, username, draft_id, version))
+
+
+def draft_search_panel(pool, username):
+    """Ranked full-text search over the advocate's saved drafts"""
+    st.markdown('<p style="color:#00FFCC; margin-top:20px;">🔎 Search Saved Drafts</p>', unsafe_allow_html=True)
+    found = st.text_input("Search drafts", placeholder="e.g. anticipatory bail 438", label_visibility="collapsed")
+    if not found: return
+    hits = db.search_drafts(pool, username, found)
+    if not hits: st.caption("No matching drafts.")
+    for draft_id, doc_type, category, snippet, _ in hits:
+        h1, h2 = st.columns([5, 1])
+        h1.markdown(f"**{doc_type}** · {category} — {snippet}")
+        h2.button("Open", key=f"open_draft_{draft_id}", on_click=open_draft, args=(pool, username, draft_id))
+
+
+def move_month(step):
+    st.session_state.cal_year, st.session_state.cal_month = docket.shift_month(st.session_state.cal_year, st.session_state.cal_month, step)
+    st.session_state.cal_page = 1
+
+
+def calendar_view(pool, username):
+    """Month-by-month hearing calendar, paginated"""
+    if "cal_year" not in st.session_state:
+        today = datetime.date.today()
+        st.session_state.cal_year, st.session_state.cal_month = today.year, today.month
+    st.markdown('<div class="glass-card">', unsafe_allow_html=True)
+    n1, n2, n3 = st.columns([1, 3, 1])
+    n1.button("◀ Prev", on_click=move_month, args=(-1,), use_container_width=True)
+    n2.markdown(f'<p class="section-header" style="text-align:center;">📅 {datetime.date(st.session_state.cal_year, st.session_state.cal_month, 1):%B %Y}</p>', unsafe_allow_html=True)
+    n3.button("Next ▶", on_click=move_month, args=(1,), use_container_width=True)
+    _, total = docket.month_page(pool, username, st.session_state.cal_year, st.session_state.cal_month)
+    pages = max(1, -(-total // docket.PAGE_SIZE))
+    page = st.number_input(f"Page (of {pages}, {total} matters)", 1, pages, key="cal_page") if pages > 1 else 1
+    rows, _ = docket.month_page(pool, username, st.session_state.cal_year, st.session_state.cal_month, page - 1)
+    day = None
+    for _, case, hdate, category in rows:
+        if hdate != day:
+            day = hdate
+            st.markdown(f'<p style="color:#00FFCC; margin:10px 0 0 0;">{datetime.date.fromisoformat(hdate):%a %d %b}</p>', unsafe_allow_html=True)
+        st.caption(f"⚖️ {case or '(untitled)'} | {category}")
+    if not rows: st.caption("No hearings this month.")
+    st.markdown('</div>', unsafe_allow_html=True)
+
+
+def ledger_panel(pool, username):
+    """Billing history one page at a time, totals from the summary tables, CSV import"""
+    st.markdown('<p style="color:#D4AF37; margin-top:20px;">📜 Billing History</p>', unsafe_allow_html=True)
+    billed, count = ledger.grand_total(pool, username)
+    m1, m2 = st.columns(2)
+    m1.metric("Total Billed", f"Rs. {billed:,.2f}")
+    m2.metric("Invoices", count)
+    pages = max(1, -(-count // ledger.PAGE_SIZE))
+    number = st.number_input(f"Page (of {pages})", 1, pages, key="ledger_page") if pages > 1 else 1
+    st.dataframe([{"Client": c, "Amount (Rs.)": a, "Date": d} for c, a, d in ledger.page(pool, username, number - 1)],
+                 use_container_width=True, hide_index=True)
+    t1, t2 = st.columns(2)
+    t1.caption("Top clients")
+    t1.dataframe([{"Client": c, "Total (Rs.)": t, "Invoices": n} for c, t, n in ledger.client_totals(pool, username)],
+                 use_container_width=True, hide_index=True)
+    t2.caption("By month")
+    t2.bar_chart({m: t for m, t, _ in reversed(ledger.month_totals(pool, username))})
+    with st.expander("📥 Bulk Import (CSV)"):
+        up = st.file_uploader("CSV with columns client_name, amount, date", type=['csv'], key="ledger_csv")
+        if up and st.button("Import Invoices"):
+            rep = ledger.import_csv(pool, username, up.getvalue())
+            st.success(f"Imported {rep.inserted} invoices in {rep.seconds:.2f}s ({rep.rows_per_second:,.0f} rows/s)")
+            if rep.encoding != "utf-8": st.caption(f"Not UTF-8: read as {rep.encoding} (Excel's Windows encoding)")
+            if rep.rejected:
+                st.warning(f"{rep.rejected} rows rejected")
+                st.dataframe([{"Line": line, "Problem": msg} for line, msg in rep.errors], hide_index=True)
+
+
+def outbox_status(directory, username):
+    """Delivery status of the latest outbox messages"""
+    for _, to, subj, status, attempts, err in outbox.recent(directory, username):
+        retry = f" | attempt {attempts}: {err}" if err and status != "sent" else ""
+        st.caption(f"{outbox.STATUS_ICONS.get(status, '')} {to} | {subj}{retry}")
+
+
+def cache_badge(res):
+    """Marks answers served from the response cache"""
+    if getattr(res, "cached", False): st.caption(f"⚡ Served from cache (saved ~{res.latency:.1f}s of API time)")
+
+
+def source_caption(found, res, learned):
+    """Where a Researcher answer came from when the precedent index could not serve it"""
+    st.caption(f"🤖 From Gemini in {res.total:.1f}s after a {found.seconds * 1000:.1f} ms index lookup "
+               f"(closest past question {found.similarity:.0%}) | {len(learned)} citations indexed")
+
+
+def stream_caption(res):
+    """Time-to-first-token and total time for a streamed answer"""
+    if res.cached: st.caption("⚡ Served from cache")
+    elif res.cancelled: st.caption("⏹ Stopped")
+    else: st.caption(f"First token {res.first_token:.1f}s | full answer {res.total:.1f}s")
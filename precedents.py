@@ -0,0 +1,189 @@
+"""Local precedent index for the Researcher: citations parsed out of Gemini's answers are kept as
+records (case name, year, court, citation, scope) in SQLite with an FTS5/BM25 index, so a question
+the firm has asked before is answered from disk and only new ground goes to the model."""
+import re
+import time
+
+import telemetry
+
+GENERAL = 'General'  # main.py's Researcher has no Civil/Criminal scope
+RESULTS = 3  # the prompts ask for 3 citations
+# A past question vouches for the citations it found only if it shares most of its significant words
+# with the new one, counted both ways (Jaccard), question by question: "bail" is not answered by
+# "cancellation of anticipatory bail in a dowry murder case", nor "cancellation of maintenance" by
+# "grant of maintenance" and "cancellation of tenancy" together. At 0.8 an extra word is let through
+# from 4 terms up, a swapped one ("grant" for "cancellation") never within MAX_TERMS.
+MIN_SIMILARITY = 0.8
+MAX_TERMS = 8
+CANDIDATES = 50  # past questions scored per lookup
+HOLDING_CHARS = 400
+TOPICS_CHARS = 2000
+STOPWORDS = frozenset('a an and are as at be by case cases citation citations court for from give in is law laws list me '
+                      'of on or provide sc supreme the to under what which with'.split())
+
+# Reporter citations as Gemini usually writes them; each yields (citation, year, court hint).
+_SC_REPORTERS = r'SCC|SCR|SCALE|JT|Supreme'
+CITATION_PATTERNS = (
+    (re.compile(r'\((\d{4})\)\s*(\d+)\s*(' + _SC_REPORTERS + r')\s*(\d+)'), lambda m: (f'({m[1]}) {m[2]} {m[3]} {m[4]}', m[1], 'SC')),
+    (re.compile(r'\b(\d{4})\s*\((\d+)\)\s*(' + _SC_REPORTERS + r')\s*(\d+)'), lambda m: (f'({m[1]}) {m[2]} {m[3]} {m[4]}', m[1], 'SC')),
+    (re.compile(r'\[(\d{4})\]\s*(\d+)\s*(SCR)\s*(\d+)'), lambda m: (f'[{m[1]}] {m[2]} SCR {m[4]}', m[1], 'SC')),
+    (re.compile(r'\b(\d{4})\s*SCC\s*OnLine\s*([A-Z][A-Za-z]*)\s*(\d+)'), lambda m: (f'{m[1]} SCC OnLine {m[2]} {m[3]}', m[1], m[2])),
+    (re.compile(r'\bAIR\s*(\d{4})\s*([A-Z][A-Za-z]*)\s*(\d+)'), lambda m: (f'AIR {m[1]} {m[2]} {m[3]}', m[1], m[2])),
+    (re.compile(r'\b(\d{4})\s*INSC\s*(\d+)'), lambda m: (f'{m[1]} INSC {m[2]}', m[1], 'SC')),
+    (re.compile(r'\((\d{4})\)\s*(\d+)?\s*(Cri\.?\s*L\.?\s*J\.?)\s*(\d+)'), lambda m: (f'({m[1]}) {m[2] + " " if m[2] else ""}Cri LJ {m[4]}', m[1], '')),
+)
+CASE_NAME = re.compile(r"([A-Z][\w.&'/()-]*(?:\s+[\w.&'/()-]+)*?)\s+(?:v\.?|vs\.?|versus)\s+"
+                       r"([A-Z][\w.&'/-]*(?:\s+(?!AIR\b)[\w.&'/-]+)*?)(?=\s*[,:;(\[\]]|\s+AIR\b|\s+\d{4}\b|\s+-|$)")
+ITEM_START = re.compile(r'^\s*(?:\d+[.)]|[-*•])\s+', re.M)
+LABEL = re.compile(r'\b(?:Citation|Case|Held|Holding|Ratio|Relevance|Facts|Court|Year)\s*:\s*', re.I)
+MARKUP = re.compile(r'[*_`#>]+')
+
+SQL_LEARN = ('INSERT INTO precedents (scope, case_name, year, court, citation, holding, topics, created) VALUES (?,?,?,?,?,?,?,?) '
+             'ON CONFLICT(scope, citation) DO UPDATE SET '
+             "holding=CASE WHEN precedents.holding = '' THEN excluded.holding ELSE precedents.holding END, "
+             "topics=CASE WHEN instr(precedents.topics, excluded.topics) OR length(precedents.topics) > ? "
+             "THEN precedents.topics ELSE precedents.topics || ' | ' || excluded.topics END")
+SQL_ADD_QUESTION = ('INSERT OR IGNORE INTO precedent_questions (precedent_id, terms) '
+                    'SELECT id, ? FROM precedents WHERE scope = ? AND citation = ?')
+# A scoped Researcher also sees citations learnt from main.py's unscoped one
+SQL_QUESTIONS = ('SELECT q.precedent_id, q.terms FROM precedent_questions_fts '
+                 'JOIN precedent_questions q ON q.id = precedent_questions_fts.rowid JOIN precedents p ON p.id = q.precedent_id '
+                 'WHERE precedent_questions_fts MATCH ? AND (? IS NULL OR p.scope IN (?, ?)) ORDER BY rank LIMIT ?')
+SQL_RECORD = 'SELECT case_name, year, court, citation, holding, scope FROM precedents WHERE id = ?'
+SQL_BUMP_HITS = 'UPDATE precedents SET hits = hits + 1 WHERE scope = ? AND citation = ?'
+SQL_COUNT = 'SELECT scope, COUNT(*), COALESCE(SUM(hits), 0) FROM precedents GROUP BY scope'
+
+
+class Precedent:
+    def __init__(self, case_name, year, court, citation, holding, scope=GENERAL):
+        self.case_name = case_name
+        self.year = year
+        self.court = court
+        self.citation = citation
+        self.holding = holding
+        self.scope = scope
+
+    def markdown(self):
+        where = ', '.join(str(x) for x in (self.court, self.year) if x)
+        line = f"**{self.case_name or 'Unnamed'}**, {self.citation}" + (f" ({where})" if where else '')
+        return line + (f" — {self.holding}" if self.holding else '')
+
+
+class Lookup:
+    def __init__(self, records, similarity, seconds):
+        self.records = records  # best first, each found by a past question at least MIN_SIMILARITY alike
+        self.similarity = similarity  # of the closest past question, 0.0 when none shared a word
+        self.seconds = seconds
+
+    @property
+    def strong(self):
+        return len(self.records) >= RESULTS
+
+
+# --- 1. PARSING ---
+def court_of(hint, text):
+    if hint == 'SC': return 'Supreme Court'
+    if hint: return f'{hint} High Court'
+    if re.search(r'\bHigh Court\b|\bHC\b', text): return 'High Court'
+    return 'Supreme Court' if re.search(r'\bSupreme Court\b|\bSC\b', text) else ''
+
+
+def find_citation(text):
+    """(start, end, citation, year, court hint) of the first reporter citation in `text`, else None."""
+    best = None
+    for pattern, build in CITATION_PATTERNS:
+        m = pattern.search(text)
+        if m and (best is None or m.start() < best[0]): best = (m.start(), m.end(), *build(m))
+    return best
+
+
+def items(answer):
+    """The answer split into one chunk per listed case: numbered or bulleted items, else paragraphs."""
+    starts = [m.start() for m in ITEM_START.finditer(answer)]
+    if not starts: return [p for p in re.split(r'\n\s*\n', answer) if p.strip()]
+    return [answer[a:b] for a, b in zip(starts, starts[1:] + [len(answer)])]
+
+
+def parse_citations(answer, scope=GENERAL):
+    """[Precedent] for every item of a Researcher answer that carries a reporter citation."""
+    out, seen = [], set()
+    for item in items(answer):
+        text = ' '.join(MARKUP.sub('', ITEM_START.sub('', item, count=1)).split())
+        found = find_citation(text)
+        if found is None: continue
+        start, end, citation, year, hint = found
+        if citation in seen: continue
+        seen.add(citation)
+        name = CASE_NAME.search(LABEL.sub('', text))
+        case_name = f'{name[1].strip()} v. {name[2].strip()}' if name else ''
+        rest = text[:start] + ' ' + text[end:]
+        if name: rest = rest.replace(name[0], ' ', 1)
+        holding = LABEL.sub('', rest)
+        holding = re.sub(r'^[\s,:;.()\[\]–—-]+', '', ' '.join(holding.split()))
+        if len(holding) > HOLDING_CHARS: holding = holding[:HOLDING_CHARS].rsplit(' ', 1)[0] + '…'
+        out.append(Precedent(case_name, int(year), court_of(hint, text), citation, holding, scope))
+    return out
+
+
+def terms(query):
+    """Lower-cased significant words of a question, in order, without repeats."""
+    words = [w for w in re.findall(r'\w+', query.lower()) if len(w) > 1 and w not in STOPWORDS]
+    return list(dict.fromkeys(words))[:MAX_TERMS]
+
+
+def question_terms(query):
+    """A question as it is stored in precedent_questions: its terms, sorted, space-separated."""
+    return ' '.join(sorted(terms(query)))
+
+
+def similarity(a, b):
+    """Jaccard similarity of two term lists."""
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a | b else 0.0
+
+
+# --- 2. INDEX ---
+def learn(pool, scope, query, answer):
+    """Parse a model answer and file each citation under `scope`, remembering the question that found it."""
+    records = parse_citations(answer, scope)
+    if not records: return records
+    topic, question, now = ' '.join(query.split()), question_terms(query), time.time()
+    with pool.connection() as conn:
+        conn.executemany(SQL_LEARN, [(r.scope, r.case_name, r.year, r.court, r.citation, r.holding, topic, now, TOPICS_CHARS)
+                                     for r in records])
+        if question: conn.executemany(SQL_ADD_QUESTION, [(question, r.scope, r.citation) for r in records])
+    return records
+
+
+def lookup(pool, query, scope=None, k=RESULTS, min_similarity=MIN_SIMILARITY):
+    """Citations found by earlier questions like `query`, closest first; `.strong` when k of them were."""
+    start = time.perf_counter()
+    words = terms(query)
+    if not words: return Lookup([], 0.0, time.perf_counter() - start)
+    match = ' OR '.join(f'"{w}"' for w in words)
+    with pool.connection() as conn:
+        best = {}  # precedent id -> its closest past question, in rank order of first sighting
+        for pid, question in conn.execute(SQL_QUESTIONS, (match, scope, scope, GENERAL, CANDIDATES)):
+            best[pid] = max(best.get(pid, 0.0), similarity(words, question.split()))
+        keep = sorted((pid for pid, sim in best.items() if sim >= min_similarity), key=lambda pid: -best[pid])[:k]
+        records = [Precedent(*conn.execute(SQL_RECORD, (pid,)).fetchone()) for pid in keep]
+    found = Lookup(records, max(best.values(), default=0.0), time.perf_counter() - start)
+    if not found.strong: telemetry.count('gemini', 'researcher', 'index_misses')
+    return found
+
+
+def served(pool, found):
+    """Record that `found` answered a question without the model: one hit, credited to its lead citation."""
+    lead = found.records[0]
+    with pool.connection() as conn: conn.execute(SQL_BUMP_HITS, (lead.scope, lead.citation))
+    telemetry.count('gemini', 'researcher', 'index_hits')
+
+
+def to_markdown(records):
+    return '\n'.join(f'{n}. {r.markdown()}' for n, r in enumerate(records, 1))
+
+
+def stats(pool):
+    """{scope: (citations, questions served from the index)}"""
+    with pool.connection() as conn:
+        return {scope: (n, hits) for scope, n, hits in conn.execute(SQL_COUNT)}
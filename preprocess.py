@@ -0,0 +1,168 @@
+"""Shrinks scans before OCR: EXIF orientation, downscale, grayscale/binarize, compact re-encode, dedupe."""
+import io
+import time
+
+import numpy as np  # ships with streamlit
+from PIL import Image, ImageFilter, ImageOps
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+# Near-duplicate check on an ink mask of the page. Pages are aligned as a whole, then every tile may
+# shift by up to PROBE_SHIFT px (rotation and skew of a rescan) and strokes may be 1 px off. A page
+# is a duplicate only if no tile has more than MAX_TILE_DIFF ink pixels the other page lacks. On A4
+# test pages rescans scored 0-3, pages differing in 3 of 45 lines 190+, in one word 65+. The 256-bit
+# hash only picks candidates: rescans were 9-24 bits apart, distinct pages of one layout 29+.
+PROBE_WIDTH = 640
+PROBE_TILE = 32
+PROBE_SHIFT = 3
+INK_LEVEL = 200
+MAX_TILE_DIFF = 24
+DEDUPE_CANDIDATES = 2  # nearest-hash earlier pages checked on pixels, which costs ~0.3 s a pair
+
+
+class PreprocessConfig:
+    def __init__(self, max_dim=1600, grayscale=True, binarize=False, threshold=160, fmt='JPEG', quality=70,
+                 dedupe=True, max_hash_distance=24):
+        self.max_dim = max_dim
+        self.grayscale = grayscale
+        self.binarize = binarize
+        self.threshold = threshold
+        self.fmt = fmt
+        self.quality = quality
+        self.dedupe = dedupe
+        self.max_hash_distance = max_hash_distance
+
+
+class Prepared:
+    """Compact blob ready for `generate_content`, plus what it cost and saved."""
+
+    def __init__(self, blob, bytes_before, bytes_after, seconds, phash, probe=None):
+        self.blob = blob
+        self.bytes_before = bytes_before  # None when the upload size was not measured
+        self.bytes_after = bytes_after
+        self.seconds = seconds
+        self.phash = phash
+        self.probe = probe  # packed ink mask (see ink_probe), which confirms a hash match
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_before - self.bytes_after if self.bytes_before is not None else 0
+
+
+def dhash(img, size=16):
+    """256-bit difference hash. Only a prefilter: text pages that share a layout are a few bits apart
+    even when some of their lines differ, so a match is confirmed on the ink mask."""
+    small = img.convert('L').resize((size + 1, size), Image.BILINEAR)
+    px = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            bits = (bits << 1) | (px[row * (size + 1) + col] > px[row * (size + 1) + col + 1])
+    return bits
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def encoded_size(img):
+    """What the SDK would upload for an unprocessed PIL image (it sends PNG for non-JPEG sources)."""
+    buf = io.BytesIO()
+    img.save(buf, format='JPEG' if img.format == 'JPEG' else 'PNG')
+    return buf.tell()
+
+
+def ink_probe(img):
+    """(shape, packed bits) of a PROBE_WIDTH-wide ink mask; strokes are thickened first so thin rules
+    and hairlines survive the downscale."""
+    img = ImageOps.autocontrast(img.convert('L'), cutoff=1)
+    img = img.resize((2 * PROBE_WIDTH, max(1, round(img.height * 2 * PROBE_WIDTH / img.width))), Image.BOX)
+    img = img.filter(ImageFilter.MinFilter(3))
+    img = img.resize((PROBE_WIDTH, max(1, img.height // 2)), Image.BOX)
+    mask = np.asarray(img) < INK_LEVEL
+    return mask.shape, np.packbits(mask)
+
+
+def _unpack(probe):
+    shape, bits = probe
+    return np.unpackbits(bits, count=shape[0] * shape[1]).reshape(shape).astype(bool)
+
+
+def _shift(a, dy, dx):
+    out = np.zeros_like(a)
+    h, w = a.shape
+    out[max(dy, 0):h + min(dy, 0), max(dx, 0):w + min(dx, 0)] = a[max(-dy, 0):h + min(-dy, 0), max(-dx, 0):w + min(-dx, 0)]
+    return out
+
+
+def _offset(a, b):
+    """(dy, dx) that best moves `b` onto `a`, by phase correlation."""
+    cross = np.fft.rfft2(a.astype(np.float32)) * np.conj(np.fft.rfft2(b.astype(np.float32)))
+    corr = np.fft.irfft2(cross / (np.abs(cross) + 1e-9), s=a.shape)
+    dy, dx = np.unravel_index(int(np.argmax(corr)), corr.shape)
+    h, w = a.shape
+    return int(dy - h if dy > h // 2 else dy), int(dx - w if dx > w // 2 else dx)
+
+
+def _tiles(x):
+    h, w = x.shape[0] - x.shape[0] % PROBE_TILE, x.shape[1] - x.shape[1] % PROBE_TILE
+    return x[:h, :w].reshape(h // PROBE_TILE, PROBE_TILE, w // PROBE_TILE, PROBE_TILE).sum(axis=(1, 3))
+
+
+def _grow(x):
+    out = x.copy()
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1): out |= _shift(x, dy, dx)
+    return out
+
+
+def tile_difference(p, q):
+    """Ink pixels in the worst tile that one page has and the other lacks, after alignment."""
+    a, b = _unpack(p), _unpack(q)
+    if abs(a.shape[0] - b.shape[0]) > PROBE_TILE: return PROBE_TILE * PROBE_TILE  # different page sizes
+    h = min(a.shape[0], b.shape[0])
+    a, b = a[:h], b[:h]
+    b = _shift(b, *_offset(a, b))
+    grown_a, grown_b = _grow(a), _grow(b)
+    best = None
+    for dy in range(-PROBE_SHIFT, PROBE_SHIFT + 1):
+        for dx in range(-PROBE_SHIFT, PROBE_SHIFT + 1):
+            diff = _tiles(a & ~_shift(grown_b, dy, dx)) + _tiles(_shift(b, dy, dx) & ~grown_a)
+            best = diff if best is None else np.minimum(best, diff)
+    return int(best.max()) if best is not None and best.size else 0
+
+
+def preprocess(img, cfg, source_bytes=None, measure=True):
+    """`measure=False` skips encoding the original just to report its size (~0.25 s for a rendered
+    A4 page) when `source_bytes` is unknown; bytes_before is then None."""
+    start = time.perf_counter()
+    before = source_bytes if source_bytes is not None else encoded_size(img) if measure else None
+    img = ImageOps.exif_transpose(img)
+    phash = dhash(img)
+    probe = ink_probe(img) if cfg.dedupe else None
+    if max(img.size) > cfg.max_dim:
+        img = img.copy()
+        img.thumbnail((cfg.max_dim, cfg.max_dim), Image.LANCZOS)
+    if cfg.grayscale or cfg.binarize:
+        img = img.convert('L')
+        if cfg.binarize: img = img.point(lambda v: 255 if v > cfg.threshold else 0)
+    elif img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    buf = io.BytesIO()
+    img.save(buf, format=cfg.fmt, quality=cfg.quality, optimize=cfg.fmt == 'JPEG')
+    data = buf.getvalue()
+    blob = {"mime_type": MIME_TYPES[cfg.fmt], "data": data}
+    return Prepared(blob, before, len(data), time.perf_counter() - start, phash, probe)
+
+
+def find_duplicates(prepared, max_distance):
+    """{index: index of the earlier page it duplicates}. Candidates are earlier kept pages within
+    max_distance hash bits, nearest first; one is a duplicate only if its ink mask matches too
+    (tile_difference <= MAX_TILE_DIFF). A page that merely shares a layout is still OCR'd."""
+    dupes, kept = {}, []
+    for i, p in enumerate(prepared):
+        if p is None or p.probe is None: continue
+        near = sorted((d, j) for j in kept if (d := hamming(prepared[j].phash, p.phash)) <= max_distance)
+        match = next((j for _, j in near[:DEDUPE_CANDIDATES] if tile_difference(prepared[j].probe, p.probe) <= MAX_TILE_DIFF), None)
+        if match is None: kept.append(i)
+        else: dupes[i] = match
+    return dupes
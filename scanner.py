@@ -0,0 +1,198 @@
+"""Batch Evidence Scanner: split uploads into pages and OCR them concurrently."""
+import concurrent.futures
+import io
+import statistics
+import threading
+import time
+
+from PIL import Image
+
+import preprocess
+
+try:
+    import pypdfium2  # optional: rasterizes PDFs so each page is OCR'd on its own
+except ImportError:
+    pypdfium2 = None
+
+OCR_PROMPT = "Extract the text of this page of a legal document verbatim:"
+MAX_WORKERS = 4
+PDF_RENDER_SCALE = 2.0
+
+
+class Page:
+    """One page of an upload. PDF pages and TIFF frames are only rendered when `image()` is called, on
+    the worker that OCRs them, so a 100-page upload never holds 100 bitmaps at once."""
+
+    def __init__(self, index, label, content=None, source_bytes=None, load=None):
+        self.index = index
+        self.label = label
+        self.content = content  # PIL image, or an inline blob dict the SDK accepts; None until loaded
+        self.source_bytes = source_bytes  # size of the uploaded encoding, when it maps 1:1 to this page
+        self._load = load
+
+    def image(self):
+        """The page content, rendering it now if it is lazy; lazy pages are not kept afterwards."""
+        return self.content if self._load is None else self._load()
+
+
+class PageResult:
+    def __init__(self, page, text, latency, error=None, prepared=None, raw_latency=None, duplicate_of=None):
+        self.index = page.index
+        self.label = page.label
+        self.text = text
+        self.latency = latency  # end to end: preprocessing + OCR
+        self.error = error
+        self.prepared = prepared
+        self.raw_latency = raw_latency  # OCR of the unprocessed page, only measured in compare mode
+        self.duplicate_of = duplicate_of
+
+    def describe(self):
+        if self.duplicate_of is not None: return f"skipped, duplicate of page {self.duplicate_of + 1}"
+        parts = [f"{self.latency:.1f}s"]
+        if self.prepared:
+            p = self.prepared
+            before = f"{p.bytes_before / 1024:.0f} KB -> " if p.bytes_before is not None else ""
+            parts.append(f"{before}{p.bytes_after / 1024:.0f} KB (prep {p.seconds * 1000:.0f} ms)")
+        if self.raw_latency is not None: parts.append(f"{self.latency - self.raw_latency:+.1f}s vs unprocessed")
+        return " | ".join(parts)
+
+
+# --- 1. PAGE EXPANSION ---
+_pdfium_lock = threading.Lock()  # pdfium is not thread-safe: one render at a time across workers
+
+
+def _pdf_page(doc, n):
+    def load():
+        with _pdfium_lock: return doc[n].render(scale=PDF_RENDER_SCALE).to_pil()
+    return load
+
+
+def _tiff_frame(data, n, fmt):
+    def load():
+        img = Image.open(io.BytesIO(data))
+        img.seek(n)
+        frame = img.copy()
+        frame.format = fmt
+        return frame
+    return load
+
+
+def expand_pages(files):
+    """[(name, bytes)] -> [Page] in upload order; TIFF frames and PDF pages become separate pages,
+    rendered lazily. Without pypdfium2 a PDF stays one page sent whole (see `pdf_split_available`)."""
+    pages = []
+    for name, data in files:
+        if name.lower().endswith('.pdf'):
+            if pypdfium2 is None:
+                pages.append(Page(len(pages), name, {"mime_type": "application/pdf", "data": data}))
+                continue
+            doc = pypdfium2.PdfDocument(data)
+            for n in range(len(doc)): pages.append(Page(len(pages), f"{name} p.{n + 1}", load=_pdf_page(doc, n)))
+            continue
+        img = Image.open(io.BytesIO(data))
+        frames = getattr(img, 'n_frames', 1)
+        if frames == 1:
+            img.load()
+            pages.append(Page(len(pages), name, img, source_bytes=len(data)))
+        else:
+            for n in range(frames): pages.append(Page(len(pages), f"{name} p.{n + 1}", load=_tiff_frame(data, n, img.format)))
+    return pages
+
+
+def pdf_split_available():
+    return pypdfium2 is not None
+
+
+# --- 2. CONCURRENT OCR ---
+def _call(model, content, prompt, feature):
+    """(text, seconds, error) for one OCR request. Rate limiting and 429 retries happen once, in the
+    model's gateway (gateway.py), shared with every other Gemini call in the process."""
+    start = time.perf_counter()
+    try:
+        res = model.generate_content([prompt, content], feature=feature)
+        return res.text, time.perf_counter() - start, None
+    except Exception as e:
+        return "", time.perf_counter() - start, str(e)
+
+
+def _ocr_one(model, page, prompt, prepared=None, compare=False):
+    # compare mode bypasses the response cache so both timings are real round trips
+    feature = None if compare else "scanner"
+    content = prepared.blob if prepared else page.image()
+    text, seconds, error = _call(model, content, prompt, feature)
+    raw_latency = _call(model, page.image(), prompt, None)[1] if compare and prepared else None
+    latency = seconds + (prepared.seconds if prepared else 0.0)
+    return PageResult(page, text, latency, error, prepared, raw_latency)
+
+
+def _prepare(page, cfg, compare):
+    content = page.image()
+    if not hasattr(content, 'size'): return None  # inline PDF blobs go through untouched
+    # rendered pages have no upload size of their own; estimating one by encoding is only worth it when tuning
+    return preprocess.preprocess(content, cfg, page.source_bytes, measure=compare)
+
+
+def ocr_pages(model, pages, prompt=OCR_PROMPT, max_workers=MAX_WORKERS, cfg=None, compare=False):
+    """Yields PageResult objects as pages finish (completion order, not page order).
+
+    With a PreprocessConfig, pages are shrunk in parallel first and, with `dedupe`, repeats of an
+    earlier page (hash match confirmed on the ink mask) are reported without an OCR call.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr") as pool:
+        prepared = list(pool.map(lambda p: _prepare(p, cfg, compare), pages)) if cfg else [None] * len(pages)
+        dupes = preprocess.find_duplicates(prepared, cfg.max_hash_distance) if cfg and cfg.dedupe else {}
+        for i, j in dupes.items():
+            yield PageResult(pages[i], f"[duplicate of page {j + 1}]", prepared[i].seconds, prepared=prepared[i], duplicate_of=j)
+        futures = [pool.submit(_ocr_one, model, page, prompt, prepared[i], compare)
+                   for i, page in enumerate(pages) if i not in dupes]
+        try:
+            for fut in concurrent.futures.as_completed(futures):
+                yield fut.result()
+        finally:
+            for fut in futures: fut.cancel()  # stop queued pages if the caller abandons the batch
+
+
+def assemble(results):
+    """Single document in page order, with a marker line before each page."""
+    parts = []
+    for r in sorted(results, key=lambda r: r.index):
+        parts.append(f"--- Page {r.index + 1} ({r.label}) ---\n" + (r.text if not r.error else f"[OCR failed: {r.error}]"))
+    return "\n\n".join(parts)
+
+
+class BatchStats:
+    def __init__(self, total):
+        self.total = total
+        self.started = time.perf_counter()
+        self.latencies = []
+        self.errors = 0
+        self.duplicates = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+
+    def add(self, result):
+        self.latencies.append(result.latency)
+        if result.error: self.errors += 1
+        if result.duplicate_of is not None: self.duplicates += 1
+        if result.prepared and result.prepared.bytes_before is not None:
+            self.bytes_before += result.prepared.bytes_before
+            self.bytes_after += result.prepared.bytes_after
+
+    @property
+    def done(self):
+        return len(self.latencies)
+
+    @property
+    def pages_per_minute(self):
+        elapsed = time.perf_counter() - self.started
+        return 60.0 * self.done / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        if not self.latencies: return "No pages processed yet"
+        line = (f"{self.done}/{self.total} pages | {self.pages_per_minute:.1f} pages/min | "
+                f"latency p50 {statistics.median(self.latencies):.1f}s, max {max(self.latencies):.1f}s | {self.errors} errors")
+        if self.bytes_before:
+            saved = self.bytes_before - self.bytes_after
+            line += f" | upload {saved / 1024 / 1024:.1f} MB smaller ({saved / self.bytes_before:.0%})"
+        if self.duplicates: line += f" | {self.duplicates} duplicates skipped"
+        return line
@@ -0,0 +1,328 @@
+"""Moves advocates' hearings, drafts and invoices out of the shared database files into per-tenant
+shards (db.Store) while the app keeps running.
+
+    python shard_tool.py copy   --shard-dir shards [--buckets 0] [--source advocate_elite.db --source legal_app.db]
+    python shard_tool.py verify --shard-dir shards [--buckets 0] [--source ...]
+
+Online cutover:
+  1. Run `copy` with the app still unsharded. Sources are read in short batches (WAL readers never
+     block the app's writers; --pause yields between batches). Each shard records which source rows
+     it holds in the same transaction as the rows, so an interrupted or repeated copy never
+     duplicates anything, and a rerun only moves rows that are new or drafts that were re-saved.
+  2. Repeat `copy` until it moves next to nothing, then `verify`: row counts and order-independent
+     checksums per advocate and table, sources against shards.
+  3. Set SHARD_DIR (and SHARD_BUCKETS) in .streamlit/secrets.toml and restart, then `copy` and
+     `verify` once more for writes made during the restart. `verify` reports advocates who have
+     written since as "ahead", which is expected.
+
+Users (for login) are merged into the directory, which is the first --source unless --directory is
+given. The per-user tables are left in the source files as a backup.
+"""
+import argparse
+import collections
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+import db
+
+BATCH = 2000
+SQL_COPIED_TABLE = ('CREATE TABLE IF NOT EXISTS shard_copied (source TEXT, tbl TEXT, old_id INTEGER, new_id INTEGER, '
+                    'PRIMARY KEY (source, tbl, old_id)) WITHOUT ROWID')
+# Keyed by the shard layout too, so copying into a second --shard-dir (or bucket count) starts afresh.
+SQL_PROGRESS_TABLE = ('CREATE TABLE IF NOT EXISTS shard_progress (source TEXT, target TEXT, tbl TEXT, last_id INTEGER, '
+                      'PRIMARY KEY (source, target, tbl)) WITHOUT ROWID')
+# Copied and checksummed columns per table, with the value a source that predates the column implies.
+COLUMNS = {
+    'hearings': (('case_name', None), ('hearing_date', None), ('category', "'Civil'")),
+    'invoices': (('client_name', None), ('amount', None), ('date', None)),
+    'drafts': (('doc_type', None), ('content', None), ('date', None), ('category', "'Civil'"),
+               ('head_version', '0'), ('content_hash', None)),
+}
+VERSION_COLUMNS = ('version', 'kind', 'payload', 'content_hash', 'raw_size', 'created')
+
+
+# --- 1. SOURCES ---
+class Source:
+    """A pre-sharding database file opened read-only, at whatever schema version it is."""
+
+    def __init__(self, path):
+        self.path = path
+        self.key = os.path.abspath(path)
+        self.conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, timeout=5)
+        self.tables = {name: {row[1] for row in self.conn.execute(f'PRAGMA table_info({name})')}
+                       for (name,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+    def select(self, table):
+        """Column expressions for COLUMNS[table], defaulted where this file lacks or nulls them."""
+        have = self.tables.get(table, ())
+        return ', '.join((f'COALESCE({c}, {d})' if d else c) if c in have else (d or 'NULL') for c, d in COLUMNS[table])
+
+    def batches(self, sql, params, key_width=1):
+        """Keyset-paged rows of `sql` (which ends in `> ? ORDER BY ... LIMIT ?`), one short read each."""
+        last = params
+        while True:
+            rows = self.conn.execute(sql, (*last, BATCH)).fetchall()
+            if not rows: return
+            yield rows
+            last = rows[-1][:key_width]
+
+
+def _checksum(row):
+    return int.from_bytes(hashlib.blake2b(repr(row).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _pause(args):
+    if args.pause: time.sleep(args.pause)
+
+
+# --- 2. COPY ---
+def copy_users(store, source):
+    """Merge logins into the directory; returns names already there with a different password."""
+    if 'users' not in source.tables or os.path.abspath(store.directory.path) == source.key: return []
+    rows = source.conn.execute('SELECT username, password, enroll_id FROM users').fetchall()
+    with store.directory.connection() as conn:
+        known = dict(conn.execute('SELECT username, password FROM users'))
+        conn.executemany('INSERT OR IGNORE INTO users (username, password, enroll_id) VALUES (?,?,?)', rows)
+    return [u for u, p, _ in rows if u in known and known[u] != p]
+
+
+_prepared = set()
+
+
+def _target(store):
+    return f'{os.path.abspath(store.shard_dir)}#{store.buckets}'
+
+
+def _shard(store, user):
+    """The user's shard pool, with the copy bookkeeping table in place."""
+    pool = store.pool(user)
+    if pool.path not in _prepared:
+        with pool.connection() as conn: conn.execute(SQL_COPIED_TABLE)
+        _prepared.add(pool.path)
+    return pool
+
+
+def _by_shard(store, rows):
+    groups = collections.defaultdict(list)
+    for row in rows: groups[store.shard_path(row[1])].append(row)
+    return groups
+
+
+def _copied(conn, source, table, old_ids):
+    marks = ','.join('?' * len(old_ids))
+    return dict(conn.execute(f'SELECT old_id, new_id FROM shard_copied WHERE source=? AND tbl=? AND old_id IN ({marks})',
+                             (source.key, table, *old_ids)))
+
+
+def copy_rows(store, source, table, args, touched):
+    """Append-only tables: rows past the last copied id, each inserted once per shard."""
+    if table not in source.tables: return 0
+    with store.directory.connection() as conn:
+        row = conn.execute('SELECT last_id FROM shard_progress WHERE source=? AND target=? AND tbl=?',
+                           (source.key, _target(store), table)).fetchone()
+    names = ', '.join(c for c, _ in COLUMNS[table])
+    moved = 0
+    for rows in source.batches(f'SELECT id, username, {source.select(table)} FROM {table} WHERE id > ? ORDER BY id LIMIT ?',
+                               (row[0] if row else 0,)):
+        for path, group in _by_shard(store, rows).items():
+            with _shard(store, group[0][1]).connection() as conn:
+                done = _copied(conn, source, table, [r[0] for r in group])
+                fresh = [r for r in group if r[0] not in done]
+                for r in fresh:
+                    new_id = conn.execute(f'INSERT INTO {table} (username, {names}) VALUES (?{",?" * len(COLUMNS[table])})',
+                                          r[1:]).lastrowid
+                    conn.execute('INSERT INTO shard_copied VALUES (?,?,?,?)', (source.key, table, r[0], new_id))
+            moved += len(fresh)
+            touched.update(r[1] for r in fresh)
+        with store.directory.connection() as conn:  # only a hint: shard_copied is what prevents duplicates
+            conn.execute('INSERT OR REPLACE INTO shard_progress VALUES (?,?,?,?)', (source.key, _target(store), table, rows[-1][0]))
+        _pause(args)
+    return moved
+
+
+def copy_drafts(store, source, args, touched):
+    """Drafts are re-saved in place, so every run compares head versions and re-copies the newer ones."""
+    if 'drafts' not in source.tables: return 0, 0
+    version = 'COALESCE(head_version, 0)' if 'head_version' in source.tables['drafts'] else '0'
+    names = [c for c, _ in COLUMNS['drafts']]
+    inserted = updated = 0
+    for keys in source.batches(f'SELECT id, username, {version} FROM drafts WHERE id > ? ORDER BY id LIMIT ?', (0,)):
+        for path, group in _by_shard(store, keys).items():
+            with _shard(store, group[0][1]).connection() as conn:
+                done = _copied(conn, source, 'drafts', [k[0] for k in group])
+                heads = dict(conn.execute(f'SELECT id, COALESCE(head_version, 0) FROM drafts WHERE id IN ({",".join("?" * len(done))})',
+                                          list(done.values()))) if done else {}
+                todo = [k[0] for k in group if k[0] not in done or heads.get(done[k[0]], -1) < k[2]]
+                if not todo: continue
+                rows = source.conn.execute(f'SELECT id, username, {source.select("drafts")} FROM drafts '
+                                           f'WHERE id IN ({",".join("?" * len(todo))})', todo).fetchall()
+                for r in rows:
+                    if r[0] in done:
+                        conn.execute(f'UPDATE drafts SET {", ".join(c + "=?" for c in names)} WHERE id=?', (*r[2:], done[r[0]]))
+                        updated += 1
+                    else:
+                        new_id = conn.execute(f'INSERT INTO drafts (username, {", ".join(names)}) VALUES (?{",?" * len(names)})',
+                                              r[1:]).lastrowid
+                        conn.execute('INSERT INTO shard_copied VALUES (?,?,?,?)', (source.key, 'drafts', r[0], new_id))
+                        inserted += 1
+                    touched.add(r[1])
+        _pause(args)
+    return inserted, updated
+
+
+def copy_versions(store, source, args):
+    """Version rows are immutable: copy the (draft, version) keys a shard does not hold yet."""
+    if 'draft_versions' not in source.tables or 'drafts' not in source.tables: return 0
+    moved = 0
+    sql = ('SELECT v.draft_id, v.version, d.username FROM draft_versions v JOIN drafts d ON d.id = v.draft_id '
+           'WHERE (v.draft_id, v.version) > (?, ?) ORDER BY v.draft_id, v.version LIMIT ?')
+    for keys in source.batches(sql, (0, 0), key_width=2):
+        for path, group in _by_shard(store, [(k, k[2]) for k in keys]).items():
+            with _shard(store, group[0][1]).connection() as conn:
+                ids = _copied(conn, source, 'drafts', list({k[0] for k, _ in group}))
+                wanted = [(ids[d], v, d) for (d, v, _), _ in group if d in ids]
+                have = set()
+                for new_id in {w[0] for w in wanted}:
+                    have.update((new_id, v) for (v,) in conn.execute('SELECT version FROM draft_versions WHERE draft_id=?', (new_id,)))
+                missing = [w for w in wanted if (w[0], w[1]) not in have]
+                for new_id, v, old_id in missing:
+                    row = source.conn.execute(f'SELECT {", ".join(VERSION_COLUMNS)} FROM draft_versions WHERE draft_id=? AND version=?',
+                                              (old_id, v)).fetchone()
+                    conn.execute('INSERT INTO draft_versions VALUES (?,?,?,?,?,?,?)', (new_id, *row))
+                moved += len(missing)
+        _pause(args)
+    return moved
+
+
+def rebuild_totals(store, users):
+    """Billing summaries are derived: recompute them in each shard from the invoices it now holds."""
+    for user in sorted(users):
+        with store.pool(user).connection() as conn:
+            conn.execute('DELETE FROM invoice_client_totals WHERE username=?', (user,))
+            conn.execute('DELETE FROM invoice_month_totals WHERE username=?', (user,))
+            conn.execute("INSERT INTO invoice_client_totals SELECT username, COALESCE(client_name, ''), SUM(amount), COUNT(*) "
+                         'FROM invoices WHERE username=? GROUP BY 1, 2', (user,))
+            conn.execute("INSERT INTO invoice_month_totals SELECT username, COALESCE(SUBSTR(date, 1, 7), ''), SUM(amount), COUNT(*) "
+                         'FROM invoices WHERE username=? GROUP BY 1, 2', (user,))
+
+
+def copy(store, sources, args):
+    with store.directory.connection() as conn: conn.execute(SQL_PROGRESS_TABLE)
+    for source in sources:
+        start = time.perf_counter()
+        conflicts = copy_users(store, source)
+        touched = set()
+        hearings = copy_rows(store, source, 'hearings', args, touched)
+        invoices = copy_rows(store, source, 'invoices', args, touched)
+        inserted, updated = copy_drafts(store, source, args, touched)
+        versions = copy_versions(store, source, args)
+        rebuild_totals(store, touched)
+        print(f"{source.path}: {hearings} hearings, {invoices} invoices, {inserted} drafts (+{updated} re-saved), "
+              f"{versions} versions for {len(touched)} advocates in {time.perf_counter() - start:.1f}s")
+        for user in conflicts: print(f"  warning: {user!r} already in the directory with another password; kept the existing login")
+
+
+# --- 3. VERIFY ---
+def _tally(totals, rows):
+    for user, *values in rows:
+        t = totals[user]
+        t[0] += 1
+        t[1] = (t[1] + _checksum(tuple(values))) % 2 ** 64
+
+
+def _scan(conn, select, table, totals):
+    """Accumulates {(user, table): [rows, checksum]} over `conn` in keyset batches."""
+    last = 0
+    per_user = collections.defaultdict(lambda: [0, 0])
+    while True:
+        rows = conn.execute(f'SELECT t.rowid, {select} FROM {table} t WHERE t.rowid > ? ORDER BY t.rowid LIMIT ?',
+                            (last, BATCH)).fetchall()
+        if not rows: break
+        _tally(per_user, [r[1:] for r in rows])
+        last = rows[-1][0]
+    for user, (n, s) in per_user.items():
+        t = totals[(user, table)]
+        t[0] += n
+        t[1] = (t[1] + s) % 2 ** 64
+
+
+def _scan_versions(conn, totals):
+    """draft_versions is WITHOUT ROWID, and small per row once deltas kick in: one pass, grouped by owner."""
+    per_user = collections.defaultdict(lambda: [0, 0])
+    _tally(per_user, conn.execute('SELECT d.username, ' + ', '.join(f'v.{c}' for c in VERSION_COLUMNS) +
+                                  ' FROM draft_versions v JOIN drafts d ON d.id = v.draft_id'))
+    for user, (n, s) in per_user.items():
+        t = totals[(user, 'draft_versions')]
+        t[0] += n
+        t[1] = (t[1] + s) % 2 ** 64
+
+
+def tally_source(source, totals):
+    for table in COLUMNS:
+        if table in source.tables: _scan(source.conn, f't.username, {source.select(table)}', table, totals)
+    if 'draft_versions' in source.tables and 'drafts' in source.tables: _scan_versions(source.conn, totals)
+
+
+def tally_shard(path, totals):
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, timeout=5)
+    try:
+        for table, columns in COLUMNS.items():
+            _scan(conn, 't.username, ' + ', '.join(f'COALESCE({c}, {d})' if d else c for c, d in columns), table, totals)
+        _scan_versions(conn, totals)
+    finally:
+        conn.close()
+
+
+def verify(store, sources):
+    """Exit status 1 when any advocate's rows are missing from, or differ in, their shard."""
+    expected, actual = collections.defaultdict(lambda: [0, 0]), collections.defaultdict(lambda: [0, 0])
+    for source in sources: tally_source(source, expected)
+    shards = sorted({store.shard_path(user) for user, _ in expected})
+    for path in shards:
+        if not os.path.exists(path): continue
+        found = collections.defaultdict(lambda: [0, 0])
+        tally_shard(path, found)
+        for key, (n, s) in found.items():
+            if store.shard_path(key[0]) == path: actual[key] = [n, s]
+    status = collections.Counter()
+    problems = []
+    for key in sorted(set(expected) | set(actual)):
+        (n, s), (m, t) = expected.get(key, (0, 0)), actual.get(key, (0, 0))
+        state = 'ok' if (n, s) == (m, t) else 'ahead' if m > n else 'missing' if m < n else 'differs'
+        status[(key[1], state)] += 1
+        if state in ('missing', 'differs'): problems.append(f"  {state}: {key[0]!r} {key[1]}: {n} rows in sources, {m} in shard")
+    for table in ('hearings', 'drafts', 'draft_versions', 'invoices'):
+        print(f"{table:<15} " + '  '.join(f"{state} {status[(table, state)]}" for state in ('ok', 'ahead', 'missing', 'differs')))
+    with store.directory.connection() as conn:
+        logins = {u for (u,) in conn.execute('SELECT username FROM users')}
+    orphans = sorted({user for user, _ in expected} - logins)
+    if orphans: problems.append(f"  no login in the directory for: {', '.join(map(repr, orphans[:20]))}")
+    print("\n".join(problems[:50]) if problems else f"verified {len(shards)} shard files against {len(sources)} sources")
+    return 1 if problems else 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Split the shared database files into per-advocate shards.")
+    ap.add_argument("command", choices=["copy", "verify"])
+    ap.add_argument("--source", action="append", help=f"pre-sharding database (repeatable; default {db.DB_PATH})")
+    ap.add_argument("--directory", help="central users/outbox database (default: the first --source)")
+    ap.add_argument("--shard-dir", required=True)
+    ap.add_argument("--buckets", type=int, default=0, help="hash advocates into this many files instead of one each")
+    ap.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches, to go easy on a busy app")
+    args = ap.parse_args(argv)
+    paths = args.source or [db.DB_PATH]
+    sources = [Source(p) for p in paths]
+    store = db.Store(args.directory or paths[0], args.shard_dir, args.buckets)
+    try:
+        if args.command == "copy": copy(store, sources, args)
+        else: return verify(store, sources)
+    finally:
+        store.close()
+        for source in sources: source.conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
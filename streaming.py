@@ -0,0 +1,57 @@
+"""Incremental rendering of streamed Gemini responses into Streamlit placeholders."""
+import time
+
+from ai_cache import chunk_text
+
+CURSOR = '▌'
+MIN_REPAINT_INTERVAL = 0.05
+
+
+class StreamResult:
+    def __init__(self, text, first_token, total, cancelled, cached):
+        self.text = text
+        self.first_token = first_token
+        self.total = total
+        self.cancelled = cancelled
+        self.cached = cached
+
+
+def cancel_stream(response):
+    """Best-effort abort of the upstream call so an abandoned answer stops using quota."""
+    for target in (response, getattr(response, 'upstream', None), getattr(response, '_iterator', None)):
+        for name in ('cancel', 'close'):
+            fn = getattr(target, name, None)
+            if callable(fn):
+                fn()
+                return True
+    return False
+
+
+def stream_into(placeholder, model, contents, render, cancel_event=None, **kwargs):
+    """Stream `model`'s answer into `placeholder`, repainting with `render(placeholder, text)`.
+
+    The stream is cancelled upstream if `cancel_event` is set or if the script run is
+    interrupted (e.g. the user clicks Stop, which makes Streamlit rerun the script).
+    """
+    start = time.perf_counter()
+    render(placeholder, CURSOR)
+    res = model.generate_content(contents, stream=True, **kwargs)
+    text, first_token, last_paint, done = '', None, 0.0, False
+    try:
+        for chunk in res:
+            if cancel_event is not None and cancel_event.is_set(): break
+            piece = chunk_text(chunk)
+            if not piece: continue
+            if first_token is None: first_token = time.perf_counter() - start
+            text += piece
+            now = time.perf_counter()
+            if now - last_paint >= MIN_REPAINT_INTERVAL:
+                render(placeholder, text + CURSOR)
+                last_paint = now
+        else:
+            done = True
+    finally:
+        if not done: cancel_stream(res)
+    render(placeholder, text)
+    total = time.perf_counter() - start
+    return StreamResult(text, first_token if first_token is not None else total, total, not done, getattr(res, 'cached', False))
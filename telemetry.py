@@ -0,0 +1,213 @@
+"""Timing spans for the hot paths (SQLite, Gemini, PDF, SMTP) aggregated into rolling histograms.
+
+Recording costs one perf_counter pair, a bisect and a few integer adds under a lock, so it stays
+on in production. Read it back with `snapshot()` (last WINDOW_SLOTS minutes), `prometheus_text()`
+(cumulative since start) or the files written by the exporter thread.
+"""
+import bisect
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Upper bounds in seconds; the implicit last bucket is +Inf.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SLOT_SECONDS = 60
+WINDOW_SLOTS = 15
+EXPORT_PATH = 'metrics'  # -> metrics.prom and metrics.json
+EXPORT_INTERVAL = 15.0
+
+enabled = True
+_series = {}
+_counters = collections.Counter()
+_lock = threading.Lock()
+_exporter = None
+
+
+# --- 1. RECORDING ---
+class _Series:
+    """Cumulative bucket counts plus a ring of per-minute slots for the rolling window."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.sum = self.count = self.errors = self.bytes = 0
+        self.slots = collections.deque(maxlen=WINDOW_SLOTS)  # (slot id, bucket counts, [sum, count, errors, bytes])
+
+    def add(self, seconds, error, size, now):
+        i = bisect.bisect_left(BUCKETS, seconds)
+        self.buckets[i] += 1
+        self.sum += seconds; self.count += 1; self.errors += error; self.bytes += size
+        slot = int(now // SLOT_SECONDS)
+        if not self.slots or self.slots[-1][0] != slot:
+            self.slots.append((slot, [0] * (len(BUCKETS) + 1), [0.0, 0, 0, 0]))
+        _, counts, totals = self.slots[-1]
+        counts[i] += 1
+        totals[0] += seconds; totals[1] += 1; totals[2] += error; totals[3] += size
+
+
+def observe(kind, op, seconds, error=False, size=0):
+    if not enabled: return
+    now = time.time()
+    with _lock:
+        series = _series.get((kind, op))
+        if series is None: series = _series[(kind, op)] = _Series()
+        series.add(seconds, int(error), size, now)
+
+
+def count(kind, op, name, value=1):
+    """Free-form counters, e.g. Gemini tokens or cache hits."""
+    if not enabled or not value: return
+    with _lock: _counters[(kind, op, name)] += value
+
+
+class Span:
+    __slots__ = ('size',)
+
+    def __init__(self):
+        self.size = 0
+
+
+@contextlib.contextmanager
+def span(kind, op):
+    """Times the block; an exception counts as an error and is re-raised. Set `.size` to record payload bytes."""
+    s, start, error = Span(), time.perf_counter(), False
+    try:
+        yield s
+    except BaseException:
+        error = True
+        raise
+    finally:
+        observe(kind, op, time.perf_counter() - start, error, s.size)
+
+
+class TracedStream:
+    """Wraps a streamed response: timed from creation until it is exhausted, fails or is abandoned."""
+
+    def __init__(self, upstream, kind, op, on_finish=None):
+        self.upstream = upstream
+        self.kind, self.op = kind, op
+        self.on_finish = on_finish
+        self.started = time.perf_counter()
+
+    def __iter__(self):
+        error, size, done = False, 0, False
+        try:
+            for chunk in self.upstream:
+                size += len(getattr(chunk, 'text', '') or '')
+                yield chunk
+            done = True
+        except Exception:
+            error = True
+            raise
+        finally:
+            observe(self.kind, self.op, time.perf_counter() - self.started, error, size)
+            if not done and not error: count(self.kind, self.op, 'cancelled')
+            if done and self.on_finish: self.on_finish(self.upstream)
+
+    def __getattr__(self, name):
+        return getattr(self.upstream, name)
+
+
+# --- 2. READING ---
+def _quantile(counts, q):
+    """Linear interpolation inside the bucket that holds the q-th observation."""
+    n = sum(counts)
+    if not n: return 0.0
+    rank, seen = q * n, 0
+    for i, c in enumerate(counts):
+        if c and seen + c >= rank:
+            lo = BUCKETS[i - 1] if i else 0.0
+            hi = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+            return lo + (hi - lo) * (rank - seen) / c
+        seen += c
+    return BUCKETS[-1]
+
+
+def snapshot(minutes=WINDOW_SLOTS):
+    """Rolling view: {"spans": [...], "counters": [...]} over the last `minutes` (<= WINDOW_SLOTS)."""
+    oldest = int(time.time() // SLOT_SECONDS) - minutes + 1
+    rows = []
+    with _lock:
+        for (kind, op), series in sorted(_series.items()):
+            counts, total, n, errors, size = [0] * (len(BUCKETS) + 1), 0.0, 0, 0, 0
+            for slot, slot_counts, (s, c, e, b) in series.slots:
+                if slot < oldest: continue
+                counts = [x + y for x, y in zip(counts, slot_counts)]
+                total += s; n += c; errors += e; size += b
+            if not n: continue
+            rows.append({"kind": kind, "op": op, "count": n, "errors": errors, "bytes": size,
+                         "mean_ms": total / n * 1000, "p50_ms": _quantile(counts, 0.5) * 1000,
+                         "p95_ms": _quantile(counts, 0.95) * 1000, "p99_ms": _quantile(counts, 0.99) * 1000})
+        counters = [{"kind": k, "op": o, "name": name, "value": v} for (k, o, name), v in sorted(_counters.items())]
+    return {"generated": time.time(), "window_minutes": minutes, "spans": rows, "counters": counters}
+
+
+def _labels(**labels):
+    escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ",".join(f'{k}="{escape(v)}"' for k, v in labels.items())
+
+
+def prometheus_text():
+    """Cumulative histograms and counters in the Prometheus text exposition format."""
+    lines = ["# TYPE legal_hub_span_seconds histogram"]
+    with _lock:
+        for (kind, op), series in sorted(_series.items()):
+            running = 0
+            for bound, c in zip(BUCKETS + ('+Inf',), series.buckets):
+                running += c
+                lines.append(f'legal_hub_span_seconds_bucket{{{_labels(kind=kind, op=op, le=bound)}}} {running}')
+            lines.append(f'legal_hub_span_seconds_sum{{{_labels(kind=kind, op=op)}}} {series.sum:.6f}')
+            lines.append(f'legal_hub_span_seconds_count{{{_labels(kind=kind, op=op)}}} {series.count}')
+        lines.append("# TYPE legal_hub_span_errors_total counter")
+        lines += [f'legal_hub_span_errors_total{{{_labels(kind=k, op=o)}}} {s.errors}' for (k, o), s in sorted(_series.items())]
+        lines.append("# TYPE legal_hub_span_bytes_total counter")
+        lines += [f'legal_hub_span_bytes_total{{{_labels(kind=k, op=o)}}} {s.bytes}' for (k, o), s in sorted(_series.items())]
+        lines.append("# TYPE legal_hub_events_total counter")
+        lines += [f'legal_hub_events_total{{{_labels(kind=k, op=o, name=n)}}} {v}' for (k, o, n), v in sorted(_counters.items())]
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _series.clear()
+        _counters.clear()
+
+
+# --- 3. EXPORT ---
+def _atomic_write(path, text):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f: f.write(text)
+    os.replace(tmp, path)
+
+
+def export(path=EXPORT_PATH):
+    """Writes <path>.prom (for a node_exporter textfile collector) and <path>.json."""
+    _atomic_write(path + '.prom', prometheus_text())
+    _atomic_write(path + '.json', json.dumps(snapshot(), indent=1))
+
+
+class Exporter(threading.Thread):
+    def __init__(self, path=EXPORT_PATH, interval=EXPORT_INTERVAL):
+        super().__init__(name="telemetry-exporter", daemon=True)
+        self.path, self.interval = path, interval
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            try: export(self.path)
+            except OSError: pass  # e.g. a read-only working directory; the in-process views still work
+
+    def stop(self):
+        self.stopping.set()
+
+
+def start_exporter(path=EXPORT_PATH, interval=EXPORT_INTERVAL):
+    """One exporter per process however many sessions call this (db imports this module, so no cache_resource)."""
+    global _exporter
+    with _lock:
+        if _exporter is None:
+            _exporter = Exporter(path, interval)
+            _exporter.start()
+    return _exporter
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+import ai_cache
+import gateway
+from fake_model import FakeModel
+
+
+class RecordingCache(ai_cache.ResponseCache):
+    def __init__(self):
+        super().__init__(':memory:')
+        self.puts = []
+
+    def put(self, key, feature, text, latency):
+        self.puts.append(latency)
+        super().put(key, feature, text, latency)
+
+
+def ask_together(model, n, **kwargs):
+    results = []
+
+    def ask():
+        res = model.generate_content("cancellation of bail", feature="researcher", **kwargs)
+        if kwargs.get('stream'): ''.join(ai_cache.chunk_text(c) for c in res)
+        results.append(res)
+
+    threads = [threading.Thread(target=ask) for _ in range(n)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return results
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_only_the_call_that_went_upstream_writes_the_cache(stream):
+    cache, fake = RecordingCache(), FakeModel(text="x" * 120, latency=0.2, chunk_size=40, chunk_delay=0.05)
+    model = ai_cache.CachedModel(fake, cache, gateway.Gateway(6000, 100))
+    results = ask_together(model, 5, stream=stream)
+    assert fake.calls == 1 and len(results) == 5
+    assert len(cache.puts) == 1
+    assert cache.puts[0] >= 0.2 + (0.1 if stream else 0)  # timed from the upstream call, first token included
+
+
+def test_saved_seconds_count_the_upstream_latency_once_per_hit():
+    cache = RecordingCache()
+    model = ai_cache.CachedModel(FakeModel(text="answer", latency=0.2), cache, gateway.Gateway(6000, 100))
+    ask_together(model, 4)
+    assert model.generate_content("cancellation of bail", feature="researcher").cached
+    assert cache.stats()["researcher"]["saved_seconds"] == pytest.approx(cache.puts[0])
@@ -0,0 +1,42 @@
+import sqlite3
+import threading
+
+import pytest
+
+import db
+
+
+def test_connection_returned_while_the_pool_is_retired_is_closed(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / "a.db"))
+    put = pool._idle.put_nowait
+
+    def retire_first(conn):  # close() lands between _release's retired check and its put
+        pool.close()
+        put(conn)
+
+    pool._idle.put_nowait = retire_first
+    with pool.connection() as conn: pass
+    assert pool._idle.empty()
+    with pytest.raises(sqlite3.ProgrammingError): conn.execute("SELECT 1")
+
+
+def test_sessions_opening_one_shard_share_a_single_pool(tmp_path, monkeypatch):
+    store = db.Store(str(tmp_path / "directory.db"), str(tmp_path / "shards"))
+    built, barrier = [], threading.Barrier(8)
+    init = db.ConnectionPool.__init__
+
+    def counting_init(self, *args, **kwargs):
+        built.append(self)
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(db.ConnectionPool, "__init__", counting_init)
+    pools = []
+
+    def open_shard():
+        barrier.wait()
+        pools.append(store.pool("adv"))
+
+    threads = [threading.Thread(target=open_shard) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len(built) == 1 and all(p is built[0] for p in pools)
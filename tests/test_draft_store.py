@@ -0,0 +1,49 @@
+import threading
+import time
+
+import db
+import draft_store
+
+
+def test_concurrent_saves_append_in_turn(tmp_path, monkeypatch):
+    read_head = draft_store._head
+    monkeypatch.setattr(draft_store, "_head", lambda *a: (read_head(*a), time.sleep(0.02))[0])  # widen the race
+    pool = db.ConnectionPool(str(tmp_path / "drafts.db"), size=8)
+    draft_id, _, _ = draft_store.save(pool, "adv", None, "Legal Notice", "v1", "2026-01-01")
+    barrier, errors = threading.Barrier(8), []
+
+    def edit(n):
+        barrier.wait()
+        try: draft_store.save(pool, "adv", draft_id, "Legal Notice", f"edit {n}", "2026-01-01")
+        except Exception as e: errors.append(e)
+
+    threads = [threading.Thread(target=edit, args=(n,)) for n in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert errors == []
+    assert [v for v, *_ in draft_store.history(pool, "adv", draft_id)] == list(range(9, 0, -1))
+
+
+def test_autosave_waits_for_the_editor_to_go_quiet(tmp_path, monkeypatch):
+    pool = db.ConnectionPool(str(tmp_path / "drafts.db"))
+    clock = [100.0]
+    monkeypatch.setattr(draft_store.time, "monotonic", lambda: clock[0])
+    state = {}
+
+    def tick(content, seconds=0):
+        clock[0] += seconds
+        return draft_store.autosave(pool, state, "adv", "Legal Notice", content, "2026-01-01", quiet=5)
+
+    assert tick("first") is None  # an edit starts the timer
+    assert tick("second", 4) is None  # another edit restarts it
+    assert tick("second", 4) is None
+    assert tick("second", 1) == 1
+    assert tick("second", 10) is None  # nothing new to save
+
+
+def test_loaded_template_is_not_autosaved_until_edited(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / "drafts.db"))
+    state = {}
+    draft_store.seed(state, "TEMPLATE")
+    assert draft_store.autosave(pool, state, "adv", "Legal Notice", "TEMPLATE", "2026-01-01", quiet=0) is None
+    assert state.get("doc_id") is None
@@ -0,0 +1,10 @@
+import factory
+
+
+def test_parties_csv_saved_by_excel_is_read_as_cp1252():
+    data = "Recipient,Address,Email\nJosé Fernandes – HUF,12 MG Road,jf@example.com\n".encode("cp1252")
+    assert factory.read_parties(data) == [{"recipient": "José Fernandes – HUF", "address": "12 MG Road", "email": "jf@example.com"}]
+
+
+def test_parties_csv_with_utf8_bom():
+    assert factory.read_parties("﻿recipient\nअनिल\n".encode("utf-8")) == [{"recipient": "अनिल"}]
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+import gateway
+from fake_model import FakeModel, FakeResponse
+
+BACKOFF = gateway.backoff
+
+
+class Flaky(FakeModel):
+    """Fails the first `failures` calls with `error`."""
+
+    def __init__(self, failures, error, **kwargs):
+        super().__init__(latency=0.0, **kwargs)
+        self.failures = failures
+        self.error = error
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            fail = self.calls <= self.failures
+        if fail: raise self.error
+        return FakeResponse(self.answer(contents))
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(gateway, 'backoff', lambda attempt: 0.0)
+
+
+def test_retries_rate_limits_then_succeeds():
+    model = Flaky(2, RuntimeError("429 Resource has been exhausted"), text="ok")
+    gw = gateway.Gateway(per_minute=0, max_retries=3)
+    assert gw.call(lambda: model.generate_content("p")).text == "ok"
+    assert model.calls == 3
+    assert gw.stats()['retried'] == 2
+
+
+def test_gives_up_after_max_retries():
+    model = Flaky(10, RuntimeError("429 Resource has been exhausted"))
+    gw = gateway.Gateway(per_minute=0, max_retries=2)
+    with pytest.raises(RuntimeError):
+        gw.call(lambda: model.generate_content("p"))
+    assert model.calls == 3
+    assert gw.stats()['failed'] == 1
+
+
+def test_does_not_retry_other_errors():
+    model = Flaky(1, ValueError("bad request"))
+    gw = gateway.Gateway(per_minute=0, max_retries=3)
+    with pytest.raises(ValueError):
+        gw.call(lambda: model.generate_content("p"))
+    assert model.calls == 1
+
+
+def test_backoff_is_capped_full_jitter():
+    for attempt in range(12):
+        delays = [BACKOFF(attempt) for _ in range(50)]
+        assert all(0.0 <= d <= min(gateway.BACKOFF_MAX, gateway.BACKOFF_BASE * 2 ** attempt) for d in delays)
+    assert max(BACKOFF(20) for _ in range(200)) > gateway.BACKOFF_MAX / 2
+
+
+def test_priority_lane_goes_first():
+    bucket = gateway.TokenBucket(per_minute=600, burst=1)  # one token, then one every 0.1 s
+    bucket.acquire()
+    order, threads = [], []
+    for lane, delay in ((gateway.LANES['scanner'], 0.0), (gateway.LANES['researcher'], 0.02)):
+        def take(lane=lane, delay=delay):
+            time.sleep(delay)
+            bucket.acquire(lane)
+            order.append(lane)
+        threads.append(threading.Thread(target=take))
+    for t in threads: t.start()
+    for t in threads: t.join(2)
+    assert order == [gateway.LANES['researcher'], gateway.LANES['scanner']]
+
+
+def test_identical_calls_are_coalesced():
+    model = FakeModel(text="shared", latency=0.2)
+    gw = gateway.Gateway(per_minute=0)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(gw.call(lambda: model.generate_content("p"), key="k").text))
+               for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join(2)
+    assert results == ["shared"] * 4
+    assert model.calls == 1
+    assert gw.stats()['coalesced'] == 3
+
+
+def test_shared_stream_survives_one_subscriber_leaving():
+    model = FakeModel(text="a" * 400, latency=0.0, chunk_size=40, chunk_delay=0.01)
+    upstream = model.generate_content("p", stream=True)
+    shared = gateway.SharedStream(upstream, lambda: None)
+    first, second = shared.subscribe(), shared.subscribe()
+    it = iter(first)
+    next(it)
+    it.close()  # first caller stops reading
+    assert first.closed and not upstream.cancelled
+    assert ''.join(c.text for c in second) == "a" * 400
+    assert not upstream.cancelled
+
+
+def test_shared_stream_cancels_upstream_when_everyone_leaves():
+    model = FakeModel(text="b" * 4000, latency=0.0, chunk_size=40, chunk_delay=0.01)
+    upstream = model.generate_content("p", stream=True)
+    finished = []
+    shared = gateway.SharedStream(upstream, lambda: finished.append(True))
+    subs = [shared.subscribe(), shared.subscribe()]
+    iters = [iter(s) for s in subs]
+    for it in iters: next(it)
+    for it in iters: it.close()
+    assert upstream.cancelled
+    assert finished == [True]
+    with pytest.raises(RuntimeError):  # a caller joining after everyone left gets an error, not a hang
+        list(shared.subscribe())
@@ -0,0 +1,16 @@
+import db
+import ledger
+
+
+def test_import_reads_an_excel_cp1252_csv(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / "ledger.db"))
+    data = "client_name,amount,date\nJosé Fernandes – HUF,1500,2026-03-04\nRao & Sons,200,04-03-2026\n".encode("cp1252")
+    report = ledger.import_csv(pool, "adv", data)
+    assert (report.inserted, report.rejected, report.encoding) == (2, 0, "cp1252")
+    assert ("José Fernandes – HUF", 1500.0, "2026-03-04") in ledger.page(pool, "adv")
+
+
+def test_import_strips_a_utf8_bom(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / "ledger.db"))
+    report = ledger.import_csv(pool, "adv", "﻿client_name,amount,date\nAnand,10,2026-01-02\n".encode("utf-8"))
+    assert (report.inserted, report.encoding) == (1, "utf-8")
@@ -0,0 +1,55 @@
+import pytest
+
+import db
+import precedents
+
+ANSWER = """Here are 3 Supreme Court citations:
+
+1. **{a} v. State of Karnataka**, (2019) 4 SCC 101: held on {topic}.
+2. **{b} v. Union of India**, (2014) 8 SCC 273: held on {topic}.
+3. **{c} v. State of Maharashtra**, (2021) 2 SCC 55: held on {topic}."""
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / "directory.db"))
+    yield pool
+    pool.close()
+
+
+def teach(pool, question, *names, scope=precedents.GENERAL):
+    learned = precedents.learn(pool, scope, question, ANSWER.format(a=names[0], b=names[1], c=names[2], topic=question))
+    assert len(learned) == 3
+    return learned
+
+
+def test_rephrased_question_is_served(pool):
+    teach(pool, "cancellation of anticipatory bail in dowry harassment murder case", "Rao", "Iyer", "Khan")
+    found = precedents.lookup(pool, "anticipatory bail cancellation, dowry harassment murder")
+    assert found.strong and found.similarity == 1.0
+    assert [r.case_name for r in found.records] == ["Rao v. State of Karnataka", "Iyer v. Union of India", "Khan v. State of Maharashtra"]
+
+
+@pytest.mark.parametrize("question", ["bail", "dowry murder", "anticipatory bail"])
+def test_short_question_is_not_served_from_a_longer_one(pool, question):
+    teach(pool, "cancellation of anticipatory bail in dowry harassment murder case", "Rao", "Iyer", "Khan")
+    found = precedents.lookup(pool, question)
+    assert not found.strong and found.records == []
+
+
+def test_terms_are_not_pooled_across_past_questions(pool):
+    teach(pool, "grant of maintenance", "Rao", "Iyer", "Khan")
+    teach(pool, "cancellation of tenancy", "Rao", "Iyer", "Khan")  # the same three citations, found again
+    found = precedents.lookup(pool, "cancellation of maintenance")
+    assert not found.strong and found.records == []
+
+
+def test_one_swapped_word_is_not_served(pool):
+    teach(pool, "cancellation of anticipatory bail", "Rao", "Iyer", "Khan")
+    assert not precedents.lookup(pool, "grant of anticipatory bail").strong
+
+
+def test_scoped_lookup_sees_general_citations_only(pool):
+    teach(pool, "dishonour of cheque section 138", "Rao", "Iyer", "Khan", scope="Civil")
+    assert precedents.lookup(pool, "section 138 dishonour of cheque", scope="Civil").strong
+    assert not precedents.lookup(pool, "section 138 dishonour of cheque", scope="Criminal").strong
@@ -0,0 +1,62 @@
+import io
+import random
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+import preprocess
+
+MAX_DISTANCE = preprocess.PreprocessConfig().max_hash_distance
+WORDS = ("the petitioner respondent court order hearing witness evidence section bail appeal affidavit "
+         "deponent solemnly affirm state true correct knowledge belief").split()
+
+
+def lines(seed):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(WORDS) for _ in range(9)) for _ in range(45)]
+
+
+def page(text, form=False):
+    """An A4 page at 300 dpi with 45 lines of text, optionally boxed like a form."""
+    img = Image.new("L", (2480, 3508), 255)
+    draw, font = ImageDraw.Draw(img), ImageFont.load_default(size=42)
+    for i, line in enumerate(text):
+        if form: draw.rectangle((150, 200 + i * 70, 2330, 264 + i * 70), outline=0, width=2)
+        draw.text((200, 210 + i * 70), line, fill=0, font=font)
+    return img
+
+
+def rescan(img, seed):
+    rng = random.Random(seed)
+    img = img.rotate(rng.uniform(-0.4, 0.4), resample=Image.BILINEAR, fillcolor=255,
+                     translate=(rng.randint(-8, 8), rng.randint(-8, 8)))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=60)
+    return Image.open(io.BytesIO(buf.getvalue()))
+
+
+def prepared(*images):
+    cfg = preprocess.PreprocessConfig()
+    return [preprocess.preprocess(img, cfg, measure=False) for img in images]
+
+
+@pytest.mark.parametrize("form", [False, True])
+def test_rescan_of_a_page_is_a_duplicate(form):
+    original = page(lines(1), form)
+    assert preprocess.find_duplicates(prepared(original, rescan(original, 2)), MAX_DISTANCE) == {1: 0}
+
+
+@pytest.mark.parametrize("form", [False, True])
+def test_pages_differing_in_three_lines_are_kept(form):
+    text = lines(3)
+    changed = list(text)
+    for i in (5, 21, 40): changed[i] = "the deponent was not present at the hearing on that date"
+    pages = prepared(page(text, form), page(changed, form))
+    assert preprocess.hamming(pages[0].phash, pages[1].phash) <= MAX_DISTANCE  # the hash alone can't tell them apart
+    assert preprocess.find_duplicates(pages, MAX_DISTANCE) == {}
+
+
+def test_upload_size_is_only_measured_on_request():
+    img = page(lines(4))
+    assert prepared(img)[0].bytes_before is None
+    assert preprocess.preprocess(img, preprocess.PreprocessConfig(), measure=True).bytes_before > 0
@@ -0,0 +1,35 @@
+import io
+
+from PIL import Image, ImageDraw
+
+import scanner
+from fake_model import FakeModel
+
+
+def tiff(frames):
+    images = []
+    for n in range(frames):
+        img = Image.new("L", (400, 560), 255)
+        ImageDraw.Draw(img).text((40, 40), f"Exhibit page {n}", fill=0)
+        images.append(img)
+    buf = io.BytesIO()
+    images[0].save(buf, format="TIFF", save_all=True, append_images=images[1:])
+    return buf.getvalue()
+
+
+def test_tiff_frames_are_rendered_lazily():
+    pages = scanner.expand_pages([("bundle.tif", tiff(3))])
+    assert [p.label for p in pages] == ["bundle.tif p.1", "bundle.tif p.2", "bundle.tif p.3"]
+    assert all(p.content is None for p in pages)
+    frame = pages[2].image()
+    assert frame.size == (400, 560) and frame.format == "TIFF"
+    assert pages[2].content is None  # not kept after rendering
+
+
+def test_lazy_pages_are_ocrd_in_page_order():
+    pages = scanner.expand_pages([("bundle.tif", tiff(4))])
+    results = list(scanner.ocr_pages(FakeModel(text="text", latency=0.0), pages))
+    doc = scanner.assemble(results)
+    assert [r.index for r in sorted(results, key=lambda r: r.index)] == [0, 1, 2, 3]
+    assert doc.index("Page 1") < doc.index("Page 4")
+    assert not any(r.error for r in results)
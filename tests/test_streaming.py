@@ -0,0 +1,42 @@
+import threading
+
+import streaming
+from fake_model import FakeModel
+
+
+def render(texts):
+    return lambda placeholder, text: texts.append(text)
+
+
+def test_stream_into_renders_the_whole_answer():
+    model = FakeModel(text="x" * 200, latency=0.0, chunk_size=40, chunk_delay=0.0)
+    painted = []
+    res = streaming.stream_into(None, model, "prompt", render(painted))
+    assert res.text == "x" * 200
+    assert not res.cancelled
+    assert painted[0] == streaming.CURSOR and painted[-1] == res.text
+
+
+def test_cancel_event_stops_the_upstream_stream():
+    model = FakeModel(text="y" * 4000, latency=0.0, chunk_size=40, chunk_delay=0.01)
+    cancel, upstream = threading.Event(), []
+    send = model.generate_content
+    model.generate_content = lambda *a, **kw: upstream.append(send(*a, **kw)) or upstream[-1]
+
+    def paint(placeholder, text):
+        if len(text) > 100: cancel.set()
+
+    res = streaming.stream_into(None, model, "prompt", paint, cancel_event=cancel)
+    assert res.cancelled
+    assert upstream[0].cancelled
+    assert upstream[0].chunks_sent < 10
+    assert len(res.text) < 4000
+
+
+def test_cancel_stream_finds_a_wrapped_upstream():
+    class Wrapper:
+        def __init__(self, upstream): self.upstream = upstream
+
+    inner = FakeModel(text="z", latency=0.0).generate_content("p", stream=True)
+    assert streaming.cancel_stream(Wrapper(inner))
+    assert inner.cancelled